@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from brazilnum import batch, cei, cnpj, cpf, pis  # noqa: E402
+
+"""
+Scaling and memory benchmark on synthetic corpora of identifiers.
+
+Corpora of 10^3 identifiers up to a maximum size are generated with a
+controlled rate of invalid and missing values and a mix of input formats.
+Each corpus is validated in four modes: a scalar loop over validate_x, the
+batch kernel from brazilnum.batch, the batch kernel split over a pool of
+threads, and over a pool of worker processes. Threads only run in parallel
+on free-threaded (no-GIL) builds of Python; in the numba backend, only the
+check-digit kernel releases the GIL, and cleaning and padding do not. Every
+measurement runs in a fresh process, so peak RSS reflects that
+measurement alone.
+
+    python benchmark/scaling.py --kind cpf --max-size 1000000
+    python benchmark/scaling.py --kind cnpj --mix str=0.5,alphanumeric=0.5
+    python3.14t benchmark/scaling.py --modes batch,thread --workers 1,2,4,8
+
+Corpora of 10^8 identifiers need tens of gigabytes of memory.
+
+"""
+
+MODULES = {'cnpj': cnpj, 'cpf': cpf, 'pis': pis, 'cei': cei}
+FORMATS = ('str', 'int', 'formatted', 'alphanumeric')
+MODES = ('scalar', 'batch', 'thread', 'process')
+
+
+def parse_mix(text, kind):
+    """Parse a format mix like 'str=0.6,int=0.2,formatted=0.2'."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in FORMATS:
+            raise ValueError('Unknown format: {0}'.format(name))
+        if name == 'alphanumeric' and kind != 'cnpj':
+            raise ValueError('Only CNPJ has an alphanumeric format')
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError('Format mix needs a positive weight')
+    return mix
+
+
+def generate(kind, size, invalid_rate=0.1, missing_rate=0.01, mix=None,
+             seed=0):
+    """Generate a corpus of identifiers of one kind.
+
+    Invalid identifiers have a wrong last check digit; missing values
+    alternate between None and NaN.
+    """
+    module = MODULES[kind]
+    create = getattr(module, 'random_' + kind)
+    fmt = getattr(module, 'format_' + kind)
+    rng = random.Random(seed)
+    random.seed(seed)  # random_x uses the global generator
+    mix = mix or {'str': 1.0}
+    formats = list(mix)
+    weights = [mix[f] for f in formats]
+    picks = rng.choices(formats, weights, k=size)
+    corpus = []
+    for shape in picks:
+        if rng.random() < missing_rate:
+            corpus.append(None if rng.random() < 0.5 else float('nan'))
+            continue
+        if shape == 'alphanumeric':
+            value = create(formatted=False, alphanumeric=True)
+        else:
+            value = create(formatted=False)
+        if rng.random() < invalid_rate:
+            value = value[:-1] + str((int(value[-1]) + 1) % 10)
+        if shape == 'int':
+            value = int(value)
+        elif shape == 'formatted':
+            value = fmt(value)
+        corpus.append(value)
+    return corpus
+
+
+def chunks(values, size):
+    """Split a list into consecutive slices of at most size items."""
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def _validate_chunk(args):
+    kind, values = args
+    return batch.run('validate', kind, values)
+
+
+def run_mode(mode, kind, corpus, workers=1, chunk_size=10000):
+    """Validate a corpus in one mode, returning the results."""
+    if mode == 'scalar':
+        validate = getattr(MODULES[kind], 'validate_' + kind)
+        return [validate(v) for v in corpus]
+    if mode == 'batch':
+        return batch.run('validate', kind, corpus)
+    if mode == 'thread':
+        return batch.run_threaded('validate', kind, corpus, workers,
+                                  chunk_size)
+    if not chunk_size:  # one chunk per worker, as in batch.run_threaded
+        chunk_size = max(1, -(-len(corpus) // workers))
+    with multiprocessing.Pool(workers) as pool:
+        parts = pool.map(_validate_chunk,
+                         [(kind, c) for c in chunks(corpus, chunk_size)])
+    return [r for part in parts for r in part]
+
+
+def peak_rss(who=None):
+    """Peak resident memory in bytes of this process or, with
+    who=resource.RUSAGE_CHILDREN, of its largest finished child.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(
+        resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measure(spec):
+    """Generate a corpus and time one mode on it; runs in a child process."""
+    corpus = generate(spec['kind'], spec['size'], spec['invalid_rate'],
+                      spec['missing_rate'], spec['mix'], spec['seed'])
+    corpus_rss = peak_rss()
+    args = (spec['mode'], spec['kind'], corpus, spec['workers'],
+            spec['chunk_size'])
+
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        best = None
+        for _ in range(spec['repeat']):
+            start = time.perf_counter()
+            results = run_mode(*args)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    valid = sum(1 for r in results if r)
+    del results
+    rss = peak_rss()
+    workers_rss = peak_rss(resource and resource.RUSAGE_CHILDREN)
+
+    traced = None
+    if spec['tracemalloc']:
+        # traced separately because tracing slows the run several times
+        tracemalloc.start()
+        run_mode(*args)
+        traced = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'kind': spec['kind'], 'mode': spec['mode'], 'size': spec['size'],
+        'workers': spec['workers'], 'seconds': best,
+        'items_per_second': spec['size'] / best if best else None,
+        'valid': valid, 'corpus_rss': corpus_rss, 'peak_rss': rss,
+        'worker_rss': workers_rss if spec['mode'] == 'process' else None,
+        'peak_traced': traced,
+    }
+
+
+def _child(spec, conn):
+    try:
+        conn.send(measure(spec))
+    except Exception as exc:
+        conn.send({'error': repr(exc)})
+    finally:
+        conn.close()
+
+
+def measure_in_child(spec):
+    """Run measure in a fresh process so memory peaks do not carry over."""
+    parent, child = multiprocessing.Pipe(duplex=False)
+    proc = multiprocessing.Process(target=_child, args=(spec, child))
+    proc.start()
+    child.close()
+    result = parent.recv()
+    proc.join()
+    if 'error' in result:
+        raise RuntimeError('{0[mode]} at {0[size]}: {1}'
+                           .format(spec, result['error']))
+    return result
+
+
+def sizes(max_size):
+    """Powers of ten from 10^3 up to max_size."""
+    size = 1000
+    while size <= max_size:
+        yield size
+        size *= 10
+
+
+def default_workers():
+    """Powers of two up to the number of CPUs."""
+    count, workers = os.cpu_count() or 1, []
+    n = 1
+    while n <= count:
+        workers.append(n)
+        n *= 2
+    if workers[-1] != count:
+        workers.append(count)
+    return workers
+
+
+def gil_enabled():
+    """Check whether the GIL is enabled; only free-threaded builds of
+    Python 3.13 and later can run without it.
+    """
+    check = getattr(sys, '_is_gil_enabled', None)
+    return True if check is None else check()
+
+
+def _megabytes(value):
+    return '-' if value is None else '{0:.1f}'.format(value / 2 ** 20)
+
+
+def report(rows, out=sys.stdout):
+    """Print a scaling table, with speedup relative to the batch mode."""
+    header = ('size', 'mode', 'workers', 'seconds', 'Mitems/s', 'speedup',
+              'rss MB', 'worker MB', 'traced MB')
+    print('{0:>11} {1:>8} {2:>7} {3:>9} {4:>9} {5:>8} {6:>9} {7:>9} {8:>10}'
+          .format(*header), file=out)
+    base = {r['size']: r['seconds'] for r in rows if r['mode'] == 'batch'}
+    for r in rows:
+        speedup = base.get(r['size'])
+        speedup = '{0:.2f}'.format(speedup / r['seconds']) if speedup else '-'
+        print('{0:>11} {1:>8} {2:>7} {3:>9.3f} {4:>9.3f} {5:>8} {6:>9} {7:>9} '
+              '{8:>10}'
+              .format(r['size'], r['mode'], r['workers'], r['seconds'],
+                      r['items_per_second'] / 1e6, speedup,
+                      _megabytes(r['peak_rss']), _megabytes(r['worker_rss']),
+                      _megabytes(r['peak_traced'])), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Measure throughput and memory on synthetic corpora.')
+    parser.add_argument('--kind', choices=sorted(MODULES), default='cpf')
+    parser.add_argument('--max-size', type=float, default=1e6,
+                        help='largest corpus, e.g. 1e8 (default 1e6)')
+    parser.add_argument('--invalid-rate', type=float, default=0.1)
+    parser.add_argument('--missing-rate', type=float, default=0.01)
+    parser.add_argument('--mix', default='str=0.6,int=0.2,formatted=0.2',
+                        help='weights of input formats')
+    parser.add_argument('--modes', default=','.join(MODES),
+                        help='comma-separated modes to run')
+    parser.add_argument('--workers', default=None,
+                        help='comma-separated process counts '
+                             '(default: powers of two up to the CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=10000,
+                        help='identifiers per chunk in thread and process '
+                             'modes; each worker validates one chunk at a '
+                             'time, and 0 gives each worker one equal '
+                             'chunk (default 10000)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='timed rounds per measurement; best is kept')
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help='skip the traced run used for peak allocations')
+    parser.add_argument('--seed', type=int, default=20240709)
+    parser.add_argument('--output', help='save results as JSON to a file')
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix, args.kind)
+    except ValueError as exc:
+        parser.error(str(exc))
+    modes = [m.strip() for m in args.modes.split(',')]
+    for mode in modes:
+        if mode not in MODES:
+            parser.error('Unknown mode: {0}'.format(mode))
+    if args.workers:
+        workers = [int(w) for w in args.workers.split(',')]
+    else:
+        workers = default_workers()
+
+    if 'thread' in modes:
+        print('GIL is {0}'.format('enabled' if gil_enabled() else 'disabled'),
+              file=sys.stderr)
+
+    rows = []
+    for size in sizes(int(args.max_size)):
+        for mode in modes:
+            for count in workers if mode in ('thread', 'process') else [1]:
+                spec = {
+                    'kind': args.kind, 'size': size, 'mode': mode,
+                    'workers': count, 'chunk_size': args.chunk_size,
+                    'invalid_rate': args.invalid_rate,
+                    'missing_rate': args.missing_rate, 'mix': mix,
+                    'seed': args.seed, 'repeat': args.repeat,
+                    'tracemalloc': not args.no_tracemalloc,
+                }
+                rows.append(measure_in_child(spec))
+                print('{0} {1} x{2} at {3}: {4:.3f} s'.format(
+                    args.kind, mode, count, size, rows[-1]['seconds']),
+                    file=sys.stderr)
+
+    report(rows)
+    if args.output:
+        result = {
+            'meta': {
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'gil': gil_enabled(),
+                'date': datetime.now(timezone.utc).isoformat(),
+                'kind': args.kind, 'mix': mix,
+                'invalid_rate': args.invalid_rate,
+                'missing_rate': args.missing_rate,
+            },
+            'results': rows,
+        }
+        with open(args.output, 'w') as fh:
+            json.dump(result, fh, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,134 +1,415 @@
 #!/usr/bin/env python
 
-import sys
-import timeit
+import argparse
 import csv
+import gc
+import inspect
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
 
-sys.path.append('..')
-from brazilnum.cnpj import validate_cnpj, parse_cnpj, pad_cnpj
-from brazilnum.pis import validate_pis, pad_pis
-from brazilnum.cpf import validate_cpf, pad_cpf
-from brazilnum.muni import validate_muni
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
 
-"""
-Test speed of CNPJ, CPF, PIS/PASEP, and municipio functions.
+from brazilnum import (  # noqa
+    cei, cep, cnpj, cpf, dedupe, muni, pis, privacy, quality, util
+)
 
 """
+Benchmark suite for the public functions of brazilnum.
 
-# read sample of numeric and alphanumeric CNPJ, both valid and invalid
-with open('cnpj.csv', 'r') as fh:
-    rdr = csv.DictReader(fh)
-    CNPJ = list(rdr)
-    fh.close()
-
-# read sample of 200 fake PIS/PASEP numbers (100 good)
-with open('pis.csv', 'r') as fh:
-    rdr = csv.DictReader(fh)
-    PIS = list(rdr)
-    fh.close()
-
-# read sample of 200 fake CPF numbers (100 good)
-with open('cpf.csv', 'r') as fh:
-    rdr = csv.DictReader(fh)
-    CPF = list(rdr)
-    fh.close()
-
-# read all municipio codes along with bad versions
-with open('munis.csv', 'r') as fh:
-    rdr = csv.DictReader(fh)
-    MUNI = list(rdr)
-    fh.close()
-
-
-def cnpj_speed():
-    """Check speed of validating sample CNPJ, valid and invalid."""
-    for c in CNPJ:
-        try:
-            assert int(c['good']) == validate_cnpj(c['cnpj'])
-        except:
-            print('CNPJ Validation failed: {0}'.format(c['cnpj']))
-
-
-def pis_speed():
-    """Check speed of validating 200 fake PIS/PASEP numbers, 100 invalid."""
-    for c in PIS:
-        try:
-            assert int(c['good']) == validate_pis(c['pis'])
-        except:
-            print('PIS/PASEP Validation failed: {0}'.format(c['pis']))
-
-
-def cpf_speed():
-    """Check speed of validating 200 fake CPF numbers, 100 invalid."""
-    for c in CPF:
-        try:
-            assert int(c['good']) == validate_cpf(c['cpf'])
-        except:
-            print('CPF Validation failed: {0}'.format(c['cpf']))
-
-
-def muni_speed():
-    """Check speed of validating all municipio numbers plus bad versions."""
-    for m in MUNI:
-        try:
-            assert int(m['good']) == validate_muni(m['muni'])
-        except:
-            print('Municipio validation failed: {0}'.format(m['muni']))
-
-
-reps = 1000
+Every case times one function on one shape of input (integers, clean
+strings, formatted strings, alphanumeric CNPJ, missing values, or invalid
+identifiers) and reports nanoseconds per identifier. Results can be saved
+as JSON and compared to a saved baseline; the script exits with status 1
+when any case is slower than the baseline by more than a threshold.
 
-# time validation of CNPJ
-cnpj_time = timeit.timeit(cnpj_speed, number=reps)
-time_per_thousand_cnpj = (cnpj_time / (len(CNPJ) * reps)) * 1000.
-
-print('Validate 1,000 CNPJ: {0} seconds'.format(time_per_thousand_cnpj))
-
-
-# time validation of PIS/PASEP
-pis_time = timeit.timeit(pis_speed, number=reps)
-time_per_thousand_pis = (pis_time / (len(PIS) * reps)) * 1000.
-
-print('Validate 1,000 PIS/PASEP: {0} seconds'.format(time_per_thousand_pis))
-
-
-# time validation of CPF
-cpf_time = timeit.timeit(cpf_speed, number=reps)
-time_per_thousand_cpf = (cpf_time / (len(CPF) * reps)) * 1000.
-
-print('Validate 1,000 CPF: {0} seconds'.format(time_per_thousand_cpf))
-
-
-# time validation of municipios
-muni_time = timeit.timeit(muni_speed, number=2)
-print('Validate municipios: {0} seconds'.format(muni_time))
-
-
-# time parsing of CNPJ
-def parse_cnpj_speed():
-    """Parse CNPJ read from file."""
-    for i in CNPJ:
-        # numeric CNPJ often arrive as integers from data files, but
-        # alphanumeric CNPJ can only be strings
-        c = i['cnpj']
-        parse_cnpj(int(c) if c.isdigit() else c)
-
-
-cnpj_parse_time = timeit.timeit(parse_cnpj_speed, number=reps)
-print('Parse {0} CNPJ: {1} seconds'.format(len(CNPJ), cnpj_parse_time))
-
-
-# time padding of all identifiers
-def pad_speed():
-    """Pad identifiers."""
-    for i in CNPJ:
-        c = i['cnpj']
-        pad_cnpj(int(c) if c.isdigit() else c, validate=False)
-    for i in PIS:
-        pad_pis(int(i['pis']), validate=False)
-    for i in CPF:
-        pad_cpf(int(i['cpf']), validate=False)
+    python benchmark/speed.py --output baseline.json
+    python benchmark/speed.py --baseline baseline.json --threshold 0.10
 
+"""
 
-pad_time = timeit.timeit(pad_speed, number=reps)
-print('Pad identifiers: {0} seconds'.format(pad_time))
+MODULES = [cnpj, cpf, pis, cei, cep, muni]
+
+
+def read_sample(name, column):
+    """Read identifiers from a CSV sample, split into valid and invalid."""
+    with open(os.path.join(HERE, name), 'r') as fh:
+        rows = list(csv.DictReader(fh))
+    good = [r[column] for r in rows if r['good'] == '1']
+    bad = [r[column] for r in rows if r['good'] == '0']
+    return good, bad
+
+
+def shapes(good, bad, fmt, ints=True):
+    """Build the input shapes of one kind of identifier from clean valid
+    and invalid samples.
+    """
+    numeric = [k for k in good if k.isdigit()]
+    out = {
+        'str': numeric,
+        'formatted': [fmt(k) for k in numeric],
+        'missing': [None, float('nan')] * (len(numeric) // 2),
+        'invalid': bad,
+    }
+    if ints:
+        out['int'] = [int(k) for k in numeric]
+    alnum = [k for k in good if not k.isdigit()]
+    if alnum:
+        out['alphanumeric'] = alnum
+    return out
+
+
+def build_inputs():
+    """Build inputs for every kind of identifier, by shape."""
+    # samples without a CSV file are generated with a fixed seed
+    random.seed(20240709)
+
+    cnpj_good, cnpj_bad = read_sample('cnpj.csv', 'cnpj')
+    cpf_good, cpf_bad = read_sample('cpf.csv', 'cpf')
+    pis_good, pis_bad = read_sample('pis.csv', 'pis')
+    muni_good, muni_bad = read_sample('munis.csv', 'muni')
+    cei_good = [cei.random_cei(formatted=False) for _ in range(200)]
+    cei_bad = [k[:-1] + str((int(k[-1]) + 1) % 10) for k in cei_good]
+    cep_good = ['%08i' % random.randint(1000000, 99999999)
+                for _ in range(200)]
+    cep_bad = ['%06i' % random.randint(0, 999999) for _ in range(200)]
+
+    inputs = {
+        'cnpj': shapes(cnpj_good, cnpj_bad, cnpj.format_cnpj),
+        'cpf': shapes(cpf_good, cpf_bad, cpf.format_cpf),
+        'pis': shapes(pis_good, pis_bad, pis.format_pis),
+        'cei': shapes(cei_good, cei_bad, cei.format_cei),
+        'cep': shapes(cep_good, cep_bad, cep.format_cep),
+        'muni': shapes(muni_good, muni_bad, str),
+    }
+    # municipio codes have no formatting, so test them with stray spaces
+    inputs['muni']['formatted'] = [' %s ' % k for k in muni_good]
+
+    # identifier stems for check digit and firm functions
+    inputs['cnpj_stem'] = {
+        'str': [k[:12] for k in cnpj_good if k.isdigit()],
+        'alphanumeric': [k[:12] for k in cnpj_good if not k.isdigit()],
+    }
+    inputs['cnpj_firm'] = {
+        'str': [k[:8] for k in cnpj_good if k.isdigit()],
+        'alphanumeric': [k[:8] for k in cnpj_good if not k.isdigit()],
+    }
+    inputs['cpf_stem'] = {'str': [k[:9] for k in cpf_good]}
+    inputs['pis_stem'] = {'str': [k[:10] for k in pis_good]}
+    inputs['cei_stem'] = {'str': [k[:11] for k in cei_good]}
+    inputs['muni_stem'] = {'str': [k[:6] for k in muni_good]}
+    inputs['muni_name'] = {'str': [muni.muni_info(k).name
+                                   for k in muni_good[::10]]}
+    inputs['muni_prefix'] = {'str': [k[:5] for k in
+                                     inputs['muni_name']['str']]}
+    return inputs
+
+
+def build_cases(inputs):
+    """List benchmark cases as (name, function, inputs, batch) tuples.
+
+    Scalar functions are called once per input; batch functions (batch is
+    True) are called once with the whole list of inputs.
+    """
+    cases = []
+
+    def add(func, kind, batch=False, args=(), only=None):
+        for shape, values in sorted(inputs[kind].items()):
+            if only is not None and shape not in only:
+                continue
+            if args:
+                call = (lambda f, a: lambda v: f(v, *a))(func, args)
+                label = '{0}{1}'.format(func.__name__, args)
+            else:
+                call = func
+                label = func.__name__
+            name = '{0}.{1}[{2}]'.format(func.__module__.split('.')[-1],
+                                         label, shape)
+            cases.append((name, call, values, batch))
+
+    for mod, kind in [(cnpj, 'cnpj'), (cpf, 'cpf'), (pis, 'pis'),
+                      (cei, 'cei')]:
+        add(getattr(mod, 'validate_' + kind), kind)
+        add(getattr(mod, 'explain_' + kind), kind)
+        add(getattr(mod, 'validate_{0}_many'.format(kind)), kind, True)
+        add(getattr(mod, 'explain_{0}_many'.format(kind)), kind, True)
+        add(getattr(mod, 'format_' + kind), kind)
+        add(getattr(mod, 'format_{0}_many'.format(kind)), kind, True)
+        add(getattr(mod, 'pad_' + kind), kind)
+        add(getattr(mod, 'pad_{0}_many'.format(kind)), kind, True)
+        add(getattr(mod, 'pad_' + kind), kind, args=(True,),
+            only=('int', 'str'))
+
+    add(cnpj.cnpj_check_digits, 'cnpj_stem')
+    add(cnpj.cnpj_from_firm_id, 'cnpj_firm')
+    add(cnpj.parse_cnpj, 'cnpj')
+    add(cnpj.parse_cnpj_columns, 'cnpj', True)
+    add(cnpj.CNPJIndex, 'cnpj', True)
+    add(cnpj.cnpj_check_digits_many, 'cnpj_stem', True)
+    add(cpf.cpf_check_digits, 'cpf_stem')
+    add(cpf.cpf_check_digits_many, 'cpf_stem', True)
+    add(pis.pis_check_digit, 'pis_stem')
+    add(pis.pis_check_digits, 'pis_stem')
+    add(pis.pis_check_digit_many, 'pis_stem', True)
+    add(cei.cei_check_digit, 'cei_stem')
+    add(cei.cei_check_digit_many, 'cei_stem', True)
+    add(cnpj.enrich_cnpj_columns, 'cnpj', True)
+    add(cpf.enrich_cpf_columns, 'cpf', True)
+    add(cei.enrich_cei_columns, 'cei', True)
+    add(cnpj.partition_by_cnpj, 'cnpj', True, args=(64,))
+    add(cpf.partition_by_cpf, 'cpf', True, args=(64,))
+    add(cnpj.mask_cnpj, 'cnpj')
+    add(cpf.mask_cpf, 'cpf')
+    add(pis.mask_pis, 'pis')
+    # rounds after the first find tokens in the cache of recent tokens
+    add(privacy.pseudonymize, 'cpf', True, args=('benchmark key',))
+
+    # cleaning, which every other function does first
+    add(util.clean_id, 'cpf', only=('str', 'formatted', 'int', 'invalid'))
+    add(util.clean_id_many, 'cpf', True)
+    add(util.clean_alphanumeric_id, 'cnpj',
+        only=('str', 'formatted', 'alphanumeric', 'int', 'invalid'))
+    add(util.clean_id_many, 'cnpj', True, args=(True,))
+
+    add(cep.format_cep, 'cep')
+    add(cep.format_cep_many, 'cep', True)
+    add(cep.parse_cep, 'cep')
+    add(cep.parse_cep_columns, 'cep', True)
+    add(cep.cep_to_uf, 'cep')
+    add(cep.cep_to_uf_many, 'cep', True)
+    add(cep.cep_to_region, 'cep')
+    add(cep.cep_to_region_many, 'cep', True)
+
+    add(muni.validate_muni, 'muni')
+    add(muni.explain_muni, 'muni')
+    add(muni.validate_muni_many, 'muni', True)
+    add(muni.explain_muni_many, 'muni', True)
+    add(muni.muni_check_digit, 'muni_stem')
+    add(muni.muni_check_digit_many, 'muni_stem', True)
+    add(muni.muni_exists, 'muni')
+    add(muni.muni_info, 'muni')
+    add(muni.muni_info_columns, 'muni', True)
+    add(muni.find_muni, 'muni_name')
+    add(muni.find_muni_prefix, 'muni_prefix')
+    add(muni.find_muni_fuzzy, 'muni_name', args=('SP', 1))
+
+    # enumeration is timed per valid identifier found in a range, and
+    # counting per range counted
+    for mod, kind in [(cnpj, 'cnpj'), (cpf, 'cpf'), (pis, 'pis'),
+                      (cei, 'cei')]:
+        func = getattr(mod, 'iter_valid_' + kind)
+        start = int(inputs[kind]['str'][0])
+        found = list(func(start, start + 20000))
+        name = '{0}.{1}[range]'.format(kind, func.__name__)
+        cases.append((name, lambda v, f=func, a=start: sum(
+            1 for _ in f(a, a + 20000)), found, True))
+        func = getattr(mod, 'count_valid_' + kind)
+        name = '{0}.{1}[range]'.format(kind, func.__name__)
+        ranges = [(int(k), int(k) * 2) for k in inputs[kind]['str']]
+        cases.append((name, lambda v, f=func: f(*v), ranges, False))
+
+    # random identifiers take no input, so they are timed per call
+    for mod, kind in [(cnpj, 'cnpj'), (cpf, 'cpf'), (pis, 'pis'),
+                      (cei, 'cei')]:
+        func = getattr(mod, 'random_' + kind)
+        name = '{0}.{1}[none]'.format(kind, func.__name__)
+        cases.append((name, lambda v, f=func: f(), [None] * 200, False))
+
+    # de-duplication of a stream where each CPF appears three times
+    cases.append(('dedupe.dedupe_stream[repeated]',
+                  lambda v: sum(1 for _ in dedupe.dedupe_stream(v)),
+                  inputs['cpf']['str'] * 3, True))
+
+    # profiling samples 1000 rows of an iterator of every shape of CNPJ
+    column = [k for values in inputs['cnpj'].values() for k in values]
+    cases.append(('quality.profile_column[mixed]',
+                  lambda v: quality.profile_column(iter(v), sample=1000),
+                  column * 10, True))
+
+    return cases
+
+
+def uncovered(cases):
+    """List public functions of the benchmarked modules without a case."""
+    covered = {name.split('[')[0].split('(')[0] for name, _, _, _ in cases}
+    missing = []
+    for mod in MODULES:
+        short = mod.__name__.split('.')[-1]
+        for name, obj in vars(mod).items():
+            if name.startswith('_') or not callable(obj):
+                continue
+            if getattr(obj, '__module__', None) != mod.__name__:
+                continue
+            if not (inspect.isfunction(obj) or inspect.isclass(obj)):
+                continue
+            if obj.__name__ != name or name in ('CNPJ', 'CEP', 'Municipio'):
+                continue
+            if '{0}.{1}'.format(short, name) not in covered:
+                missing.append('{0}.{1}'.format(short, name))
+    return missing
+
+
+def check_samples(inputs):
+    """List sample identifiers that validation gets wrong; run before the
+    timed cases so that checks are not timed.
+    """
+    wrong = []
+    for mod, kind in [(cnpj, 'cnpj'), (cpf, 'cpf'), (pis, 'pis'),
+                      (cei, 'cei'), (muni, 'muni')]:
+        validate = getattr(mod, 'validate_' + kind)
+        for shape, values in inputs[kind].items():
+            expected = shape not in ('missing', 'invalid')
+            wrong.extend('{0} {1}'.format(kind, v) for v in values
+                         if validate(v) is not expected)
+    return wrong
+
+
+def run_error(call, values, batch):
+    """Run a case once outside the timer, returning the TypeError or
+    ValueError it raises, or None if it runs.
+    """
+    try:
+        if batch:
+            call(values)
+        else:
+            for v in values:
+                call(v)
+    except (TypeError, ValueError) as e:
+        return e
+    return None
+
+
+def time_case(call, values, batch, repeat, min_time):
+    """Time a case, returning the best nanoseconds per input over repeat
+    rounds; each round loops over the inputs for at least min_time.
+    """
+    clock = time.perf_counter_ns
+    best = None
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            loops = 0
+            start = clock()
+            while True:
+                if batch:
+                    call(values)
+                else:
+                    for v in values:
+                        call(v)
+                loops += 1
+                elapsed = clock() - start
+                if elapsed >= min_time * 1e9:
+                    break
+            per_item = elapsed / (loops * len(values))
+            best = per_item if best is None else min(best, per_item)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best
+
+
+def compare(results, baseline, threshold):
+    """List cases slower than the baseline by more than threshold, as
+    (name, baseline ns, current ns, ratio) tuples.
+    """
+    slower = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        base = baseline[name]['ns_per_item']
+        ratio = result['ns_per_item'] / base
+        if ratio > 1 + threshold:
+            slower.append((name, base, result['ns_per_item'], ratio))
+    return slower
+
+
+def missing(results, baseline, text=''):
+    """List cases in the baseline whose name contains text but that have
+    no current result, because they were renamed, removed or now raise.
+    """
+    return sorted(name for name in baseline
+                  if text in name and name not in results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark brazilnum functions by input shape.')
+    parser.add_argument('-k', '--filter', default='',
+                        help='only run cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='rounds per case; the best round is kept')
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='minimum seconds per round')
+    parser.add_argument('--output', help='save results as JSON to a file')
+    parser.add_argument('--baseline', help='compare to results in a file')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='allowed slowdown versus baseline, e.g. 0.10')
+    parser.add_argument('--list', action='store_true',
+                        help='list cases without running them')
+    args = parser.parse_args(argv)
+
+    cases = [c for c in build_cases(build_inputs()) if args.filter in c[0]]
+    if args.list:
+        for name, _, values, batch in cases:
+            print(name)
+        return 0
+
+    for value in check_samples(build_inputs()):
+        print('warning: validation failed for sample {0}'.format(value),
+              file=sys.stderr)
+    for name in uncovered(cases) if not args.filter else []:
+        print('warning: no benchmark case for {0}'.format(name),
+              file=sys.stderr)
+
+    results = {}
+    width = max(len(c[0]) for c in cases) if cases else 0
+    for name, call, values, batch in cases:
+        error = run_error(call, values, batch)
+        if error is not None:
+            # e.g. formatting missing values raises TypeError
+            print('skipped {0}: {1}: {2}'.format(
+                name, type(error).__name__, error), file=sys.stderr)
+            continue
+        ns = time_case(call, values, batch, args.repeat, args.min_time)
+        results[name] = {'ns_per_item': ns, 'items': len(values),
+                         'batch': batch}
+        print('{0:<{1}} {2:>12.1f} ns'.format(name, width, ns))
+
+    if args.output:
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'platform': platform.platform(),
+                'date': datetime.now(timezone.utc).isoformat(),
+            },
+            'results': results,
+        }
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as fh:
+            baseline = json.load(fh)['results']
+        slower = compare(results, baseline, args.threshold)
+        for name, base, current, ratio in slower:
+            print('REGRESSION {0}: {1:.1f} ns -> {2:.1f} ns ({3:+.0%})'
+                  .format(name, base, current, ratio - 1))
+        lost = missing(results, baseline, args.filter)
+        for name in lost:
+            print('MISSING {0}: in the baseline but not run'.format(name))
+        if slower or lost:
+            return 1
+        print('No regressions above {0:.0%} versus {1}'
+              .format(args.threshold, args.baseline))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
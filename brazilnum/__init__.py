@@ -1,2 +1,5 @@
+from .backend import get_backend, set_backend
 
-__all__ = ['cnpj', 'cei', 'pis', 'cpf', 'cep', 'muni']
+__all__ = ['cnpj', 'cei', 'pis', 'cpf', 'cep', 'muni', 'uf', 'classify',
+           'metrics', 'batch', 'server', 'aio', 'backend', 'privacy', 'files',
+           'incremental', 'dedupe', 'quality', 'get_backend', 'set_backend']
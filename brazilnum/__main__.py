@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import sys
+
+from . import server
+from .backend import KERNEL_KINDS
+from .files import FORMATS, validate_file
+
+"""
+Command line interface: python -m brazilnum validate|serve ...
+
+"""
+
+
+def main(argv=None):
+    """Run a command; returns the exit status."""
+    parser = argparse.ArgumentParser(prog='python -m brazilnum')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    check = commands.add_parser(
+        'validate', help='validate a column of a CSV or Parquet file',
+        description='Validate a column of identifiers in a CSV or Parquet '
+                    'file, printing counts of rows by result as JSON.')
+    check.add_argument('path')
+    check.add_argument('--column', required=True,
+                       help='column name, or index with --no-header')
+    check.add_argument('--kind', required=True, choices=KERNEL_KINDS)
+    check.add_argument('--output', help='file (or directory, for Parquet) '
+                                        'for rows with results')
+    check.add_argument('--checkpoint', help='file to save progress in, '
+                                            'and resume from')
+    check.add_argument('--chunk-size', type=int, default=100000,
+                       help='rows per chunk of CSV files')
+    check.add_argument('--format', choices=FORMATS,
+                       help='file format; guessed from the extension')
+    check.add_argument('--delimiter', default=',')
+    check.add_argument('--encoding', default='utf-8')
+    check.add_argument('--no-header', dest='header', action='store_false',
+                       help='CSV file has no header row')
+
+    commands.add_parser('serve', add_help=False,
+                        help='run the validation server')
+
+    args, rest = parser.parse_known_args(argv)
+    if args.command == 'serve':
+        server.main(rest)
+        return 0
+    if rest:
+        parser.error('unrecognized arguments: {0}'.format(' '.join(rest)))
+
+    column = args.column if args.header else int(args.column)
+    try:
+        stats = validate_file(args.path, column, args.kind, args.output,
+                              args.checkpoint, args.chunk_size, args.format,
+                              args.delimiter, args.encoding, args.header)
+    except (TypeError, ValueError) as exc:
+        parser.error(str(exc))
+    json.dump(stats, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+import asyncio
+from collections import deque
+
+from .batch import get_kernel, run
+
+"""
+Asyncio helpers for validating identifiers without blocking the event loop.
+
+"""
+
+
+async def validate_stream(source, kind='cnpj', chunk_size=1000,
+                          executor=None, max_in_flight=4, op='validate'):
+    """Validate identifiers from an async iterable in chunks.
+
+    Values are collected into chunks of chunk_size, and each chunk runs in
+    an executor (the event loop's default thread pool unless another
+    executor is given; a ProcessPoolExecutor also works). At most
+    max_in_flight chunks run at once; when that many are running, no
+    more values are read from source until the oldest chunk is done.
+
+    Yields (values, results) tuples, one per chunk, in the order of the
+    source. Other batch operations ('explain', 'format', 'pad') can be
+    used instead of validation with the op argument.
+    """
+    get_kernel(op, kind)  # fail early for unsupported operations
+    if max_in_flight < 1:
+        raise ValueError('max_in_flight must be at least 1')
+    loop = asyncio.get_running_loop()
+    in_flight = deque()
+    chunk = []
+    try:
+        async for value in _aiter(source):
+            chunk.append(value)
+            if len(chunk) < chunk_size:
+                continue
+            in_flight.append((chunk, loop.run_in_executor(
+                executor, run, op, kind, chunk)))
+            chunk = []
+            if len(in_flight) >= max_in_flight:
+                values, future = in_flight.popleft()
+                yield values, await future
+        if chunk:
+            in_flight.append((chunk, loop.run_in_executor(
+                executor, run, op, kind, chunk)))
+        while in_flight:
+            values, future = in_flight.popleft()
+            yield values, await future
+    finally:
+        # the consumer stopped early, or a chunk failed
+        for _, future in in_flight:
+            future.cancel()
+
+
+async def _aiter(source):
+    """Iterate over an async iterable, or a regular iterable."""
+    if hasattr(source, '__aiter__'):
+        async for value in source:
+            yield value
+    else:
+        for value in source:
+            yield value
@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+
+import os
+import threading
+import warnings
+
+from .util import DV1_MISMATCH, DV2_MISMATCH, VALID
+
+"""
+Compute backends for the check-digit kernels used by batch functions.
+
+A kernel takes a list of rows, one per identifier, each a cleaned and
+padded identifier string including the check digits, and returns a Reason
+code per row: VALID, DV1_MISMATCH or DV2_MISMATCH. The 'python'
+backend checks each identifier as it is cleaned; 'numpy' and 'numba'
+check all rows of a batch at once. Every backend gives the same results.
+
+The backend is chosen with set_backend, or the BRAZILNUM_BACKEND
+environment variable; by default the fastest installed backend is used.
+While brazilnum.metrics is enabled, batch functions check identifiers one
+by one on every backend, so that each identifier is recorded.
+
+"""
+
+BACKENDS = ('python', 'numpy', 'numba')
+KERNEL_KINDS = ('cnpj', 'cpf', 'pis', 'cei', 'muni')
+
+# plain ints, so numba can compile them as constants
+_DV1 = int(DV1_MISMATCH)
+_DV2 = int(DV2_MISMATCH)
+
+_backend = None  # name of the active backend, resolved on first use
+_kernels = {}  # kernels by backend name, loaded on first use
+_lock = threading.Lock()
+_scalar_only = False  # set while metrics are enabled
+
+
+def available_backends():
+    """List the backends whose packages are installed."""
+    found = ['python']
+    for name in BACKENDS[1:]:
+        try:
+            __import__(name)
+        except ImportError:
+            continue
+        found.append(name)
+    return found
+
+
+def set_backend(name='auto'):
+    """Choose the compute backend for check-digit kernels.
+
+    With name='auto', the fastest installed backend is used. A backend
+    whose packages are not installed falls back to the next fastest with
+    a RuntimeWarning. Returns the name of the backend in use.
+    """
+    global _backend
+    if name != 'auto' and name not in BACKENDS:
+        raise ValueError('Unknown backend: {0}'.format(name))
+    available = available_backends()
+    if name == 'auto':
+        chosen = available[-1]
+    elif name in available:
+        chosen = name
+    else:
+        chosen = available[-1]
+        warnings.warn('Backend {0} is not installed, using {1}'
+                      .format(name, chosen), RuntimeWarning, stacklevel=2)
+    kernels(chosen)  # load before switching, so errors leave no trace
+    with _lock:
+        _backend = chosen
+    return chosen
+
+
+def get_backend():
+    """Find the name of the compute backend in use."""
+    if _backend is None:
+        set_backend(os.environ.get('BRAZILNUM_BACKEND', 'auto'))
+    return _backend
+
+
+def kernels(name=None):
+    """Find the check-digit kernels of a backend, by kind of identifier."""
+    name = name or get_backend()
+    found = _kernels.get(name)
+    if found is None:
+        with _lock:
+            found = _kernels.get(name)
+            if found is None:
+                found = _LOADERS[name]()
+                _kernels[name] = found
+    return found
+
+
+def check_rows(kind, rows, backend=None):
+    """Check rows of clean identifiers with a backend's kernel, returning
+    a list of Reason codes; see the module description.
+    """
+    return list(kernels(backend)[kind](rows))
+
+
+def _batch_kernel(kind):
+    """Kernel for batch functions, or None to check identifiers one by
+    one, as the python backend does.
+    """
+    name = _backend or get_backend()
+    if name == 'python' or _scalar_only:
+        return None
+    return kernels(name)[kind]
+
+
+def _explain_rows(prepared, kernel):
+    """Combine (reason, row) pairs into Reason codes, checking every row
+    that is not None with one call to kernel.
+    """
+    codes = bytearray(len(prepared))
+    where, rows = [], []
+    for i, (reason, row) in enumerate(prepared):
+        codes[i] = reason
+        if row is not None:
+            where.append(i)
+            rows.append(row)
+    if rows:
+        for i, code in zip(where, kernel(rows)):
+            if code:
+                codes[i] = code
+    return codes
+
+
+def _prepared_codes(kind, prepared):
+    """Combine (reason, row) pairs into Reason codes as _explain_rows,
+    with the python kernel when batch functions check one by one.
+    """
+    return _explain_rows(prepared,
+                         _batch_kernel(kind) or kernels('python')[kind])
+
+
+def _preparers():
+    """Functions that clean and pad identifiers of each kind for checking,
+    as prepare(value, autopad) -> (reason, row); see _explain_rows.
+    """
+    from .cei import _prepare_cei
+    from .cnpj import _prepare_cnpj
+    from .cpf import _prepare_cpf
+    from .muni import _prepare_muni
+    from .pis import _prepare_pis
+
+    return {
+        'cnpj': _prepare_cnpj,
+        'cpf': _prepare_cpf,
+        'pis': _prepare_pis,
+        'cei': _prepare_cei,
+        'muni': lambda k, autopad=True: _prepare_muni(k),  # never padded
+    }
+
+
+def _values(rows, width):
+    """Character values of clean identifiers of the same width, as from
+    cnpj._char_value, in a numpy array with one row per identifier.
+    """
+    import numpy as np
+    chars = np.frombuffer(''.join(rows).encode('ascii'), dtype=np.uint8)
+    return chars.reshape(-1, width).astype(np.int64) - 48
+
+
+def _python_kernels():
+    from .cei import _cei_check
+    from .cnpj import _char_value, _cnpj_check
+    from .cpf import _cpf_check
+    from .muni import _muni_check
+    from .pis import _pis_check
+
+    def cnpj(rows):
+        out = []
+        for row in rows:
+            first, second = _cnpj_check([_char_value(k) for k in row[:12]])
+            out.append(DV1_MISMATCH if first != int(row[12]) else
+                       DV2_MISMATCH if second != int(row[13]) else VALID)
+        return out
+
+    def cpf(rows):
+        out = []
+        for row in rows:
+            first, second = _cpf_check([int(k) for k in row[:9]])
+            out.append(DV1_MISMATCH if first != int(row[9]) else
+                       DV2_MISMATCH if second != int(row[10]) else VALID)
+        return out
+
+    def single(check, length):
+        def kernel(rows):
+            return [VALID if check([int(k) for k in row[:length]]) ==
+                    int(row[length]) else DV1_MISMATCH for row in rows]
+        return kernel
+
+    return {
+        'cnpj': cnpj,
+        'cpf': cpf,
+        'pis': single(_pis_check, 10),
+        'cei': single(_cei_check, 11),
+        'muni': single(_muni_check, 6),
+    }
+
+
+def _numpy_kernels():
+    import numpy as np
+
+    from .cei import CEI_WEIGHTS
+    from .cnpj import CNPJ_FIRST_WEIGHTS, CNPJ_SECOND_WEIGHTS
+    from .cpf import CPF_WEIGHTS
+    from .muni import MUNI_WEIGHTS
+    from .pis import PIS_WEIGHTS
+
+    cnpj_first = np.array(CNPJ_FIRST_WEIGHTS, dtype=np.int64)
+    cnpj_second = np.array(CNPJ_SECOND_WEIGHTS[:12], dtype=np.int64)
+    cpf_weights = np.array(CPF_WEIGHTS, dtype=np.int64)
+    pis_weights = np.array(PIS_WEIGHTS, dtype=np.int64)
+    cei_weights = np.array(CEI_WEIGHTS, dtype=np.int64)
+    muni_weights = np.array(MUNI_WEIGHTS, dtype=np.int64)
+
+    def codes(first, second, a, i):
+        out = np.where(first != a[:, i], DV1_MISMATCH, VALID)
+        if second is not None:
+            out = np.where((out == VALID) & (second != a[:, i + 1]),
+                           DV2_MISMATCH, out)
+        return out.astype(np.uint8).tolist()
+
+    def cnpj(rows):
+        a = _values(rows, 14)
+        cs = a[:, :12] @ cnpj_first % 11
+        first = np.where(cs < 2, 0, 11 - cs)
+        cs = (a[:, :12] @ cnpj_second + 2 * first) % 11
+        return codes(first, np.where(cs < 2, 0, 11 - cs), a, 12)
+
+    def cpf(rows):
+        a = _values(rows, 11)
+        first = a[:, :9] @ cpf_weights % 11 % 10
+        second = (a[:, 1:9] @ cpf_weights[:8] + 9 * first) % 11 % 10
+        return codes(first, second, a, 9)
+
+    def pis(rows):
+        a = _values(rows, 11)
+        cs = a[:, :10] @ pis_weights % 11
+        return codes(np.where(cs < 2, 0, 11 - cs), None, a, 10)
+
+    def cei(rows):
+        a = _values(rows, 12)
+        digsum = a[:, :11] @ cei_weights % 100
+        modulo = (digsum // 10 + digsum % 10) % 10
+        return codes(np.where(modulo == 0, 0, 10 - modulo), None, a, 11)
+
+    def muni(rows):
+        a = _values(rows, 7)
+        digmul = a[:, :6] * muni_weights
+        digmul = np.where(digmul < 10, digmul, 1 + digmul % 10)
+        modulo = digmul.sum(axis=1) % 10
+        return codes(np.where(modulo == 0, 0, 10 - modulo), None, a, 6)
+
+    return {'cnpj': cnpj, 'cpf': cpf, 'pis': pis, 'cei': cei, 'muni': muni}
+
+
+def _numba_kernels():
+    import numba
+    import numpy as np
+
+    from .cei import CEI_WEIGHTS
+    from .cnpj import CNPJ_FIRST_WEIGHTS, CNPJ_SECOND_WEIGHTS
+    from .cpf import CPF_WEIGHTS
+    from .muni import MUNI_WEIGHTS
+    from .pis import PIS_WEIGHTS
+
+    cnpj_first = np.array(CNPJ_FIRST_WEIGHTS, dtype=np.int64)
+    cnpj_second = np.array(CNPJ_SECOND_WEIGHTS[:12], dtype=np.int64)
+    cpf_weights = np.array(CPF_WEIGHTS, dtype=np.int64)
+    pis_weights = np.array(PIS_WEIGHTS, dtype=np.int64)
+    cei_weights = np.array(CEI_WEIGHTS, dtype=np.int64)
+    muni_weights = np.array(MUNI_WEIGHTS, dtype=np.int64)
+
+    @numba.njit(nogil=True)
+    def cnpj_codes(a, w1, w2):
+        out = np.zeros(a.shape[0], dtype=np.uint8)
+        for r in range(a.shape[0]):
+            s1 = 0
+            s2 = 0
+            for i in range(12):
+                s1 += w1[i] * a[r, i]
+                s2 += w2[i] * a[r, i]
+            cs = s1 % 11
+            first = 0 if cs < 2 else 11 - cs
+            cs = (s2 + 2 * first) % 11
+            second = 0 if cs < 2 else 11 - cs
+            if first != a[r, 12]:
+                out[r] = _DV1
+            elif second != a[r, 13]:
+                out[r] = _DV2
+        return out
+
+    @numba.njit(nogil=True)
+    def cpf_codes(a, w):
+        out = np.zeros(a.shape[0], dtype=np.uint8)
+        for r in range(a.shape[0]):
+            s1 = 0
+            s2 = 0
+            for i in range(9):
+                s1 += w[i] * a[r, i]
+            for i in range(8):
+                s2 += w[i] * a[r, i + 1]
+            first = s1 % 11 % 10
+            second = (s2 + 9 * first) % 11 % 10
+            if first != a[r, 9]:
+                out[r] = _DV1
+            elif second != a[r, 10]:
+                out[r] = _DV2
+        return out
+
+    @numba.njit(nogil=True)
+    def pis_codes(a, w):
+        out = np.zeros(a.shape[0], dtype=np.uint8)
+        for r in range(a.shape[0]):
+            s = 0
+            for i in range(10):
+                s += w[i] * a[r, i]
+            cs = s % 11
+            if (0 if cs < 2 else 11 - cs) != a[r, 10]:
+                out[r] = _DV1
+        return out
+
+    @numba.njit(nogil=True)
+    def cei_codes(a, w):
+        out = np.zeros(a.shape[0], dtype=np.uint8)
+        for r in range(a.shape[0]):
+            s = 0
+            for i in range(11):
+                s += w[i] * a[r, i]
+            s = s % 100
+            modulo = (s // 10 + s % 10) % 10
+            if (0 if modulo == 0 else 10 - modulo) != a[r, 11]:
+                out[r] = _DV1
+        return out
+
+    @numba.njit(nogil=True)
+    def muni_codes(a, w):
+        out = np.zeros(a.shape[0], dtype=np.uint8)
+        for r in range(a.shape[0]):
+            s = 0
+            for i in range(6):
+                n = w[i] * a[r, i]
+                s += n if n < 10 else 1 + n % 10
+            modulo = s % 10
+            if (0 if modulo == 0 else 10 - modulo) != a[r, 6]:
+                out[r] = _DV1
+        return out
+
+    def wrap(func, width, *weights):
+        def kernel(rows):
+            return func(_values(rows, width), *weights).tolist()
+        return kernel
+
+    return {
+        'cnpj': wrap(cnpj_codes, 14, cnpj_first, cnpj_second),
+        'cpf': wrap(cpf_codes, 11, cpf_weights),
+        'pis': wrap(pis_codes, 11, pis_weights),
+        'cei': wrap(cei_codes, 12, cei_weights),
+        'muni': wrap(muni_codes, 7, muni_weights),
+    }
+
+
+_LOADERS = {
+    'python': _python_kernels,
+    'numpy': _numpy_kernels,
+    'numba': _numba_kernels,
+}
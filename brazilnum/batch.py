@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from . import cei, cep, cnpj, cpf, muni, pis
+from .util import is_missing
+
+"""
+Batch functions for every kind of identifier, looked up by name.
+
+"""
+
+KINDS = ('cnpj', 'cpf', 'pis', 'cei', 'muni', 'cep')
+OPERATIONS = ('validate', 'explain', 'format', 'pad', 'mask')
+
+
+def _each(func):
+    """Make a batch function that applies func to each value, returning
+    None for missing values and values that raise ValueError.
+    """
+    def batch(values):
+        out = []
+        for value in values:
+            if is_missing(value):
+                out.append(None)
+                continue
+            try:
+                out.append(func(value))
+            except ValueError:
+                out.append(None)
+        return out
+    return batch
+
+
+# batch functions by (operation, kind); each takes a list of values and
+# returns a list of results of the same length
+KERNELS = {
+    ('validate', 'cnpj'): cnpj.validate_cnpj_many,
+    ('validate', 'cpf'): cpf.validate_cpf_many,
+    ('validate', 'pis'): pis.validate_pis_many,
+    ('validate', 'cei'): cei.validate_cei_many,
+    ('validate', 'muni'): muni.validate_muni_many,
+    ('explain', 'cnpj'): cnpj.explain_cnpj_many,
+    ('explain', 'cpf'): cpf.explain_cpf_many,
+    ('explain', 'pis'): pis.explain_pis_many,
+    ('explain', 'cei'): cei.explain_cei_many,
+    ('explain', 'muni'): muni.explain_muni_many,
+    ('format', 'cnpj'): cnpj.format_cnpj_many,
+    ('format', 'cpf'): cpf.format_cpf_many,
+    ('format', 'pis'): pis.format_pis_many,
+    ('format', 'cei'): cei.format_cei_many,
+    ('format', 'cep'): cep.format_cep_many,
+    ('pad', 'cnpj'): cnpj.pad_cnpj_many,
+    ('pad', 'cpf'): cpf.pad_cpf_many,
+    ('pad', 'pis'): pis.pad_pis_many,
+    ('pad', 'cei'): cei.pad_cei_many,
+    ('mask', 'cnpj'): _each(cnpj.mask_cnpj),
+    ('mask', 'cpf'): _each(cpf.mask_cpf),
+    ('mask', 'pis'): _each(pis.mask_pis),
+}
+
+
+def get_kernel(op, kind):
+    """Find the batch function for an operation and kind of identifier."""
+    try:
+        return KERNELS[(op, kind)]
+    except KeyError:
+        raise ValueError('Unsupported operation for {0}: {1}'
+                         .format(kind, op))
+
+
+def run(op, kind, values):
+    """Apply an operation to a list of identifiers of one kind.
+
+    Returns a list with one result per identifier; Reason codes from the
+    explain operation are returned as integers.
+    """
+    return list(get_kernel(op, kind)(values))
+
+
+def run_threaded(op, kind, values, workers=None, chunk_size=None,
+                 executor=None):
+    """Apply an operation to a list of identifiers of one kind, split into
+    chunks that run on a pool of threads; see run.
+
+    Threads run in parallel on free-threaded Python builds. Otherwise,
+    only the check-digit kernels of the numba backend release the GIL,
+    while values are cleaned and padded under it. By default, the values
+    are split evenly over one thread per CPU; pass an executor to reuse a
+    pool of threads.
+    """
+    kernel = get_kernel(op, kind)
+    values = list(values)
+    workers = workers or os.cpu_count() or 1
+    if not chunk_size:
+        chunk_size = max(1, -(-len(values) // workers))  # ceiling division
+    chunks = [values[i:i + chunk_size]
+              for i in range(0, len(values), chunk_size)]
+    if len(chunks) <= 1:
+        return list(kernel(values))
+    if executor is None:
+        with ThreadPoolExecutor(min(workers, len(chunks))) as pool:
+            parts = list(pool.map(kernel, chunks))
+    else:
+        parts = executor.map(kernel, chunks)
+    return [r for part in parts for r in part]
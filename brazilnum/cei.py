@@ -3,7 +3,13 @@
 import re
 import random
 
-from .util import clean_id, is_missing, pad_id
+from .backend import _batch_kernel, _explain_rows, _prepared_codes
+from .uf import UF_CODES
+from .util import (
+    ALL_ZEROS, DV1_MISMATCH, MISSING, PADDED, TOO_LONG, TOO_SHORT, VALID,
+    _count_complete, _id_range, _stem_sums_many, _weighted_sums, clean_id,
+    is_missing, pad_id, pad_id_many
+)
 
 """
 Functions for working with Brazilian CEI identifiers.
@@ -20,24 +26,35 @@ def validate_cei(cei, autopad=True):
     Missing values (None or NaN) are considered invalid; other non-str,
     non-int input raises TypeError.
     """
-    if is_missing(cei):
-        return False
-    cei = clean_id(cei)
+    return _explain_cei(cei, autopad) <= PADDED
 
-    # all complete CEI are 12 digits long
-    if len(cei) < 12:
-        if not autopad:
-            return False
-        cei = pad_cei(cei)
 
-    elif len(cei) > 12:
-        return False
+def validate_cei_many(ceis, autopad=True):
+    """Check whether each CEI in an iterable is valid."""
+    kernel = _batch_kernel('cei')
+    if kernel is None:
+        return [_explain_cei(k, autopad) <= PADDED for k in ceis]
+    prepared = [_prepare_cei(k, autopad) for k in ceis]
+    return [code <= PADDED for code in _explain_rows(prepared, kernel)]
 
-    if cei == '000000000000':
-        return False
 
-    digits = [int(k) for k in cei]  # identifier digits
-    return _cei_check(digits[:-1]) == digits[-1]
+def explain_cei(cei, autopad=True):
+    """Find why a CEI is valid or invalid, as a Reason code.
+
+    Missing values (None or NaN) are Reason.MISSING; other non-str,
+    non-int input raises TypeError.
+    """
+    return _explain_cei(cei, autopad)
+
+
+def explain_cei_many(ceis, autopad=True):
+    """Find Reason codes for an iterable of CEI, as a bytearray with one
+    code per CEI; use Reason(code) to get the name of a code.
+    """
+    kernel = _batch_kernel('cei')
+    if kernel is None:
+        return bytearray([_explain_cei(k, autopad) for k in ceis])
+    return _explain_rows([_prepare_cei(k, autopad) for k in ceis], kernel)
 
 
 def cei_check_digit(cei):
@@ -49,11 +66,32 @@ def cei_check_digit(cei):
     return _cei_check(digits)
 
 
+def cei_check_digit_many(ceis):
+    """Find the check digit of each CEI in an iterable, like
+    cei_check_digit, as a list; missing values and CEI shorter than 11
+    digits give None.
+    """
+    out = []
+    for sums in _stem_sums_many(ceis, 11, [CEI_WEIGHTS]):
+        if sums is None:
+            out.append(None)
+            continue
+        modulo = sum(divmod(sums[0] % 100, 10)) % 10  # as in _cei_check
+        out.append(0 if modulo == 0 else 10 - modulo)
+    return out
+
+
 def format_cei(cei):
     """Applies typical 00.000.00000/00 formatting to CEI."""
-    cei = pad_cei(cei)
-    fmt = '{0}.{1}.{2}/{3}'
-    return fmt.format(cei[:2], cei[2:5], cei[5:10], cei[10:])
+    return _format_cei(cei)
+
+
+def format_cei_many(ceis):
+    """Format each CEI in an iterable like format_cei, as a list; missing
+    values give None.
+    """
+    return [None if k is None else '%s.%s.%s/%s' % (
+        k[:2], k[2:5], k[5:10], k[10:]) for k in pad_id_many(ceis, 12)]
 
 
 def pad_cei(cei, validate=False):
@@ -64,6 +102,34 @@ def pad_cei(cei, validate=False):
     return padded
 
 
+def pad_cei_many(ceis):
+    """Pad each CEI in an iterable like pad_cei, as a list; missing values
+    give None.
+    """
+    return pad_id_many(ceis, 12)
+
+
+def enrich_cei_columns(ceis, autopad=True):
+    """Validate an iterable of CEI and find their attributes, as a dict
+    of columns: the padded cei, valid, and the uf of the IBGE state code
+    in the first two digits, or None if they are not a state code.
+
+    Attributes are None for missing values and CEI that are too short
+    (with autopad=False), too long or all zeros (Reason MISSING,
+    TOO_SHORT, TOO_LONG or ALL_ZEROS), but are found for CEI with a wrong
+    check digit.
+    """
+    prepared = [_prepare_cei(k, autopad) for k in ceis]
+    codes = _prepared_codes('cei', prepared)
+    padded = [k for _, k in prepared]
+    get = UF_CODES.get
+    return {
+        'cei': padded,
+        'valid': [code <= PADDED for code in codes],
+        'uf': [None if k is None else get(k[:2]) for k in padded],
+    }
+
+
 def random_cei(formatted=True):
     """Create a random, valid CEI identifier."""
     uf = random.randint(11, 53)
@@ -74,6 +140,74 @@ def random_cei(formatted=True):
     return cei
 
 
+def iter_valid_cei(start, stop, formatted=False):
+    """Iterate over the valid CEI in range(start, stop), in order, as
+    12-digit strings.
+
+    The check digit is updated as the 11-digit stem increases instead of
+    recalculated, so each CEI takes constant time.
+    """
+    start, stop = _id_range(start, stop, 12)
+    if start >= stop:
+        return
+    stems = _weighted_sums(start // 10, (stop - 1) // 10 + 1, 11,
+                           [CEI_WEIGHTS])
+    for stem, (digsum,) in stems:
+        modulo = sum(divmod(digsum % 100, 10)) % 10  # as in _cei_check
+        cei = stem * 10 + (0 if modulo == 0 else 10 - modulo)
+        if start <= cei < stop:
+            yield format_cei(cei) if formatted else '%012i' % cei
+
+
+def count_valid_cei(start, stop):
+    """Count the valid CEI in range(start, stop), in constant time."""
+    start, stop = _id_range(start, stop, 12)
+    return _count_complete(start, stop, 10, _complete_cei)
+
+
+def _explain_cei(cei, autopad=True):
+    """Find Reason code of a CEI; see explain_cei."""
+    reason, cei = _prepare_cei(cei, autopad)
+    if cei is None:
+        return reason
+    digits = [int(k) for k in cei]  # identifier digits
+    if _cei_check(digits[:-1]) != digits[-1]:
+        return DV1_MISMATCH
+    return reason
+
+
+def _prepare_cei(cei, autopad=True):
+    """Clean a CEI for checking, as (reason, cei); cei is None when
+    the reason is known without the check digit.
+    """
+    if is_missing(cei):
+        return MISSING, None
+    cei = clean_id(cei)
+    reason = VALID
+
+    # all complete CEI are 12 digits long
+    if len(cei) < 12:
+        if not autopad:
+            return TOO_SHORT, None
+        cei = pad_cei(cei)
+        reason = PADDED
+
+    elif len(cei) > 12:
+        return TOO_LONG, None
+
+    if cei == '000000000000':
+        return ALL_ZEROS, None
+
+    return reason, cei
+
+
+def _format_cei(cei):
+    """Format a CEI; see format_cei."""
+    cei = pad_cei(cei)
+    fmt = '{0}.{1}.{2}/{3}'
+    return fmt.format(cei[:2], cei[2:5], cei[5:10], cei[10:])
+
+
 def _cei_check(digits):
     """Calculate check digit from iterable of integers."""
     digsum = sum(w * k for w, k in zip(CEI_WEIGHTS, digits))
@@ -81,3 +215,8 @@ def _cei_check(digits):
     if modulo == 0:
         return 0
     return 10 - modulo
+
+
+def _complete_cei(stem):
+    """Find the valid CEI of an 11-digit stem, as an integer."""
+    return stem * 10 + _cei_check([int(k) for k in '%011i' % stem])
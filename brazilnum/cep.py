@@ -1,7 +1,9 @@
 
+from bisect import bisect_right
 from collections import namedtuple
 
-from .util import clean_id
+from .uf import UF_REGIONS
+from .util import clean_id, is_missing
 
 """
 Functions for working with Brazilian zipcodes.
@@ -12,20 +14,71 @@ Functions for working with Brazilian zipcodes.
 CEP = namedtuple('CEP', ['cep', 'region', 'subregion', 'sector', 'subsector',
                          'division', 'suffix'])
 
+# ranges of CEP assigned to each state by Correios, as inclusive
+# (first, last, uf) tuples sorted by first CEP; a few states have two
+# ranges, and CEP outside every range (e.g. 00000-000) have no state
+CEP_RANGES = [
+    (1000000, 19999999, 'SP'),
+    (20000000, 28999999, 'RJ'),
+    (29000000, 29999999, 'ES'),
+    (30000000, 39999999, 'MG'),
+    (40000000, 48999999, 'BA'),
+    (49000000, 49999999, 'SE'),
+    (50000000, 56999999, 'PE'),
+    (57000000, 57999999, 'AL'),
+    (58000000, 58999999, 'PB'),
+    (59000000, 59999999, 'RN'),
+    (60000000, 63999999, 'CE'),
+    (64000000, 64999999, 'PI'),
+    (65000000, 65999999, 'MA'),
+    (66000000, 68899999, 'PA'),
+    (68900000, 68999999, 'AP'),
+    (69000000, 69299999, 'AM'),
+    (69300000, 69399999, 'RR'),
+    (69400000, 69899999, 'AM'),
+    (69900000, 69999999, 'AC'),
+    (70000000, 72799999, 'DF'),
+    (72800000, 72999999, 'GO'),
+    (73000000, 73699999, 'DF'),
+    (73700000, 76799999, 'GO'),
+    (76800000, 76999999, 'RO'),
+    (77000000, 77999999, 'TO'),
+    (78000000, 78899999, 'MT'),
+    (79000000, 79999999, 'MS'),
+    (80000000, 87999999, 'PR'),
+    (88000000, 89999999, 'SC'),
+    (90000000, 99999999, 'RS'),
+]
+
+# interval boundaries for binary search over CEP_RANGES
+_CEP_STARTS = [k[0] for k in CEP_RANGES]
+_CEP_ENDS = [k[1] for k in CEP_RANGES]
+_CEP_UFS = [k[2] for k in CEP_RANGES]
+
 
 def format_cep(cep):
     """Applies typical 00000-000 formatting to CEP."""
-    cep = clean_id(cep)
-    dig = len(cep)
+    return _format_cep(cep)
 
-    if dig == 4 or dig == 5:
-        cep = '0'*(5-dig) + cep + '000'
-    elif dig == 7 or dig == 8:
-        cep = '0'*(8-dig) + cep
-    else:
-        raise ValueError('Invalid CEP code: {0}'.format(cep))
 
-    return '{0}-{1}'.format(cep[:-3], cep[-3:])
+def format_cep_many(ceps):
+    """Format each CEP in an iterable like format_cep, as a list; missing
+    values and CEP of the wrong length give None.
+    """
+    out = []
+    for k in ceps:
+        if k.__class__ is not str or len(k) != 8 or not k.isdigit() \
+                or not k.isascii():
+            if is_missing(k):
+                out.append(None)
+                continue
+            try:
+                k = _pad_cep(k)
+            except ValueError:
+                out.append(None)
+                continue
+        out.append(k[:5] + '-' + k[5:])
+    return out
 
 
 def parse_cep(cep, numeric=True):
@@ -41,3 +94,101 @@ def parse_cep(cep, numeric=True):
         suffix = fmtcep[-3:]
 
     return CEP(cep, geo[0], geo[1], geo[2], geo[3], geo[4], suffix)
+
+
+def parse_cep_columns(ceps, numeric=True):
+    """Parse an iterable of CEP into a dict of columns, one per CEP field.
+
+    Equivalent to transposing [parse_cep(k, numeric) for k in ceps], but
+    without building a namedtuple per CEP. Missing values (None or NaN)
+    are None in every column; other input raises the same errors as
+    parse_cep.
+    """
+    padded = [None if is_missing(k) else _pad_cep(k) for k in ceps]
+    if numeric:
+        ints = [None if k is None else int(k) for k in padded]
+        cols = [ints]
+        for div in (10000000, 1000000, 100000, 10000, 1000):
+            cols.append([None if k is None else k // div for k in ints])
+        cols.append([None if k is None else k % 1000 for k in ints])
+    else:
+        fmtceps = [None if k is None else k[:5] + '-' + k[5:]
+                   for k in padded]
+        cols = [fmtceps]
+        for i in range(1, 6):
+            cols.append([None if k is None else k[:i] for k in padded])
+        cols.append([None if k is None else k[5:] for k in padded])
+    return dict(zip(CEP._fields, cols))
+
+
+def cep_to_uf(cep):
+    """Find the state (UF) of a CEP, or None if it is outside all ranges.
+
+    Missing values (None or NaN) return None; CEP that cannot be
+    formatted raise the same errors as format_cep.
+    """
+    if is_missing(cep):
+        return None
+    return _cep_uf(int(_pad_cep(cep)))
+
+
+def cep_to_uf_many(ceps):
+    """Find the state (UF) of each CEP in an iterable.
+
+    Unlike cep_to_uf, CEP with an invalid number of digits return None
+    instead of raising ValueError, so a single bad value does not stop a
+    large batch. Unsupported input types still raise TypeError.
+    """
+    return [_cep_uf(k) if k is not None else None for k in _cep_ints(ceps)]
+
+
+def cep_to_region(cep):
+    """Find the IBGE region of a CEP, or None if it has no state."""
+    return UF_REGIONS.get(cep_to_uf(cep))
+
+
+def cep_to_region_many(ceps):
+    """Find the IBGE region of each CEP in an iterable."""
+    get = UF_REGIONS.get
+    return [get(k) for k in cep_to_uf_many(ceps)]
+
+
+def _format_cep(cep):
+    """Format a CEP; see format_cep."""
+    cep = _pad_cep(cep)
+    return '{0}-{1}'.format(cep[:-3], cep[-3:])
+
+
+def _pad_cep(cep):
+    """Clean CEP and pad it to 8 digits."""
+    cep = clean_id(cep)
+    dig = len(cep)
+
+    if dig == 4 or dig == 5:
+        cep = '0'*(5-dig) + cep + '000'
+    elif dig == 7 or dig == 8:
+        cep = '0'*(8-dig) + cep
+    else:
+        raise ValueError('Invalid CEP code: {0}'.format(cep))
+
+    return cep
+
+
+def _cep_ints(ceps):
+    """Convert CEP to integers, with None for missing or invalid CEP."""
+    for cep in ceps:
+        if is_missing(cep):
+            yield None
+            continue
+        try:
+            yield int(_pad_cep(cep))
+        except ValueError:
+            yield None
+
+
+def _cep_uf(cep):
+    """Binary search for the state whose range contains an integer CEP."""
+    i = bisect_right(_CEP_STARTS, cep) - 1
+    if i >= 0 and cep <= _CEP_ENDS[i]:
+        return _CEP_UFS[i]
+    return None
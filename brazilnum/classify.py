@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+from collections import namedtuple
+
+from .cei import _cei_check
+from .cnpj import CNPJ_PATTERN, _char_value, _cnpj_check
+from .cpf import _cpf_check
+from .muni import SHIM, _muni_check
+from .pis import _pis_check
+from .util import NONDIGIT, clean_alphanumeric_id, is_missing
+
+"""
+Functions for guessing which kind of identifier a value is.
+
+"""
+
+KINDS = ('cnpj', 'cpf', 'pis', 'cei', 'muni')
+
+Classification = namedtuple('Classification', ['total', 'missing',
+                                               'unmatched', 'counts', 'best'])
+
+
+def classify_identifier(identifier, autopad=True):
+    """Find the kinds of identifier for which a value is valid.
+
+    Returns a frozenset of kinds ('cnpj', 'cpf', 'pis', 'cei', 'muni'),
+    the same kinds for which validate_cnpj, validate_cpf, etc. return True.
+    The value is cleaned once and its digits are shared by every check.
+    Many values are valid for more than one kind, e.g. about 1 in 11 valid
+    CPF is also a valid PIS/PASEP.
+
+    Missing values (None or NaN) match no kind; other non-str, non-int
+    input raises TypeError.
+    """
+    if is_missing(identifier):
+        return frozenset()
+    return frozenset(_classify(clean_alphanumeric_id(identifier), autopad))
+
+
+def classify_column(identifiers, autopad=True):
+    """Count the kinds of identifier for which the values of a column are
+    valid, and guess the kind of the column.
+
+    Returns a Classification with the number of values, missing values,
+    and values valid for no kind, a dict with the number of values valid
+    for each kind, and the kind with the most valid values (None if no
+    value is valid for any kind).
+    """
+    total = missing = unmatched = 0
+    counts = dict.fromkeys(KINDS, 0)
+    for identifier in identifiers:
+        total += 1
+        if is_missing(identifier):
+            missing += 1
+            continue
+        kinds = _classify(clean_alphanumeric_id(identifier), autopad)
+        if not kinds:
+            unmatched += 1
+        for kind in kinds:
+            counts[kind] += 1
+    # ties go to the kind listed first in KINDS
+    best = max(KINDS, key=lambda k: counts[k])
+    if counts[best] == 0:
+        best = None
+    return Classification(total, missing, unmatched, counts, best)
+
+
+def _classify(identifier, autopad):
+    """List kinds for which a cleaned, uppercase identifier is valid."""
+    kinds = []
+
+    # CNPJ are the only identifiers that may contain letters
+    cnpj = identifier
+    if len(cnpj) < 14 and autopad:
+        cnpj = cnpj.zfill(14)
+    if CNPJ_PATTERN.match(cnpj) and cnpj != '00000000000000':
+        values = [_char_value(k) for k in cnpj]
+        if _cnpj_check(values[:12]) == (values[12], values[13]):
+            kinds.append('cnpj')
+
+    # other identifiers drop letters, just as clean_id does
+    if not identifier.isdigit():
+        identifier = NONDIGIT.sub('', identifier)
+    size = len(identifier)
+    if size > 12 or (size < 7 and not autopad):
+        return kinds
+    digits = [ord(k) - 48 for k in identifier]
+
+    if size == 7 and digits[0] != 0:
+        if _muni_check(digits) == digits[-1] or identifier in SHIM:
+            kinds.append('muni')
+
+    if size == 12 or autopad:
+        cei = [0] * (12 - size) + digits
+        if any(cei) and _cei_check(cei) == cei[-1]:
+            kinds.append('cei')
+
+    if size == 11 or (size < 11 and autopad):
+        digits = [0] * (11 - size) + digits
+        if any(digits):
+            if _cpf_check(digits) == (digits[9], digits[10]):
+                kinds.append('cpf')
+            if _pis_check(digits) == digits[10]:
+                kinds.append('pis')
+
+    return kinds
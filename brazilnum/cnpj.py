@@ -5,7 +5,13 @@ import random
 import string
 from collections import namedtuple
 
-from .util import clean_alphanumeric_id, is_missing, pad_id, pad_alphanumeric_id
+from .backend import _batch_kernel, _explain_rows, _prepared_codes
+from .util import (
+    ALL_ZEROS, BAD_PATTERN, DV1_MISMATCH, DV2_MISMATCH, MISSING, PADDED,
+    TOO_LONG, TOO_SHORT, VALID, _count_complete, _id_range, _partitions,
+    _stem_sums_many, _weighted_sums, clean_alphanumeric_id, is_missing,
+    pad_id, pad_alphanumeric_id
+)
 
 """
 Functions for working with Brazilian company identifiers (CNPJ).
@@ -15,12 +21,18 @@ Functions for working with Brazilian company identifiers (CNPJ).
 CNPJ_FIRST_WEIGHTS = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
 CNPJ_SECOND_WEIGHTS = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
 
+# weights of the 12 stem digits in the sums for each check digit; the
+# second sum also adds 2 times the first check digit
+_CNPJ_SUM_WEIGHTS = (CNPJ_FIRST_WEIGHTS, CNPJ_SECOND_WEIGHTS[:12])
+
 # CNPJ may contain letters in the first 12 positions (IN RFB nº 2.229/2024),
 # but the two check digits are always numeric
 CNPJ_PATTERN = re.compile(r'^[0-9A-Z]{12}[0-9]{2}$')
 
 CNPJ = namedtuple('CNPJ', ['cnpj', 'firm', 'establishment', 'check', 'valid'])
 
+_CNPJ_FMT = '%s.%s.%s/%s-%s'
+
 
 def _char_value(c):
     """Value of a character for check-digit calculation: ord(c) - 48.
@@ -30,6 +42,19 @@ def _char_value(c):
     return ord(c) - 48
 
 
+def _cnpj_check(values, given=None):
+    """Calculate both check digits from the values of 12 characters; the
+    second weights the given first check digit instead, if any.
+    """
+    # find the first check digit
+    cs = sum(w * v for w, v in zip(CNPJ_FIRST_WEIGHTS, values)) % 11
+    first = 0 if cs < 2 else 11 - cs
+    # find the second check digit, which also weights the first
+    cs = (sum(w * v for w, v in zip(CNPJ_SECOND_WEIGHTS, values[:12])) +
+          2 * (first if given is None else given)) % 11
+    return first, 0 if cs < 2 else 11 - cs
+
+
 def validate_cnpj(cnpj, autopad=True):
     """Check whether CNPJ is valid. Optionally pad if too short.
 
@@ -40,58 +65,66 @@ def validate_cnpj(cnpj, autopad=True):
     Missing values (None or NaN) are considered invalid; other non-str,
     non-int input raises TypeError.
     """
-    if is_missing(cnpj):
-        return False
-    cnpj = clean_alphanumeric_id(cnpj)
+    return _explain_cnpj(cnpj, autopad) <= PADDED
 
-    # all complete CNPJ are 14 characters long
-    if len(cnpj) < 14:
-        if not autopad:
-            return False
-        cnpj = pad_cnpj(cnpj)
 
-    elif len(cnpj) > 14:
-        return False
+def validate_cnpj_many(cnpjs, autopad=True):
+    """Check whether each CNPJ in an iterable is valid."""
+    kernel = _batch_kernel('cnpj')
+    if kernel is None:
+        return [_explain_cnpj(k, autopad) <= PADDED for k in cnpjs]
+    prepared = [_prepare_cnpj(k, autopad) for k in cnpjs]
+    return [code <= PADDED for code in _explain_rows(prepared, kernel)]
 
-    # first 12 positions: digits or A-Z letters; last 2 (check digits):
-    # always numeric
-    if not CNPJ_PATTERN.match(cnpj):
-        return False
 
-    # 0 is invalid; smallest valid numeric CNPJ is 191
-    if cnpj == '00000000000000':
-        return False
-
-    values = [_char_value(k) for k in cnpj[:13]]  # 12 identifier chars + DV1
-    # validate the first check digit
-    cs = sum(w * v for w, v in zip(CNPJ_FIRST_WEIGHTS, values[:-1])) % 11
-    cs = 0 if cs < 2 else 11 - cs
-    if cs != int(cnpj[12]):
-        return False  # first check digit is not correct
-    # validate the second check digit
-    cs = sum(w * v for w, v in zip(CNPJ_SECOND_WEIGHTS, values)) % 11
-    cs = 0 if cs < 2 else 11 - cs
-    if cs != int(cnpj[13]):
-        return False  # second check digit is not correct
-    # both check digits are correct
-    return True
+def explain_cnpj(cnpj, autopad=True):
+    """Find why a CNPJ is valid or invalid, as a Reason code.
+
+    Missing values (None or NaN) are Reason.MISSING; other non-str,
+    non-int input raises TypeError.
+    """
+    return _explain_cnpj(cnpj, autopad)
+
+
+def explain_cnpj_many(cnpjs, autopad=True):
+    """Find Reason codes for an iterable of CNPJ, as a bytearray with one
+    code per CNPJ; use Reason(code) to get the name of a code.
+    """
+    kernel = _batch_kernel('cnpj')
+    if kernel is None:
+        return bytearray([_explain_cnpj(k, autopad) for k in cnpjs])
+    return _explain_rows([_prepare_cnpj(k, autopad) for k in cnpjs], kernel)
 
 
 def cnpj_check_digits(cnpj):
-    """Find two check digits needed to make a CNPJ valid."""
+    """Find two check digits needed to make a CNPJ valid.
+
+    When a 13th character is given, it is taken as the first check digit
+    in finding the second, as the second is defined from the first 13.
+    """
     cnpj = clean_alphanumeric_id(cnpj)
     if len(cnpj) < 12:
         raise ValueError('CNPJ must have at least 12 characters: {0}'.format(cnpj))
     values = [_char_value(k) for k in cnpj[:13]]
-    # find the first check digit
-    cs = sum(w * v for w, v in zip(CNPJ_FIRST_WEIGHTS, values)) % 11
-    check = 0 if cs < 2 else 11 - cs
-    # find the second check digit
-    values.append(check)
-    cs = sum(w * v for w, v in zip(CNPJ_SECOND_WEIGHTS, values)) % 11
-    if cs < 2:
-        return check, 0
-    return check, 11 - cs
+    return _cnpj_check(values, values[12] if len(values) == 13 else None)
+
+
+def cnpj_check_digits_many(cnpjs):
+    """Find the two check digits of each CNPJ in an iterable, numeric or
+    alphanumeric, like cnpj_check_digits, as a list of tuples; missing
+    values and CNPJ shorter than 12 characters give None.
+    """
+    out = []
+    for sums in _stem_sums_many(cnpjs, 12, _CNPJ_SUM_WEIGHTS,
+                                clean_alphanumeric_id, given=True):
+        if sums is None:
+            out.append(None)
+            continue
+        cs = sums[0] % 11  # as in _cnpj_check
+        first = 0 if cs < 2 else 11 - cs
+        cs = (sums[1] + 2 * (first if sums[2] is None else sums[2])) % 11
+        out.append((first, 0 if cs < 2 else 11 - cs))
+    return out
 
 
 def cnpj_from_firm_id(firm, establishment='0001', formatted=False):
@@ -109,9 +142,24 @@ def cnpj_from_firm_id(firm, establishment='0001', formatted=False):
 
 def format_cnpj(cnpj):
     """Applies typical 00.000.000/0000-00 formatting to CNPJ."""
+    return _format_cnpj(cnpj)
+
+
+def mask_cnpj(cnpj, mask='*'):
+    """Format a CNPJ hiding the first two characters, the establishment
+    and the check digits, as in **.345.678/****-**.
+    """
     cnpj = pad_cnpj(cnpj)
-    fmt = '{0}.{1}.{2}/{3}-{4}'
-    return fmt.format(cnpj[:2], cnpj[2:5], cnpj[5:8], cnpj[8:12], cnpj[12:])
+    return '{0}.{1}.{2}/{3}-{4}'.format(mask * 2, cnpj[2:5], cnpj[5:8],
+                                        mask * 4, mask * 2)
+
+
+def format_cnpj_many(cnpjs):
+    """Format each CNPJ in an iterable like format_cnpj, as a list; missing
+    values give None.
+    """
+    return [None if k is None else _CNPJ_FMT % (
+        k[:2], k[2:5], k[5:8], k[8:12], k[12:]) for k in pad_cnpj_many(cnpjs)]
 
 
 def pad_cnpj(cnpj, validate=False):
@@ -131,6 +179,40 @@ def pad_cnpj(cnpj, validate=False):
     return padded
 
 
+def pad_cnpj_many(cnpjs):
+    """Pad each CNPJ in an iterable like pad_cnpj, as a list; missing
+    values give None.
+    """
+    out = []
+    for k in cnpjs:
+        # clean CNPJ, numeric or alphanumeric, are used as they are
+        if k.__class__ is str and len(k) == 14 and k.isascii() \
+                and k.isalnum() and (k.isdigit() or k.isupper()):
+            out.append(k)
+        elif is_missing(k):
+            out.append(None)
+        else:
+            out.append(_pad_cnpj_fast(k))
+    return out
+
+
+def partition_by_cnpj(cnpjs, n_partitions, level='firm'):
+    """Assign each CNPJ in an iterable to one of n_partitions, as a list
+    of partition numbers; missing values and values padded to all zeros
+    give None.
+
+    With level='firm', every establishment of a firm (the first 8
+    characters) is in the same partition; with level='establishment',
+    establishments are spread over partitions. CNPJ are padded first, so
+    formatted, unformatted and integer CNPJ are in the same partition, and
+    partitions are the same in every process and Python version.
+    """
+    if level not in ('firm', 'establishment'):
+        raise ValueError('Unknown level: {0}'.format(level))
+    prefix = 8 if level == 'firm' else None
+    return _partitions(pad_cnpj_many(cnpjs), n_partitions, prefix)
+
+
 def parse_cnpj(cnpj, formatted=True):
     """Split CNPJ into firm, establishment, and check digits, and validate.
 
@@ -152,6 +234,58 @@ def parse_cnpj(cnpj, formatted=True):
         return CNPJ(cnpj, firm, estbl, check, valid)
 
 
+def parse_cnpj_columns(cnpjs, formatted=True):
+    """Parse an iterable of CNPJ into a dict of columns, one per field.
+
+    Equivalent to transposing [parse_cnpj(k, formatted) for k in cnpjs],
+    but without building a namedtuple per CNPJ. Missing values (None or
+    NaN) are None in every column except valid, which is False.
+    """
+    padded = pad_cnpj_many(cnpjs)
+    valid = [k is not None and validate_cnpj(k) for k in padded]
+    estbl = [None if k is None else k[8:12] for k in padded]
+    if formatted:
+        fmtcnpjs = [None if k is None else _CNPJ_FMT % (
+            k[:2], k[2:5], k[5:8], k[8:12], k[12:]) for k in padded]
+        firm = [None if k is None else k[:10] for k in fmtcnpjs]
+        check = [None if k is None else k[12:] for k in padded]
+        cols = [fmtcnpjs, firm, estbl, check, valid]
+    else:
+        check = [None if k is None else (int(k[12]), int(k[13]))
+                 for k in padded]
+        # fully numeric CNPJ are returned as integers, as in parse_cnpj
+        numeric = [k is not None and k.isdigit() for k in padded]
+        cnpj = [int(k) if n else k for k, n in zip(padded, numeric)]
+        firm = [None if k is None else int(k[:8]) if n else k[:8]
+                for k, n in zip(padded, numeric)]
+        estbl = [int(k) if n else k for k, n in zip(estbl, numeric)]
+        cols = [cnpj, firm, estbl, check, valid]
+    return dict(zip(CNPJ._fields, cols))
+
+
+def enrich_cnpj_columns(cnpjs, autopad=True):
+    """Validate an iterable of CNPJ and find their attributes, as a dict
+    of columns: the padded cnpj, valid, headquarters (establishment 0001)
+    and alphanumeric (contains letters).
+
+    Attributes are None for missing values and CNPJ that are too short
+    (with autopad=False), too long, all zeros or of the wrong pattern
+    (Reason MISSING, TOO_SHORT, TOO_LONG, ALL_ZEROS or BAD_PATTERN), but
+    are found for CNPJ with wrong check digits.
+    """
+    prepared = [_prepare_cnpj(k, autopad) for k in cnpjs]
+    codes = _prepared_codes('cnpj', prepared)
+    padded = [k for _, k in prepared]
+    return {
+        'cnpj': padded,
+        'valid': [code <= PADDED for code in codes],
+        'headquarters': [None if k is None else k[8:12] == '0001'
+                         for k in padded],
+        'alphanumeric': [None if k is None else not k.isdigit()
+                         for k in padded],
+    }
+
+
 def random_cnpj(formatted=True, alphanumeric=False):
     """Create a random, valid CNPJ identifier.
 
@@ -169,3 +303,188 @@ def random_cnpj(formatted=True, alphanumeric=False):
     if formatted:
         return format_cnpj(cnpj)
     return cnpj
+
+
+def iter_valid_cnpj(start, stop, formatted=False):
+    """Iterate over the valid numeric CNPJ in range(start, stop), in
+    order, as 14-digit strings.
+
+    Check digits are updated as the 12-digit stem increases instead of
+    recalculated, so each CNPJ takes constant time.
+    """
+    start, stop = _id_range(start, stop, 14)
+    if start >= stop:
+        return
+    stems = _weighted_sums(start // 100, (stop - 1) // 100 + 1, 12,
+                           _CNPJ_SUM_WEIGHTS)
+    for stem, (first_sum, second_sum) in stems:
+        cs = first_sum % 11  # as in _cnpj_check
+        first = 0 if cs < 2 else 11 - cs
+        cs = (second_sum + 2 * first) % 11
+        cnpj = stem * 100 + first * 10 + (0 if cs < 2 else 11 - cs)
+        if start <= cnpj < stop:
+            yield format_cnpj(cnpj) if formatted else '%014i' % cnpj
+
+
+def count_valid_cnpj(start, stop):
+    """Count the valid numeric CNPJ in range(start, stop), in constant
+    time.
+    """
+    start, stop = _id_range(start, stop, 14)
+    return _count_complete(start, stop, 100, _complete_cnpj)
+
+
+def _explain_cnpj(cnpj, autopad=True):
+    """Find Reason code of a CNPJ; see explain_cnpj."""
+    reason, cnpj = _prepare_cnpj(cnpj, autopad)
+    if cnpj is None:
+        return reason
+    values = [_char_value(k) for k in cnpj]  # 12 chars and 2 check digits
+    first, second = _cnpj_check(values[:12])
+    if first != values[12]:
+        return DV1_MISMATCH
+    if second != values[13]:
+        return DV2_MISMATCH
+    return reason
+
+
+def _prepare_cnpj(cnpj, autopad=True):
+    """Clean and pad a CNPJ for checking, as (reason, cnpj); cnpj is None
+    when the reason is known without the check digits.
+    """
+    if is_missing(cnpj):
+        return MISSING, None
+    cnpj = clean_alphanumeric_id(cnpj)
+    reason = VALID
+
+    # all complete CNPJ are 14 characters long
+    if len(cnpj) < 14:
+        if not autopad:
+            return TOO_SHORT, None
+        cnpj = pad_cnpj(cnpj)
+        reason = PADDED
+
+    elif len(cnpj) > 14:
+        return TOO_LONG, None
+
+    # first 12 positions: digits or A-Z letters; last 2 (check digits):
+    # always numeric
+    if not CNPJ_PATTERN.match(cnpj):
+        return BAD_PATTERN, None
+
+    # 0 is invalid; smallest valid numeric CNPJ is 191
+    if cnpj == '00000000000000':
+        return ALL_ZEROS, None
+
+    return reason, cnpj
+
+
+def _format_cnpj(cnpj):
+    """Format a CNPJ; see format_cnpj."""
+    cnpj = pad_cnpj(cnpj)
+    fmt = '{0}.{1}.{2}/{3}-{4}'
+    return fmt.format(cnpj[:2], cnpj[2:5], cnpj[5:8], cnpj[8:12], cnpj[12:])
+
+
+def _complete_cnpj(stem):
+    """Find the valid CNPJ of a 12-digit numeric stem, as an integer."""
+    first, second = _cnpj_check([int(k) for k in '%012i' % stem])
+    return stem * 100 + first * 10 + second
+
+
+def _pad_cnpj_fast(cnpj):
+    """Pad CNPJ like pad_cnpj, but without an int round trip; zfill gives
+    the same result for numeric and alphanumeric identifiers.
+    """
+    if isinstance(cnpj, int) and not isinstance(cnpj, bool):
+        return '%014i' % cnpj
+    cnpj = clean_alphanumeric_id(cnpj)
+    if len(cnpj) > 14 and cnpj.isdigit():
+        cnpj = cnpj.lstrip('0')  # as pad_id, which converts through int
+    return cnpj.zfill(14)
+
+
+class CNPJIndex(object):
+    """Index of CNPJ grouped by firm, the first 8 characters of a CNPJ.
+
+    The index is built in one pass over a collection of numeric or
+    alphanumeric CNPJ, which can be integers, unformatted or formatted
+    strings. Missing values and identifiers longer than 14 characters are
+    skipped, as are invalid CNPJ when valid_only=True. Each firm stores
+    only the 6-character establishment and check digit suffixes of its
+    CNPJ, so the index is much smaller than a list of parsed CNPJ.
+
+    Firms can be looked up by firm identifier (integer, formatted, or
+    unformatted) or by any complete CNPJ of the firm.
+    """
+
+    def __init__(self, cnpjs=(), valid_only=False):
+        self.valid_only = valid_only
+        self._firms = {}
+        self.update(cnpjs)
+
+    def __len__(self):
+        return len(self._firms)
+
+    def __contains__(self, firm):
+        return _firm_key(firm) in self._firms
+
+    def __iter__(self):
+        return iter(self._firms)
+
+    def add(self, cnpj):
+        """Add a CNPJ to the index. Return False if it was skipped."""
+        if is_missing(cnpj):
+            return False
+        cnpj = _pad_cnpj_fast(cnpj)
+        if len(cnpj) > 14:
+            return False
+        if self.valid_only and not validate_cnpj(cnpj):
+            return False
+        suffixes = self._firms.get(cnpj[:8])
+        if suffixes is None:
+            self._firms[cnpj[:8]] = [cnpj[8:]]
+        else:
+            suffixes.append(cnpj[8:])
+        return True
+
+    def update(self, cnpjs):
+        """Add every CNPJ in an iterable to the index."""
+        add = self.add
+        for cnpj in cnpjs:
+            add(cnpj)
+
+    def establishments(self, firm):
+        """List all CNPJ of a firm, sorted and without duplicates."""
+        firm = _firm_key(firm)
+        suffixes = self._firms.get(firm, ())
+        return [firm + k for k in sorted(set(suffixes))]
+
+    def headquarters(self, firm):
+        """Find the CNPJ of establishment 0001 of a firm, or None."""
+        firm = _firm_key(firm)
+        for suffix in self._firms.get(firm, ()):
+            if suffix.startswith('0001'):
+                return firm + suffix
+        return None
+
+    def establishments_many(self, firms):
+        """List all CNPJ for each firm in an iterable of firms."""
+        return [self.establishments(k) for k in firms]
+
+    def headquarters_many(self, firms):
+        """Find the headquarters CNPJ for each firm in an iterable."""
+        return [self.headquarters(k) for k in firms]
+
+
+def _firm_key(firm):
+    """Normalize a firm identifier to 8 characters. Input longer than 8
+    characters is treated as a complete CNPJ that may be missing zeros.
+    """
+    if isinstance(firm, int) and not isinstance(firm, bool):
+        firm = str(firm)
+    else:
+        firm = clean_alphanumeric_id(firm)
+    if len(firm) > 8:
+        return firm.zfill(14)[:8]
+    return firm.zfill(8)
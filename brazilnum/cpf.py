@@ -3,7 +3,13 @@
 import re
 import random
 
-from .util import clean_id, is_missing, pad_id
+from .backend import _batch_kernel, _explain_rows, _prepared_codes
+from .util import (
+    ALL_ZEROS, DV1_MISMATCH, DV2_MISMATCH, MISSING, PADDED, TOO_LONG,
+    TOO_SHORT, VALID, _count_complete, _id_range, _partitions,
+    _stem_sums_many, _weighted_sums, clean_id, is_missing, pad_id,
+    pad_id_many
+)
 
 """
 Functions for working with Brazilian CPF identifiers.
@@ -13,6 +19,25 @@ Functions for working with Brazilian CPF identifiers.
 NONDIGIT = re.compile(r'[^0-9]')
 CPF_WEIGHTS = [1, 2, 3, 4, 5, 6, 7, 8, 9]
 
+# weights of the 9 stem digits in the sums for each check digit; the
+# second sum also adds 9 times the first check digit
+_CPF_SUM_WEIGHTS = (CPF_WEIGHTS, [0] + CPF_WEIGHTS[:8])
+
+# states of each Receita Federal fiscal region; the 9th digit of a CPF is
+# the region where it was issued, with 0 for the 10th region
+CPF_FISCAL_REGIONS = {
+    1: ('DF', 'GO', 'MS', 'MT', 'TO'),
+    2: ('AC', 'AM', 'AP', 'PA', 'RO', 'RR'),
+    3: ('CE', 'MA', 'PI'),
+    4: ('AL', 'PB', 'PE', 'RN'),
+    5: ('BA', 'SE'),
+    6: ('MG',),
+    7: ('ES', 'RJ'),
+    8: ('SP',),
+    9: ('PR', 'SC'),
+    10: ('RS',),
+}
+
 
 def validate_cpf(cpf, autopad=True):
     """Check whether CPF is valid.
@@ -20,53 +45,85 @@ def validate_cpf(cpf, autopad=True):
     Missing values (None or NaN) are considered invalid; other non-str,
     non-int input raises TypeError.
     """
-    if is_missing(cpf):
-        return False
-    cpf = clean_id(cpf)
+    return _explain_cpf(cpf, autopad) <= PADDED
 
-    # all complete CPF are 11 digits long
-    if len(cpf) < 11:
-        if not autopad:
-            return False
-        cpf = pad_cpf(cpf)
 
-    elif len(cpf) > 11:
-        return False
+def validate_cpf_many(cpfs, autopad=True):
+    """Check whether each CPF in an iterable is valid."""
+    kernel = _batch_kernel('cpf')
+    if kernel is None:
+        return [_explain_cpf(k, autopad) <= PADDED for k in cpfs]
+    prepared = [_prepare_cpf(k, autopad) for k in cpfs]
+    return [code <= PADDED for code in _explain_rows(prepared, kernel)]
 
-    if cpf == '00000000000':
-        return False
 
-    digits = [int(k) for k in cpf]  # identifier digits
-    # validate the first check digit
-    cs = (sum(w * k for w, k in zip(CPF_WEIGHTS, digits[:-2])) % 11) % 10
-    if cs != digits[-2]:
-        return False  # first check digit is not correct
-    # validate the second check digit
-    cs = (sum(w * k for w, k in zip(CPF_WEIGHTS, digits[1:-1])) % 11) % 10
-    if cs != digits[-1]:
-        return False  # second check digit is not correct
-    # both check digits are correct
-    return True
+def explain_cpf(cpf, autopad=True):
+    """Find why a CPF is valid or invalid, as a Reason code.
+
+    Missing values (None or NaN) are Reason.MISSING; other non-str,
+    non-int input raises TypeError.
+    """
+    return _explain_cpf(cpf, autopad)
+
+
+def explain_cpf_many(cpfs, autopad=True):
+    """Find Reason codes for an iterable of CPF, as a bytearray with one
+    code per CPF; use Reason(code) to get the name of a code.
+    """
+    kernel = _batch_kernel('cpf')
+    if kernel is None:
+        return bytearray([_explain_cpf(k, autopad) for k in cpfs])
+    return _explain_rows([_prepare_cpf(k, autopad) for k in cpfs], kernel)
 
 
 def cpf_check_digits(cpf):
-    """Find two check digits needed to make a CPF valid."""
+    """Find two check digits needed to make a CPF valid.
+
+    When a 10th digit is given, it is taken as the first check digit in
+    finding the second, as the second is defined from the first 10 digits.
+    """
     cpf = clean_id(cpf)
     if len(cpf) < 9:
         raise ValueError('CPF must have at least 9 digits: {0}'.format(cpf))
     digits = [int(k) for k in cpf[:10]]
-    # find the first check digit
-    cs = (sum(w * k for w, k in zip(CPF_WEIGHTS, digits)) % 11) % 10
-    # find the second check digit
-    digits.append(cs)
-    return cs, (sum(w * k for w, k in zip(CPF_WEIGHTS, digits[1:])) % 11) % 10
+    return _cpf_check(digits, digits[9] if len(digits) == 10 else None)
+
+
+def cpf_check_digits_many(cpfs):
+    """Find the two check digits of each CPF in an iterable, like
+    cpf_check_digits, as a list of tuples; missing values and CPF shorter
+    than 9 digits give None.
+    """
+    out = []
+    for sums in _stem_sums_many(cpfs, 9, _CPF_SUM_WEIGHTS, given=True):
+        if sums is None:
+            out.append(None)
+            continue
+        first = sums[0] % 11 % 10  # as in _cpf_check
+        given = first if sums[2] is None else sums[2]
+        out.append((first, (sums[1] + 9 * given) % 11 % 10))
+    return out
 
 
 def format_cpf(cpf):
     """Applies typical 000.000.000-00 formatting to CPF."""
+    return _format_cpf(cpf)
+
+
+def format_cpf_many(cpfs):
+    """Format each CPF in an iterable like format_cpf, as a list; missing
+    values give None.
+    """
+    return [None if k is None else '%s.%s.%s-%s' % (
+        k[:3], k[3:6], k[6:9], k[9:]) for k in pad_id_many(cpfs, 11)]
+
+
+def mask_cpf(cpf, mask='*'):
+    """Format a CPF hiding the first three and last two digits, as in
+    ***.456.789-**, the layout used for CPF in public documents.
+    """
     cpf = pad_cpf(cpf)
-    fmt = '{0}.{1}.{2}-{3}'
-    return fmt.format(cpf[:3], cpf[3:6], cpf[6:9], cpf[9:])
+    return '{0}.{1}.{2}-{3}'.format(mask * 3, cpf[3:6], cpf[6:9], mask * 2)
 
 
 def pad_cpf(cpf, validate=False):
@@ -77,6 +134,46 @@ def pad_cpf(cpf, validate=False):
     return padded
 
 
+def pad_cpf_many(cpfs):
+    """Pad each CPF in an iterable like pad_cpf, as a list; missing values
+    give None.
+    """
+    return pad_id_many(cpfs, 11)
+
+
+def enrich_cpf_columns(cpfs, autopad=True):
+    """Validate an iterable of CPF and find their attributes, as a dict
+    of columns: the padded cpf, valid, and the fiscal_region where each
+    CPF was issued (1 to 10; see CPF_FISCAL_REGIONS).
+
+    Attributes are None for missing values and CPF that are too short
+    (with autopad=False), too long or all zeros (Reason MISSING,
+    TOO_SHORT, TOO_LONG or ALL_ZEROS), but are found for CPF with wrong
+    check digits.
+    """
+    prepared = [_prepare_cpf(k, autopad) for k in cpfs]
+    codes = _prepared_codes('cpf', prepared)
+    padded = [k for _, k in prepared]
+    return {
+        'cpf': padded,
+        'valid': [code <= PADDED for code in codes],
+        'fiscal_region': [None if k is None else int(k[8]) or 10
+                          for k in padded],
+    }
+
+
+def partition_by_cpf(cpfs, n_partitions):
+    """Assign each CPF in an iterable to one of n_partitions, as a list
+    of partition numbers; missing values and values padded to all zeros
+    give None.
+
+    CPF are padded first, so formatted, unformatted and integer CPF are in
+    the same partition, and partitions are the same in every process and
+    Python version.
+    """
+    return _partitions(pad_id_many(cpfs, 11), n_partitions)
+
+
 def random_cpf(formatted=True):
     """Create a random, valid CPF identifier."""
     stem = random.randint(100000000, 999999999)
@@ -84,3 +181,92 @@ def random_cpf(formatted=True):
     if formatted:
         return format_cpf(cpf)
     return cpf
+
+
+def iter_valid_cpf(start, stop, formatted=False):
+    """Iterate over the valid CPF in range(start, stop), in order, as
+    11-digit strings.
+
+    Check digits are updated as the 9-digit stem increases instead of
+    recalculated, so each CPF takes constant time.
+    """
+    start, stop = _id_range(start, stop, 11)
+    if start >= stop:
+        return
+    stems = _weighted_sums(start // 100, (stop - 1) // 100 + 1, 9,
+                           _CPF_SUM_WEIGHTS)
+    for stem, (first_sum, second_sum) in stems:
+        first = first_sum % 11 % 10  # as in _cpf_check
+        cpf = stem * 100 + first * 10 + (second_sum + 9 * first) % 11 % 10
+        if start <= cpf < stop:
+            yield format_cpf(cpf) if formatted else '%011i' % cpf
+
+
+def count_valid_cpf(start, stop):
+    """Count the valid CPF in range(start, stop), in constant time."""
+    start, stop = _id_range(start, stop, 11)
+    return _count_complete(start, stop, 100, _complete_cpf)
+
+
+def _explain_cpf(cpf, autopad=True):
+    """Find Reason code of a CPF; see explain_cpf."""
+    reason, cpf = _prepare_cpf(cpf, autopad)
+    if cpf is None:
+        return reason
+    digits = [int(k) for k in cpf]  # identifier digits
+    first, second = _cpf_check(digits)
+    if first != digits[9]:
+        return DV1_MISMATCH
+    if second != digits[10]:
+        return DV2_MISMATCH
+    return reason
+
+
+def _prepare_cpf(cpf, autopad=True):
+    """Clean a CPF for checking, as (reason, cpf); cpf is None when
+    the reason is known without the check digits.
+    """
+    if is_missing(cpf):
+        return MISSING, None
+    cpf = clean_id(cpf)
+    reason = VALID
+
+    # all complete CPF are 11 digits long
+    if len(cpf) < 11:
+        if not autopad:
+            return TOO_SHORT, None
+        cpf = pad_cpf(cpf)
+        reason = PADDED
+
+    elif len(cpf) > 11:
+        return TOO_LONG, None
+
+    if cpf == '00000000000':
+        return ALL_ZEROS, None
+
+    return reason, cpf
+
+
+def _format_cpf(cpf):
+    """Format a CPF; see format_cpf."""
+    cpf = pad_cpf(cpf)
+    fmt = '{0}.{1}.{2}-{3}'
+    return fmt.format(cpf[:3], cpf[3:6], cpf[6:9], cpf[9:])
+
+
+def _cpf_check(digits, given=None):
+    """Calculate both check digits from the first 9 integer digits; the
+    second weights the given first check digit instead, if any.
+    """
+    # find the first check digit
+    first = (sum(w * k for w, k in zip(CPF_WEIGHTS, digits)) % 11) % 10
+    # find the second check digit, weighting digits 2-9 and the first check
+    second = sum(w * k for w, k in zip(CPF_WEIGHTS, digits[1:9])) + 9 * (
+        first if given is None else given)
+    return first, (second % 11) % 10
+
+
+def _complete_cpf(stem):
+    """Find the valid CPF of a 9-digit stem, as an integer."""
+    first, second = _cpf_check([int(k) for k in '%09i' % stem])
+    return stem * 100 + first * 10 + second
@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+
+import math
+import warnings
+from array import array
+
+from .backend import _preparers, kernels
+from .util import PADDED, VALID, clean_id
+
+"""
+De-duplication of streams of identifiers in bounded memory.
+
+Identifiers are padded, so that 968.811.342-58, 96881134258 and the
+integer 96881134258 are the same identifier, and packed into integers:
+numeric identifiers are their own value, so repeats are found before
+their check digits are calculated, and alphanumeric CNPJ, which are
+validated first, are their 12-character stem read in base 36. Packed
+identifiers seen so far are kept in an open-addressing hash table of
+8-byte slots, several times smaller than a Python set of strings. Before
+the table would grow past a memory cap, it is replaced by a Bloom filter
+sized for capacity identifiers at the chosen error rate, and from then
+on, memory stays fixed. While the filter holds at most capacity
+identifiers, a first occurrence is mistaken for a duplicate with
+probability at most error_rate; past capacity, that probability keeps
+rising, so a RuntimeWarning is issued and over_capacity becomes True.
+
+"""
+
+# alphanumeric CNPJ are packed above all numeric identifiers (< 10**14)
+_ALPHANUMERIC_OFFSET = 10 ** 14
+
+_MASK = (1 << 64) - 1
+
+
+def dedupe_stream(iterable, kind='cpf', capacity=10000000, error_rate=0.001,
+                  key=None):
+    """Yield the first occurrence of each valid identifier in an iterable,
+    dropping repeats and invalid identifiers; see Deduplicator.
+
+    With key, items can be records, and key(item) gives the identifier of
+    each; the items themselves are yielded.
+    """
+    return Deduplicator(kind, capacity, error_rate).filter(iterable, key)
+
+
+class Deduplicator(object):
+    """Remember the identifiers of one kind seen so far, in at most
+    max_bytes of memory for the table or filter of identifiers, counting
+    both while one replaces the other; by default, twice the size of a
+    Bloom filter for capacity identifiers at error_rate.
+
+    Identifiers are kept exactly while the table fits. A first occurrence
+    is then taken for a duplicate with probability at most error_rate
+    until more than capacity identifiers are stored, when over_capacity
+    becomes True and a RuntimeWarning is issued.
+
+    Counts of valid, invalid and duplicate identifiers are kept in the
+    attributes of the same names, and of identifiers remembered in stored.
+    """
+
+    def __init__(self, kind='cpf', capacity=10000000, error_rate=0.001,
+                 max_bytes=None):
+        preparers = _preparers()
+        if kind not in preparers:
+            raise ValueError('Unsupported kind of identifier: {0}'
+                             .format(kind))
+        bloom_bytes = BloomFilter.size(capacity, error_rate)
+        if max_bytes is None:
+            max_bytes = 2 * bloom_bytes
+        elif max_bytes < bloom_bytes:
+            raise ValueError('max_bytes must be at least {0}, the size of a '
+                             'Bloom filter for capacity identifiers at '
+                             'error_rate'.format(bloom_bytes))
+        self.kind = kind
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.max_bytes = max_bytes
+        self.valid = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.stored = 0
+        self._bloom_bytes = bloom_bytes
+        self._prepare = preparers[kind]
+        self._check = kernels('python')[kind]
+        self._seen = PackedSet()
+        if self._seen.nbytes + bloom_bytes > max_bytes:
+            self._to_bloom()  # no room to switch later
+
+    @property
+    def exact(self):
+        """Whether identifiers are still remembered exactly."""
+        return isinstance(self._seen, PackedSet)
+
+    @property
+    def over_capacity(self):
+        """Whether the Bloom filter holds more than capacity identifiers,
+        so its error rate is above error_rate.
+        """
+        return not self.exact and self.stored > self.capacity
+
+    def add(self, identifier):
+        """Remember an identifier; returns True if it is valid and was not
+        seen before.
+        """
+        reason, row = self._prepare(identifier)
+        if row is None:
+            if reason > PADDED:
+                self.invalid += 1
+                return False
+            # valid without a check, as the municipio codes in muni.SHIM
+            self.valid += 1
+            return self._remember(int(clean_id(identifier)))
+        if row.isdigit():
+            value = int(row)
+            if value in self._seen:  # seen only if valid, so not checked
+                self.valid += 1
+                self.duplicates += 1
+                return False
+        else:
+            value = _ALPHANUMERIC_OFFSET + int(row[:12], 36)
+        if self._check([row])[0] != VALID:
+            self.invalid += 1
+            return False
+        self.valid += 1
+        return self._remember(value)
+
+    def filter(self, iterable, key=None):
+        """Yield the items of an iterable with valid identifiers that were
+        not seen before; key(item) gives the identifier of an item.
+        """
+        add = self.add
+        for item in iterable:
+            if add(item if key is None else key(item)):
+                yield item
+
+    def _remember(self, value):
+        """Store the packed value of a valid identifier; returns True if
+        it was not seen before.
+        """
+        seen = self._seen
+        if value in seen:  # alphanumeric CNPJ and SHIM codes repeat here
+            self.duplicates += 1
+            return False
+        if seen.__class__ is PackedSet and seen.full and \
+                not self._can_grow(seen.nbytes):
+            self._to_bloom()
+            seen = self._seen
+        seen.add(value)
+        self.stored += 1
+        if self.stored == self.capacity + 1 and not self.exact:
+            self._warn_over_capacity()
+        return True
+
+    def _can_grow(self, nbytes):
+        """Check whether a table of nbytes can double within max_bytes,
+        both while values move to the new table and, later, while they
+        move from it into a Bloom filter.
+        """
+        return max(3 * nbytes, 2 * nbytes + self._bloom_bytes) <= \
+            self.max_bytes
+
+    def _to_bloom(self):
+        """Move the identifiers seen so far into a Bloom filter, freeing
+        the table as it is read.
+        """
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        table = self._seen._table
+        self._seen = None
+        while table:
+            chunk = table[-64:]  # small, so the copy adds little memory
+            del table[-64:]  # the array shrinks as it empties
+            for stored in chunk:
+                if stored:
+                    bloom.add(stored - 1)
+        self._seen = bloom
+        if self.stored > self.capacity:
+            self._warn_over_capacity()
+
+    def _warn_over_capacity(self):
+        """Warn that the Bloom filter is past its capacity."""
+        warnings.warn('More than {0} identifiers stored; first occurrences '
+                      'are now dropped at a rate above {1}'
+                      .format(self.capacity, self.error_rate), RuntimeWarning)
+
+
+class PackedSet(object):
+    """Set of integers below 2**64 - 1, stored in an open-addressing hash
+    table of 8-byte slots that grows to keep at most half of them full.
+    """
+
+    def __init__(self, slots=64):
+        self._table = array('Q', [0]) * slots
+        self._mask = slots - 1
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return (v - 1 for v in self._table if v)
+
+    def __contains__(self, value):
+        stored = value + 1
+        table = self._table
+        mask = self._mask
+        i = _mix(value) & mask
+        while True:
+            slot = table[i]
+            if slot == stored:
+                return True
+            if not slot:
+                return False
+            i = (i + 1) & mask
+
+    @property
+    def nbytes(self):
+        """Memory used by the table, in bytes."""
+        return self._table.itemsize * len(self._table)
+
+    @property
+    def full(self):
+        """Whether adding one more value doubles the table."""
+        return 2 * (self._len + 1) > len(self._table)
+
+    def add(self, value):
+        """Add an integer; returns True if it was not in the set."""
+        stored = value + 1  # 0 marks empty slots
+        table = self._table
+        mask = self._mask
+        i = _mix(value) & mask
+        while True:
+            slot = table[i]
+            if slot == stored:
+                return False
+            if not slot:
+                break
+            i = (i + 1) & mask  # linear probing
+        table[i] = stored
+        self._len += 1
+        if 2 * self._len > len(table):
+            self._grow()
+        return True
+
+    def _grow(self):
+        """Double the table, moving every value to its new slot."""
+        old = self._table
+        self._table = array('Q', [0]) * (2 * len(old))
+        self._mask = len(self._table) - 1
+        self._len = 0
+        for stored in old:
+            if stored:
+                self.add(stored - 1)
+
+
+class BloomFilter(object):
+    """Bloom filter of integers, sized for capacity values with a false
+    positive rate of at most error_rate.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        nbytes = self.size(capacity, error_rate)
+        self.nbits = 8 * nbytes
+        self.hashes = max(1, round(self.nbits / capacity * math.log(2)))
+        self._bits = bytearray(nbytes)
+
+    @staticmethod
+    def size(capacity, error_rate):
+        """Find the bytes needed for capacity values at error_rate."""
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError('Bloom filter needs capacity >= 1 and '
+                             '0 < error_rate < 1')
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        return int(math.ceil(bits / 8))
+
+    @property
+    def nbytes(self):
+        """Memory used by the bits, in bytes."""
+        return len(self._bits)
+
+    def __contains__(self, value):
+        bits = self._bits
+        return all(bits[i >> 3] & (1 << (i & 7)) for i in self._bits_of(value))
+
+    def add(self, value):
+        """Add an integer; returns True if it was not in the filter, which
+        is wrong for a fraction of new values up to the error rate.
+        """
+        bits = self._bits
+        new = False
+        for i in self._bits_of(value):
+            byte, bit = i >> 3, 1 << (i & 7)
+            if not bits[byte] & bit:
+                bits[byte] |= bit
+                new = True
+        return new
+
+    def _bits_of(self, value):
+        """Positions of the bits of a value, by double hashing."""
+        mixed = _mix(value)
+        first, step = mixed & 0xFFFFFFFF, (mixed >> 32) | 1
+        nbits = self.nbits
+        return [(first + i * step) % nbits for i in range(self.hashes)]
+
+
+def _mix(value):
+    """Scramble the bits of an integer (the splitmix64 finalizer), so that
+    nearby identifiers land far apart.
+    """
+    z = (value + 0x9E3779B97F4A7C15) & _MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+    return z ^ (z >> 31)
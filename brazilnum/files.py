@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+
+from .batch import get_kernel
+from .util import PADDED, Reason
+
+"""
+Validate a column of identifiers in a CSV or Parquet file, chunk by chunk.
+
+Each row of the output gets two new columns, <column>_valid and
+<column>_reason, and results are written as each chunk is checked, so
+files larger than memory can be validated. With a checkpoint file, the
+position reached and the counts so far are saved after every chunk:
+
+    - CSV files are read in chunks of rows, and an interrupted run resumes
+      at the byte offset of the last chunk written; a finished run is not
+      repeated while the file keeps its size and modification time.
+    - Parquet files (which need pyarrow) are read by row group, with one
+      output file per row group, and each row group is skipped when its
+      content hash matches the one in the checkpoint.
+
+"""
+
+FORMATS = ('csv', 'parquet')
+CHECKPOINT_VERSION = 1
+PART_NAME = re.compile(r'part-(\d+)\.parquet$')
+
+
+def validate_file(path, column, kind, output=None, checkpoint=None,
+                  chunk_size=100000, fmt=None, delimiter=',',
+                  encoding='utf-8', header=True):
+    """Validate a column of identifiers in a CSV or Parquet file.
+
+    Returns counts of rows, valid rows, and rows by Reason name. With
+    output, writes the rows with their results: a CSV file for CSV input,
+    or a directory of Parquet files, one per row group, for Parquet input.
+    With checkpoint, progress is saved to that JSON file after each chunk,
+    and an interrupted run of the same file and column resumes from it.
+
+    CSV files without a header need header=False and column as a
+    zero-based index; empty cells are missing values.
+    """
+    fmt = fmt or _guess_format(path)
+    if fmt not in FORMATS:
+        raise ValueError('Unsupported file format: {0}'.format(fmt))
+    explain = get_kernel('explain', kind)
+    job = {'path': os.path.abspath(path), 'column': column, 'kind': kind,
+           'output': output and os.path.abspath(output), 'format': fmt}
+    state = _load_checkpoint(checkpoint, job)
+    if fmt == 'parquet':
+        return _validate_parquet(path, column, explain, output, checkpoint,
+                                 state)
+    return _validate_csv(path, column, explain, output, checkpoint, state,
+                         chunk_size, delimiter, encoding, header)
+
+
+def _validate_csv(path, column, explain, output, checkpoint, state,
+                  chunk_size, delimiter, encoding, header):
+    """Validate a CSV file; see validate_file."""
+    stat = os.stat(path)
+    source = [stat.st_size, stat.st_mtime_ns]
+    if state.get('source') != source or (
+            output is not None and _size(output) < state['output_offset']):
+        # a new or changed file, or output lost since the checkpoint
+        state = dict(state, source=source, offset=0, output_offset=0,
+                     stats=_new_stats(), done=False)
+    if state['done']:
+        return state['stats']
+    stats = state['stats']
+
+    with open(path, 'rb') as infile:
+        names = None
+        if header:
+            names = next(csv.reader([infile.readline().decode(encoding)],
+                                    delimiter=delimiter), [])
+        index = _column_index(column, names)
+        fresh = not state['offset']
+        infile.seek(state['offset'] or infile.tell())
+
+        outfile = None
+        if output is not None:
+            outfile = open(output, 'r+b' if state['output_offset'] else 'wb')
+            outfile.truncate(state['output_offset'])  # drop unsaved rows
+            outfile.seek(state['output_offset'])
+        try:
+            if outfile is not None and names is not None and fresh:
+                outfile.write(_csv_text([names + _result_names(names[index])],
+                                        delimiter).encode(encoding))
+            for chunk, end in _csv_chunks(infile, chunk_size):
+                reader = csv.reader(io.StringIO(chunk.decode(encoding),
+                                                newline=''),
+                                    delimiter=delimiter)
+                rows = list(reader)
+                values = [row[index] if len(row) > index and row[index]
+                          else None for row in rows]
+                codes = explain(values)
+                _count(stats, codes)
+                if outfile is not None:
+                    for row, code in zip(rows, codes):
+                        row += [str(code <= PADDED), Reason(code).name]
+                    outfile.write(_csv_text(rows, delimiter)
+                                  .encode(encoding))
+                    _sync(outfile)
+                    state['output_offset'] = outfile.tell()
+                state['offset'] = end
+                _save_checkpoint(checkpoint, state)
+        finally:
+            if outfile is not None:
+                outfile.close()
+    state['done'] = True
+    _save_checkpoint(checkpoint, state)
+    return stats
+
+
+def _validate_parquet(path, column, explain, output, checkpoint, state):
+    """Validate a Parquet file; see validate_file."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    groups = state.setdefault('groups', {})
+    if output is not None:
+        os.makedirs(output, exist_ok=True)
+    source = pq.ParquetFile(path)
+    stats = _new_stats()
+    for i in range(source.num_row_groups):
+        table = source.read_row_group(i)
+        digest = _table_hash(table)
+        part = None
+        if output is not None:
+            part = os.path.join(output, 'part-{0:05d}.parquet'.format(i))
+        saved = groups.get(str(i))
+        if saved is None or saved['hash'] != digest or (
+                part is not None and not os.path.exists(part)):
+            codes = explain(table.column(column).to_pylist())
+            saved = {'hash': digest, 'stats': _count(_new_stats(), codes)}
+            if part is not None:
+                valid = pa.array([code <= PADDED for code in codes])
+                reason = pa.array([Reason(code).name for code in codes])
+                names = _result_names(column)
+                table = table.append_column(names[0], valid)
+                table = table.append_column(names[1], reason)
+                pq.write_table(table, part + '.tmp')
+                os.replace(part + '.tmp', part)
+            groups[str(i)] = saved
+            _save_checkpoint(checkpoint, state)
+        _merge(stats, saved['stats'])
+    for key in [k for k in groups if int(k) >= source.num_row_groups]:
+        del groups[key]  # row groups that no longer exist
+    if output is not None:
+        for name in os.listdir(output):
+            match = PART_NAME.match(name)
+            if match and int(match.group(1)) >= source.num_row_groups:
+                os.remove(os.path.join(output, name))
+    _save_checkpoint(checkpoint, state)
+    return stats
+
+
+def _csv_chunks(infile, size):
+    """Read a binary CSV file in chunks of at most size records, yielding
+    (chunk, offset after chunk); records may have quoted line breaks.
+    """
+    while True:
+        lines = []
+        while len(lines) < size:
+            line = infile.readline()
+            if not line:
+                break
+            while line.count(b'"') % 2:  # line break inside quotes
+                more = infile.readline()
+                if not more:
+                    break
+                line += more
+            lines.append(line)
+        if not lines:
+            return
+        yield b''.join(lines), infile.tell()
+
+
+def _csv_text(rows, delimiter):
+    """Write rows as CSV text."""
+    out = io.StringIO()
+    csv.writer(out, delimiter=delimiter, lineterminator='\n').writerows(rows)
+    return out.getvalue()
+
+
+def _column_index(column, names):
+    """Find the position of a column by name, or check an index."""
+    if names is None or isinstance(column, int):
+        if not isinstance(column, int):
+            raise TypeError('Column must be an index in files without a '
+                            'header: {0!r}'.format(column))
+        return column
+    try:
+        return names.index(column)
+    except ValueError:
+        raise ValueError('Column not found: {0}'.format(column))
+
+
+def _result_names(column):
+    """Names of the columns of results for a column."""
+    return ['{0}_valid'.format(column), '{0}_reason'.format(column)]
+
+
+def _table_hash(table):
+    """Hash the contents of a pyarrow Table, buffer by buffer."""
+    digest = hashlib.sha256(str(table.schema).encode('utf-8'))
+    for col in table.columns:
+        for chunk in col.chunks:
+            for buf in chunk.buffers():
+                if buf is not None:
+                    digest.update(buf)
+    return digest.hexdigest()
+
+
+def _new_stats():
+    """Empty counts of rows."""
+    return {'rows': 0, 'valid': 0, 'reasons': {}}
+
+
+def _count(stats, codes):
+    """Add Reason codes to counts of rows."""
+    reasons = stats['reasons']
+    for code in codes:
+        name = Reason(code).name
+        reasons[name] = reasons.get(name, 0) + 1
+        if code <= PADDED:
+            stats['valid'] += 1
+    stats['rows'] += len(codes)
+    return stats
+
+
+def _merge(stats, other):
+    """Add one set of counts to another."""
+    stats['rows'] += other['rows']
+    stats['valid'] += other['valid']
+    for name, n in other['reasons'].items():
+        stats['reasons'][name] = stats['reasons'].get(name, 0) + n
+
+
+def _size(path):
+    """Size of a file in bytes, or -1 if it does not exist."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return -1
+
+
+def _sync(outfile):
+    """Make written output durable before the checkpoint refers to it."""
+    outfile.flush()
+    os.fsync(outfile.fileno())
+
+
+def _load_checkpoint(checkpoint, job):
+    """Read the saved state of a job, or start a new state if there is no
+    checkpoint or it belongs to another job.
+    """
+    state = None
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            state = json.load(f)
+    if (state is None or state.get('version') != CHECKPOINT_VERSION
+            or state.get('job') != job):
+        state = {'version': CHECKPOINT_VERSION, 'job': job}
+    return state
+
+
+def _save_checkpoint(checkpoint, state):
+    """Write state to the checkpoint, replacing it atomically."""
+    if checkpoint is None:
+        return
+    with open(checkpoint + '.tmp', 'w') as f:
+        json.dump(state, f)
+        _sync(f)
+    os.replace(checkpoint + '.tmp', checkpoint)
+
+
+def _guess_format(path):
+    """Guess the format of a file from its extension."""
+    if path.lower().endswith(('.parquet', '.pq')):
+        return 'parquet'
+    return 'csv'
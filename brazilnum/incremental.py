@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+
+from .cei import CEI_WEIGHTS
+from .cnpj import _CNPJ_SUM_WEIGHTS
+from .cpf import _CPF_SUM_WEIGHTS
+from .pis import PIS_WEIGHTS
+from .util import (
+    ALL_ZEROS, BAD_PATTERN, DV1_MISMATCH, DV2_MISMATCH, TOO_SHORT, VALID
+)
+
+"""
+Check digits of identifiers that are typed one character at a time.
+
+Each checker keeps the weighted sums of the characters typed so far, so
+appending, removing the last character or replacing a character updates
+them in constant time, and the check digits that complete the identifier
+are found from the sums without reading the characters again:
+
+    >>> check = IncrementalCPF()
+    >>> for char in '968811342':
+    ...     check.append(char)
+    >>> check.check_digits()
+    (5, 8)
+
+Punctuation, as in formatted identifiers, is ignored.
+
+"""
+
+PUNCTUATION = frozenset('.-/ ')
+
+
+class _IncrementalCheck(object):
+    """Base class of checkers of one kind of identifier, with length
+    characters, the first stem_length of which are weighted by each list
+    in weights to find the check digits.
+    """
+
+    kind = None
+    length = None
+    stem_length = None
+    weights = ()
+    chars = frozenset('0123456789')
+
+    def __init__(self, text=''):
+        if self.kind is None:
+            raise TypeError('Use a checker of one kind of identifier, such '
+                            'as IncrementalCPF')
+        self._values = []  # ord(char) - 48 of each character
+        self._sums = [0] * len(self.weights)
+        self._nonzero = 0
+        self.extend(text)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(self.__class__.__name__, self.value)
+
+    @property
+    def value(self):
+        """The characters typed so far, without punctuation."""
+        return ''.join(chr(v + 48) for v in self._values)
+
+    def append(self, char):
+        """Type a character at the end; punctuation is ignored."""
+        value = self._value(char)
+        if value is None:
+            return
+        i = len(self._values)
+        if i == self.length:
+            raise ValueError('{0} has at most {1} characters'
+                             .format(self.kind.upper(), self.length))
+        self._values.append(value)
+        self._add(i, value)
+        self._nonzero += value != 0
+
+    def extend(self, text):
+        """Type each character of text at the end."""
+        for char in text:
+            self.append(char)
+
+    def pop(self):
+        """Remove the last character, as with backspace, and return it."""
+        if not self._values:
+            raise IndexError('pop from empty {0}'.format(self.kind.upper()))
+        i = len(self._values) - 1
+        value = self._values.pop()
+        self._add(i, -value)
+        self._nonzero -= value != 0
+        return chr(value + 48)
+
+    def replace(self, index, char):
+        """Replace the character at index, as when typing over it."""
+        value = self._value(char)
+        if value is None:
+            raise ValueError('Not a character of a {0}: {1!r}'
+                             .format(self.kind.upper(), char))
+        index = range(len(self._values))[index]
+        old = self._values[index]
+        self._add(index, value - old)
+        self._nonzero += (value != 0) - (old != 0)
+        self._values[index] = value
+
+    def insert(self, index, char):
+        """Type a character before index. Later characters move, so the
+        sums are recalculated, which takes time linear in the length.
+        """
+        text = self.value
+        self._retype(text[:index] + char + text[index:])
+
+    def delete(self, index):
+        """Remove the character at index; see insert."""
+        text = self.value
+        index = range(len(text))[index]
+        self._retype(text[:index] + text[index + 1:])
+
+    def clear(self):
+        """Remove all characters."""
+        del self._values[:]
+        self._sums = [0] * len(self.weights)
+        self._nonzero = 0
+
+    def check_digits(self):
+        """Find the check digits that complete the stem typed so far, as a
+        tuple, or None if the stem is not complete.
+        """
+        if len(self._values) < self.stem_length:
+            return None
+        return self._finish(self._sums)
+
+    def explain(self):
+        """Find why the characters typed so far are valid or invalid, as
+        a Reason code, like explain functions with autopad=False.
+        """
+        values = self._values
+        if len(values) < self.length:
+            return TOO_SHORT
+        if not self._nonzero:
+            return ALL_ZEROS
+        for i, digit in enumerate(self._finish(self._sums)):
+            if values[self.stem_length + i] != digit:
+                return DV2_MISMATCH if i else DV1_MISMATCH
+        return VALID
+
+    def is_valid(self):
+        """Check whether the characters typed so far are a valid identifier."""
+        return self.explain() == VALID
+
+    def _retype(self, text):
+        """Replace all characters with text; nothing changes if text
+        cannot be typed.
+        """
+        fresh = self.__class__(text)
+        self._values, self._sums = fresh._values, fresh._sums
+        self._nonzero = fresh._nonzero
+
+    def _value(self, char):
+        """Value of a typed character, or None for punctuation."""
+        if char in PUNCTUATION:
+            return None
+        upper = char.upper()
+        if len(char) != 1 or upper not in self.chars:
+            raise ValueError('Not a character of a {0}: {1!r}'
+                             .format(self.kind.upper(), char))
+        return ord(upper) - 48
+
+    def _add(self, i, change):
+        """Add a change in the value at index i to the weighted sums."""
+        if i < self.stem_length:
+            sums = self._sums
+            for j, ws in enumerate(self.weights):
+                sums[j] += ws[i] * change
+
+    def _finish(self, sums):
+        """Calculate the check digits from the weighted sums."""
+        raise NotImplementedError
+
+
+class IncrementalCNPJ(_IncrementalCheck):
+    """Check a numeric or alphanumeric CNPJ as it is typed."""
+
+    kind = 'cnpj'
+    length = 14
+    stem_length = 12
+    weights = _CNPJ_SUM_WEIGHTS
+    chars = frozenset('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+    def explain(self):
+        values = self._values
+        if len(values) == self.length and (values[12] > 9 or values[13] > 9):
+            return BAD_PATTERN  # check digits are always numeric
+        return super(IncrementalCNPJ, self).explain()
+
+    def _finish(self, sums):
+        cs = sums[0] % 11
+        first = 0 if cs < 2 else 11 - cs
+        cs = (sums[1] + 2 * first) % 11
+        return first, 0 if cs < 2 else 11 - cs
+
+
+class IncrementalCPF(_IncrementalCheck):
+    """Check a CPF as it is typed."""
+
+    kind = 'cpf'
+    length = 11
+    stem_length = 9
+    weights = _CPF_SUM_WEIGHTS
+
+    def _finish(self, sums):
+        first = sums[0] % 11 % 10
+        return first, (sums[1] + 9 * first) % 11 % 10
+
+
+class IncrementalPIS(_IncrementalCheck):
+    """Check a PIS/PASEP as it is typed."""
+
+    kind = 'pis'
+    length = 11
+    stem_length = 10
+    weights = (PIS_WEIGHTS,)
+
+    def _finish(self, sums):
+        cs = sums[0] % 11
+        return (0 if cs < 2 else 11 - cs,)
+
+
+class IncrementalCEI(_IncrementalCheck):
+    """Check a CEI as it is typed."""
+
+    kind = 'cei'
+    length = 12
+    stem_length = 11
+    weights = (CEI_WEIGHTS,)
+
+    def _finish(self, sums):
+        modulo = sum(divmod(sums[0] % 100, 10)) % 10
+        return (0 if modulo == 0 else 10 - modulo,)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+
+import threading
+from functools import wraps
+from threading import get_ident
+from time import perf_counter_ns
+
+from . import backend, cei, cep, cnpj, cpf, muni, pis
+from .util import PADDED, Reason, input_shape
+
+"""
+Opt-in instrumentation of the validate, explain and format functions.
+
+Metrics are off by default and cost nothing while off: enable() swaps the
+private functions that do the work in each module (e.g. cnpj._explain_cnpj,
+which validate_cnpj, explain_cnpj and their batch versions all call) for
+instrumented wrappers, and disable() swaps the originals back in. While
+enabled, those batch functions skip the batch kernels of brazilnum.backend
+and call the private functions for each identifier.
+
+Only calls that pass through the functions in TARGETS are recorded. The
+enrich_*_columns functions, classify, quality.profile_column and dedupe
+prepare and check identifiers themselves, so they are not.
+
+Each thread records into its own shard of metrics, guarded by a lock that
+only snapshot and reset share, so threads do not contend while recording,
+with or without the GIL.
+
+"""
+
+# (module, private function, operation, kind of identifier)
+TARGETS = [
+    (cnpj, '_explain_cnpj', 'validate', 'cnpj'),
+    (cpf, '_explain_cpf', 'validate', 'cpf'),
+    (pis, '_explain_pis', 'validate', 'pis'),
+    (cei, '_explain_cei', 'validate', 'cei'),
+    (muni, '_explain_muni', 'validate', 'muni'),
+    (cnpj, '_format_cnpj', 'format', 'cnpj'),
+    (cpf, '_format_cpf', 'format', 'cpf'),
+    (pis, '_format_pis', 'format', 'pis'),
+    (cei, '_format_cei', 'format', 'cei'),
+    (cep, '_format_cep', 'format', 'cep'),
+]
+
+# upper bounds of latency histogram buckets, in nanoseconds
+LATENCY_BUCKETS = (250, 500, 1000, 2500, 5000, 10000, 25000, 100000,
+                   1000000)
+
+_lock = threading.Lock()  # guards _originals and _shards
+_originals = {}  # original functions by (module name, function name)
+_shards = {}  # thread id -> (lock, metrics by (operation, kind))
+
+
+def enable():
+    """Start recording metrics. Does nothing if already enabled."""
+    with _lock:
+        if _originals:
+            return
+        for module, name, op, kind in TARGETS:
+            func = getattr(module, name)
+            _originals[(module.__name__, name)] = func
+            setattr(module, name, _instrument(func, op, kind))
+        backend._scalar_only = True
+
+
+def disable():
+    """Stop recording metrics; recorded metrics are kept until reset."""
+    with _lock:
+        for module, name, _, _ in TARGETS:
+            func = _originals.pop((module.__name__, name), None)
+            if func is not None:
+                setattr(module, name, func)
+        backend._scalar_only = False
+
+
+def is_enabled():
+    """Check whether metrics are being recorded."""
+    return bool(_originals)
+
+
+def reset():
+    """Discard all recorded metrics."""
+    with _lock:
+        for shard_lock, stats in _shards.values():
+            with shard_lock:
+                stats.clear()
+
+
+def snapshot():
+    """Return a copy of recorded metrics as a nested dict, keyed by
+    operation ('validate' or 'format') and kind of identifier.
+
+    Each entry has the number of calls and errors, the number of calls by
+    input shape (see util.input_shape), the latency histogram, and for
+    validation, the number of calls by Reason name and of autopadded
+    valid identifiers.
+    """
+    totals = {}
+    with _lock:
+        for shard_lock, shard in _shards.values():
+            with shard_lock:
+                for key, stats in shard.items():
+                    _merge(totals.setdefault(key, _new_stats()), stats)
+
+    out = {}
+    for (op, kind), stats in sorted(totals.items()):
+        entry = {
+            'calls': stats['calls'],
+            'errors': stats['errors'],
+            'inputs': dict(stats['inputs']),
+            'latency': {
+                'buckets_ns': list(LATENCY_BUCKETS),
+                'counts': list(stats['latency']),
+                'sum_ns': stats['latency_sum'],
+            },
+        }
+        if op == 'validate':
+            entry['reasons'] = {Reason(k).name: n for k, n
+                                in sorted(stats['reasons'].items())}
+            entry['autopad'] = stats['reasons'].get(PADDED, 0)
+        out.setdefault(op, {})[kind] = entry
+    return out
+
+
+def to_prometheus(prefix='brazilnum'):
+    """Return recorded metrics in the Prometheus text exposition format."""
+    lines = []
+
+    def add(name, mtype, help_text, rows):
+        lines.append('# HELP {0}_{1} {2}'.format(prefix, name, help_text))
+        lines.append('# TYPE {0}_{1} {2}'.format(prefix, name, mtype))
+        for labels, value in rows:
+            labels = ','.join('{0}="{1}"'.format(k, v) for k, v in labels)
+            lines.append('{0}_{1}{{{2}}} {3}'.format(prefix, name, labels,
+                                                     value))
+
+    snap = [(op, kind, entry) for op, kinds in snapshot().items()
+            for kind, entry in kinds.items()]
+    add('calls_total', 'counter', 'Calls by operation and kind.',
+        [((('op', op), ('kind', kind)), e['calls']) for op, kind, e in snap])
+    add('errors_total', 'counter', 'Calls that raised an exception.',
+        [((('op', op), ('kind', kind)), e['errors']) for op, kind, e in snap])
+    add('inputs_total', 'counter', 'Calls by shape of the input.',
+        [((('op', op), ('kind', kind), ('shape', shape)), n)
+         for op, kind, e in snap for shape, n in sorted(e['inputs'].items())])
+    add('reasons_total', 'counter', 'Validations by Reason code.',
+        [((('kind', kind), ('reason', reason)), n)
+         for op, kind, e in snap
+         for reason, n in e.get('reasons', {}).items()])
+
+    lines.append('# HELP {0}_latency_seconds Latency of calls.'
+                 .format(prefix))
+    lines.append('# TYPE {0}_latency_seconds histogram'.format(prefix))
+    for op, kind, e in snap:
+        labels = 'op="{0}",kind="{1}"'.format(op, kind)
+        total = 0
+        bounds = [b / 1e9 for b in LATENCY_BUCKETS] + ['+Inf']
+        for bound, count in zip(bounds, e['latency']['counts']):
+            total += count
+            lines.append('{0}_latency_seconds_bucket{{{1},le="{2}"}} {3}'
+                         .format(prefix, labels, bound, total))
+        lines.append('{0}_latency_seconds_sum{{{1}}} {2}'
+                     .format(prefix, labels, e['latency']['sum_ns'] / 1e9))
+        lines.append('{0}_latency_seconds_count{{{1}}} {2}'
+                     .format(prefix, labels, total))
+    return '\n'.join(lines) + '\n'
+
+
+def _instrument(func, op, kind):
+    """Wrap a function so that every call records metrics."""
+
+    @wraps(func)
+    def wrapper(identifier, *args, **kwargs):
+        start = perf_counter_ns()
+        try:
+            result = func(identifier, *args, **kwargs)
+        except Exception:
+            _record(op, kind, identifier, perf_counter_ns() - start, None,
+                    error=True)
+            raise
+        reason = result if op == 'validate' else None
+        _record(op, kind, identifier, perf_counter_ns() - start, reason)
+        return result
+
+    return wrapper
+
+
+def _record(op, kind, identifier, elapsed, reason, error=False):
+    """Add one call to the metrics of an operation and kind."""
+    shape = input_shape(identifier)
+    bucket = len(LATENCY_BUCKETS)
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if elapsed <= bound:
+            bucket = i
+            break
+    shard = _shards.get(get_ident())
+    if shard is None:
+        with _lock:
+            # ids are unique among running threads, so only this thread
+            # records into its shard; a later thread may reuse it
+            shard = _shards.setdefault(get_ident(), (threading.Lock(), {}))
+    shard_lock, shard = shard
+    with shard_lock:
+        stats = shard.get((op, kind))
+        if stats is None:
+            stats = shard[(op, kind)] = _new_stats()
+        stats['calls'] += 1
+        stats['errors'] += error
+        stats['inputs'][shape] = stats['inputs'].get(shape, 0) + 1
+        if reason is not None:
+            stats['reasons'][reason] = stats['reasons'].get(reason, 0) + 1
+        stats['latency'][bucket] += 1
+        stats['latency_sum'] += elapsed
+
+
+def _new_stats():
+    """Empty metrics of one operation and kind."""
+    return {
+        'calls': 0, 'errors': 0, 'inputs': {}, 'reasons': {},
+        'latency': [0] * (len(LATENCY_BUCKETS) + 1),
+        'latency_sum': 0,
+    }
+
+
+def _merge(into, stats):
+    """Add metrics of one operation and kind into another."""
+    into['calls'] += stats['calls']
+    into['errors'] += stats['errors']
+    for shape, n in stats['inputs'].items():
+        into['inputs'][shape] = into['inputs'].get(shape, 0) + n
+    for reason, n in stats['reasons'].items():
+        into['reasons'][reason] = into['reasons'].get(reason, 0) + n
+    for i, n in enumerate(stats['latency']):
+        into['latency'][i] += n
+    into['latency_sum'] += stats['latency_sum']
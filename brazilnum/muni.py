@@ -1,6 +1,18 @@
 #!/usr/bin/env python
 
-from .util import clean_id, is_missing
+import os
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import namedtuple
+from operator import getitem
+
+from .uf import UF_CODES, UF_REGIONS
+from .backend import _batch_kernel, _explain_rows
+from .util import (
+    BAD_PATTERN, DV1_MISMATCH, MISSING, PADDED, TOO_LONG, TOO_SHORT, VALID,
+    clean_id, is_missing
+)
 
 """
 Functions for working with Brazilian municipality (municipio) codes.
@@ -9,6 +21,18 @@ Functions for working with Brazilian municipality (municipio) codes.
 
 MUNI_WEIGHTS = [1, 2, 1, 2, 1, 2]
 
+Municipio = namedtuple('Municipio', ['muni', 'name', 'uf', 'region'])
+
+# table of IBGE municipio codes and names, one "code<TAB>name" per line;
+# the state and region are derived from the code, so they are not stored
+MUNI_TABLE = os.path.join(os.path.dirname(__file__), 'data', 'municipios.tsv')
+
+_names = None  # municipio names by code, loaded on first use
+_names_lock = threading.Lock()
+
+_name_index = None  # (codes by normalized name, sorted names), on first use
+_name_index_lock = threading.Lock()
+
 # there are 9 IBGE municipal codes with invalid check digits;
 # see, http://www.sefaz.al.gov.br/nfe/notas_tecnicas/NT2008.004.pdf
 SHIM = {
@@ -30,19 +54,35 @@ def validate_muni(muni):
     Missing values (None or NaN) are considered invalid; other non-str,
     non-int input raises TypeError.
     """
-    if is_missing(muni):
-        return False
-    muni = clean_id(muni)
-    # municipal codes are 7 digits long, and cannot start with 0
-    if len(muni) != 7:
-        return False
+    return _explain_muni(muni) <= PADDED
 
-    if muni[0] == '0':
-        return False
 
-    digits = [int(k) for k in muni]
-    valid = _muni_check(digits[:-1]) == digits[-1]
-    return valid or muni in SHIM  # need to check exceptions list
+def validate_muni_many(munis):
+    """Check whether each municipio code in an iterable is valid."""
+    kernel = _batch_kernel('muni')
+    if kernel is None:
+        return [_explain_muni(k) <= PADDED for k in munis]
+    prepared = [_prepare_muni(k) for k in munis]
+    return [code <= PADDED for code in _explain_rows(prepared, kernel)]
+
+
+def explain_muni(muni):
+    """Find why a municipio code is valid or invalid, as a Reason code.
+
+    Missing values (None or NaN) are Reason.MISSING; other non-str,
+    non-int input raises TypeError.
+    """
+    return _explain_muni(muni)
+
+
+def explain_muni_many(munis):
+    """Find Reason codes for an iterable of municipio codes, as a bytearray
+    with one code per municipio; use Reason(code) to get the name of a code.
+    """
+    kernel = _batch_kernel('muni')
+    if kernel is None:
+        return bytearray([_explain_muni(k) for k in munis])
+    return _explain_rows([_prepare_muni(k) for k in munis], kernel)
 
 
 def muni_check_digit(muni):
@@ -58,6 +98,239 @@ def muni_check_digit(muni):
     return _muni_check(digits)
 
 
+def muni_check_digit_many(munis, real_codes=False):
+    """Find the check digit of each municipio code in an iterable, like
+    muni_check_digit, as a list; missing values and codes shorter than 6
+    digits give None.
+
+    As in muni_check_digit, the codes in SHIM get their real check digit
+    when the full 7-digit code is given. With real_codes=True, their 6-digit
+    stems do too, so that codes rebuilt from stems are the codes in use.
+    """
+    tables = _MUNI_TERMS
+    stems = _SHIM_STEMS if real_codes else {}
+    out = []
+    for k in munis:
+        if not (k.__class__ is str and k.isdigit() and k.isascii()):
+            if is_missing(k):
+                out.append(None)
+                continue
+            k = clean_id(k)
+        if len(k) < 6:
+            out.append(None)
+        elif k in SHIM:
+            out.append(SHIM[k])
+        elif k in stems:
+            out.append(stems[k])
+        else:
+            # as in _muni_check
+            modulo = sum(map(getitem, tables, k[:6].encode('ascii'))) % 10
+            out.append(0 if modulo == 0 else 10 - modulo)
+    return out
+
+
+def muni_exists(muni):
+    """Check whether municipio code is in the IBGE table of municipios.
+
+    Unlike validate_muni, codes with a correct check digit that were never
+    assigned to a municipio are rejected. Missing values (None or NaN) are
+    considered invalid; other non-str, non-int input raises TypeError.
+    """
+    if is_missing(muni):
+        return False
+    return clean_id(muni) in _muni_names()
+
+
+def muni_info(muni):
+    """Find the name, state (UF), and region of a municipio code.
+
+    Returns a Municipio namedtuple, or None if the code is missing or not
+    in the IBGE table of municipios.
+    """
+    if is_missing(muni):
+        return None
+    muni = clean_id(muni)
+    name = _muni_names().get(muni)
+    if name is None:
+        return None
+    uf = UF_CODES[muni[:2]]
+    return Municipio(muni, name, uf, UF_REGIONS[uf])
+
+
+def muni_info_columns(munis):
+    """Find the name, state, and region of an iterable of municipio codes.
+
+    Returns a dict of columns, one per Municipio field. Codes that are
+    missing or not in the IBGE table are None in every column.
+    """
+    names = _muni_names()
+    codes = [None if is_missing(k) else clean_id(k) for k in munis]
+    codes = [k if k in names else None for k in codes]
+    ufs = [None if k is None else UF_CODES[k[:2]] for k in codes]
+    return {
+        'muni': codes,
+        'name': [None if k is None else names[k] for k in codes],
+        'uf': ufs,
+        'region': [None if k is None else UF_REGIONS[k] for k in ufs],
+    }
+
+
+def find_muni(name, uf=None):
+    """Find codes of municipios with a name, ignoring accents, case, and
+    punctuation. Optionally restrict the search to one state (UF).
+
+    Returns a list of codes, since many municipios share a name.
+    """
+    codes, _ = _muni_name_index()
+    return _filter_uf(codes.get(_normalize_name(name), []), uf)
+
+
+def find_muni_prefix(prefix, uf=None):
+    """Find codes of municipios whose names start with a prefix, ignoring
+    accents, case, and punctuation. Codes are sorted by name.
+    """
+    codes, names = _muni_name_index()
+    prefix = _normalize_name(prefix)
+    found = []
+    for i in range(bisect_left(names, prefix), len(names)):
+        if not names[i].startswith(prefix):
+            break
+        found.extend(codes[names[i]])
+    return _filter_uf(found, uf)
+
+
+def find_muni_fuzzy(name, uf=None, max_distance=2):
+    """Find codes of municipios whose names are within an edit distance of
+    a name, ignoring accents, case, and punctuation. Codes are sorted by
+    distance, then by name. Restricting the search to one state (UF) is
+    much faster and avoids matches in other states.
+    """
+    codes, names = _muni_name_index()
+    name = _normalize_name(name)
+    if uf is not None:
+        state = _uf_code(uf)
+        names = [k for k in names if any(c[:2] == state for c in codes[k])]
+    found = []
+    for other in names:
+        dist = _edit_distance(name, other, max_distance)
+        if dist <= max_distance:
+            found.append((dist, other))
+    found.sort()
+    return _filter_uf([c for _, k in found for c in codes[k]], uf)
+
+
+def _normalize_name(name):
+    """Strip accents, casefold, and split a name into words."""
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c if c.isalnum() else ' ' for c in name
+                   if not unicodedata.combining(c))
+    return ' '.join(name.casefold().split())
+
+
+def _edit_distance(a, b, bound):
+    """Levenshtein distance between two strings, or bound + 1 as soon as
+    the distance is known to exceed bound.
+    """
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        curr = [i]
+        for j, cb in enumerate(b, 1):
+            curr.append(min(prev[j] + 1, curr[j - 1] + 1,
+                            prev[j - 1] + (ca != cb)))
+        if min(curr) > bound:
+            return bound + 1
+        prev = curr
+    return prev[-1]
+
+
+def _filter_uf(codes, uf):
+    """Keep codes of municipios in a state, given as UF or IBGE code."""
+    if uf is None:
+        return list(codes)
+    state = _uf_code(uf)
+    return [k for k in codes if k[:2] == state]
+
+
+def _uf_code(uf):
+    """Convert a state abbreviation (e.g. 'SP') to its IBGE code."""
+    uf = str(uf).upper()
+    if uf in UF_CODES:
+        return uf
+    for code, abbrev in UF_CODES.items():
+        if abbrev == uf:
+            return code
+    raise ValueError('Unknown UF: {0}'.format(uf))
+
+
+def _muni_name_index():
+    """Build the index of municipio codes by normalized name, once."""
+    global _name_index
+    if _name_index is None:
+        with _name_index_lock:
+            if _name_index is None:
+                codes = {}
+                for code, name in sorted(_muni_names().items()):
+                    codes.setdefault(_normalize_name(name), []).append(code)
+                _name_index = (codes, sorted(codes))
+    return _name_index
+
+
+def _muni_names():
+    """Load the table of municipio names by code, once per process."""
+    global _names
+    if _names is None:
+        with _names_lock:
+            if _names is None:
+                with open(MUNI_TABLE, encoding='utf-8') as fh:
+                    _names = dict(line.rstrip('\n').split('\t') for line in fh)
+    return _names
+
+
+def _explain_muni(muni):
+    """Find Reason code of a municipio code; see explain_muni."""
+    reason, muni = _prepare_muni(muni)
+    if muni is None:
+        return reason
+    digits = [int(k) for k in muni]  # identifier digits
+    if _muni_check(digits[:-1]) != digits[-1]:
+        return DV1_MISMATCH
+    return VALID
+
+
+def _prepare_muni(muni):
+    """Clean a municipio code for checking, as (reason, muni); muni is None
+    when the reason is known without the check digit.
+    """
+    if is_missing(muni):
+        return MISSING, None
+    muni = clean_id(muni)
+    # municipal codes are 7 digits long, and cannot start with 0
+    if len(muni) < 7:
+        return TOO_SHORT, None
+    if len(muni) > 7:
+        return TOO_LONG, None
+
+    if muni[0] == '0':
+        return BAD_PATTERN, None
+
+    # codes on the exceptions list are valid despite their check digit
+    if muni in SHIM:
+        return VALID, None
+    return VALID, muni
+
+
+# terms of the check-digit sum by character code, for each stem position
+_MUNI_TERMS = [
+    bytes(48) + bytes(n if n < 10 else 1 + n % 10 for n in range(0, 10 * w, w))
+    for w in MUNI_WEIGHTS
+]
+
+# real check digits of the codes in SHIM, by their 6-digit stems
+_SHIM_STEMS = {code[:6]: digit for code, digit in SHIM.items()}
+
+
 def _muni_check(digits):
     """Calculate check digit from iterable of integers."""
     digmul = (w * k for w, k in zip(MUNI_WEIGHTS, digits))
@@ -3,7 +3,12 @@
 import re
 from random import randint
 
-from .util import clean_id, is_missing, pad_id
+from .backend import _batch_kernel, _explain_rows
+from .util import (
+    ALL_ZEROS, DV1_MISMATCH, MISSING, PADDED, TOO_LONG, TOO_SHORT, VALID,
+    _count_complete, _id_range, _stem_sums_many, _weighted_sums, clean_id,
+    is_missing, pad_id, pad_id_many
+)
 
 """
 Functions for working with Brazilian PIS/PASEP identifiers.
@@ -20,23 +25,35 @@ def validate_pis(pis, autopad=True):
     Missing values (None or NaN) are considered invalid; other non-str,
     non-int input raises TypeError.
     """
-    if is_missing(pis):
-        return False
-    pis = clean_id(pis)
+    return _explain_pis(pis, autopad) <= PADDED
 
-    # all complete PIS/PASEP are 11 digits long
-    if len(pis) < 11:
-        if not autopad:
-            return False
-        pis = pad_pis(pis)
 
-    elif len(pis) > 11:
-        return False
+def validate_pis_many(pises, autopad=True):
+    """Check whether each PIS/PASEP in an iterable is valid."""
+    kernel = _batch_kernel('pis')
+    if kernel is None:
+        return [_explain_pis(k, autopad) <= PADDED for k in pises]
+    prepared = [_prepare_pis(k, autopad) for k in pises]
+    return [code <= PADDED for code in _explain_rows(prepared, kernel)]
 
-    if pis == '00000000000':
-        return False
 
-    return int(pis[-1]) == _pis_check(pis)
+def explain_pis(pis, autopad=True):
+    """Find why a PIS/PASEP is valid or invalid, as a Reason code.
+
+    Missing values (None or NaN) are Reason.MISSING; other non-str,
+    non-int input raises TypeError.
+    """
+    return _explain_pis(pis, autopad)
+
+
+def explain_pis_many(pises, autopad=True):
+    """Find Reason codes for an iterable of PIS/PASEP, as a bytearray with
+    one code per PIS/PASEP; use Reason(code) to get the name of a code.
+    """
+    kernel = _batch_kernel('pis')
+    if kernel is None:
+        return bytearray([_explain_pis(k, autopad) for k in pises])
+    return _explain_rows([_prepare_pis(k, autopad) for k in pises], kernel)
 
 
 def pis_check_digit(pis):
@@ -45,7 +62,22 @@ def pis_check_digit(pis):
     if len(pis) < 10:
         raise ValueError(
             'PIS/PASEP must be at least 10 digits: {0}'.format(pis))
-    return _pis_check(pis)
+    return _pis_check([int(k) for k in pis[:10]])
+
+
+def pis_check_digit_many(pises):
+    """Find the check digit of each PIS/PASEP in an iterable, like
+    pis_check_digit, as a list; missing values and PIS/PASEP shorter than
+    10 digits give None.
+    """
+    out = []
+    for sums in _stem_sums_many(pises, 10, [PIS_WEIGHTS]):
+        if sums is None:
+            out.append(None)
+            continue
+        cs = sums[0] % 11  # as in _pis_check
+        out.append(0 if cs < 2 else 11 - cs)
+    return out
 
 
 def pis_check_digits(pis):
@@ -55,9 +87,23 @@ def pis_check_digits(pis):
 
 def format_pis(pis):
     """Applies typical 000.0000.000-0 formatting to PIS/PASEP."""
+    return _format_pis(pis)
+
+
+def format_pis_many(pises):
+    """Format each PIS/PASEP in an iterable like format_pis, as a list;
+    missing values give None.
+    """
+    return [None if k is None else '%s.%s.%s-%s' % (
+        k[:3], k[3:7], k[7:10], k[10]) for k in pad_id_many(pises, 11)]
+
+
+def mask_pis(pis, mask='*'):
+    """Format a PIS/PASEP hiding the first three digits and the check
+    digit, as in ***.4567.890-*.
+    """
     pis = pad_pis(pis)
-    fmt = '{0}.{1}.{2}-{3}'
-    return fmt.format(pis[:3], pis[3:7], pis[7:10], pis[10])
+    return '{0}.{1}.{2}-{3}'.format(mask * 3, pis[3:7], pis[7:10], mask)
 
 
 def pad_pis(pis, validate=False):
@@ -68,6 +114,13 @@ def pad_pis(pis, validate=False):
     return padded
 
 
+def pad_pis_many(pises):
+    """Pad each PIS/PASEP in an iterable like pad_pis, as a list; missing
+    values give None.
+    """
+    return pad_id_many(pises, 11)
+
+
 def random_pis(formatted=True):
     """Create a random, valid PIS identifier."""
     pis = randint(1000000000, 9999999999)
@@ -77,9 +130,82 @@ def random_pis(formatted=True):
     return pis
 
 
-def _pis_check(pis):
-    """Calculate check digit from string."""
-    digits = [int(k) for k in pis[:11]]
-    # find check digit
+def iter_valid_pis(start, stop, formatted=False):
+    """Iterate over the valid PIS/PASEP in range(start, stop), in order, as
+    11-digit strings.
+
+    The check digit is updated as the 10-digit stem increases instead of
+    recalculated, so each PIS/PASEP takes constant time.
+    """
+    start, stop = _id_range(start, stop, 11)
+    if start >= stop:
+        return
+    stems = _weighted_sums(start // 10, (stop - 1) // 10 + 1, 10,
+                           [PIS_WEIGHTS])
+    for stem, (digsum,) in stems:
+        cs = digsum % 11  # as in _pis_check
+        pis = stem * 10 + (0 if cs < 2 else 11 - cs)
+        if start <= pis < stop:
+            yield format_pis(pis) if formatted else '%011i' % pis
+
+
+def count_valid_pis(start, stop):
+    """Count the valid PIS/PASEP in range(start, stop), in constant
+    time.
+    """
+    start, stop = _id_range(start, stop, 11)
+    return _count_complete(start, stop, 10, _complete_pis)
+
+
+def _explain_pis(pis, autopad=True):
+    """Find Reason code of a PIS/PASEP; see explain_pis."""
+    reason, pis = _prepare_pis(pis, autopad)
+    if pis is None:
+        return reason
+    digits = [int(k) for k in pis]  # identifier digits
+    if _pis_check(digits) != digits[-1]:
+        return DV1_MISMATCH
+    return reason
+
+
+def _prepare_pis(pis, autopad=True):
+    """Clean a PIS/PASEP for checking, as (reason, pis); pis is None
+    when the reason is known without the check digit.
+    """
+    if is_missing(pis):
+        return MISSING, None
+    pis = clean_id(pis)
+    reason = VALID
+
+    # all complete PIS/PASEP are 11 digits long
+    if len(pis) < 11:
+        if not autopad:
+            return TOO_SHORT, None
+        pis = pad_pis(pis)
+        reason = PADDED
+
+    elif len(pis) > 11:
+        return TOO_LONG, None
+
+    if pis == '00000000000':
+        return ALL_ZEROS, None
+
+    return reason, pis
+
+
+def _format_pis(pis):
+    """Format a PIS/PASEP; see format_pis."""
+    pis = pad_pis(pis)
+    fmt = '{0}.{1}.{2}-{3}'
+    return fmt.format(pis[:3], pis[3:7], pis[7:10], pis[10])
+
+
+def _pis_check(digits):
+    """Calculate check digit from iterable of integers."""
     cs = sum(w * k for w, k in zip(PIS_WEIGHTS, digits)) % 11
     return 0 if cs < 2 else 11 - cs
+
+
+def _complete_pis(stem):
+    """Find the valid PIS/PASEP of a 10-digit stem, as an integer."""
+    return stem * 10 + _pis_check([int(k) for k in '%010i' % stem])
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+import hashlib
+from functools import lru_cache
+
+from .cei import pad_cei
+from .cnpj import _pad_cnpj_fast
+from .cpf import pad_cpf
+from .pis import pad_pis
+from .util import is_missing
+
+"""
+Keyed pseudonymization of identifiers, for sharing data under the LGPD.
+
+Identifiers are canonicalized by padding, so 968.811.342-58, 96881134258
+and the integer 96881134258 give the same token, and then hashed with
+HMAC under a secret key. Values with no digits other than zeros, such as
+'' or 'n/a', have no token, so junk values are not joined as one person.
+Without the key, tokens cannot be reversed by hashing every possible CPF.
+
+"""
+
+# functions that turn any accepted input into the canonical identifier
+CANONICAL = {
+    'cnpj': _pad_cnpj_fast,
+    'cpf': pad_cpf,
+    'pis': pad_pis,
+    'cei': pad_cei,
+}
+
+
+class Pseudonymizer(object):
+    """Turn identifiers of one kind into HMAC tokens under a secret key.
+
+    Tokens are hex digests of the canonical identifier, optionally cut to
+    the first length characters. The most recent cache_size tokens are
+    kept, so repeated identifiers are hashed only once.
+    """
+
+    def __init__(self, key, kind='cpf', digest='sha256', length=None,
+                 cache_size=65536):
+        if kind not in CANONICAL:
+            raise ValueError('Unsupported kind of identifier: {0}'
+                             .format(kind))
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        self.kind = kind
+        self.digest = digest
+        self.length = length
+        self._canonical = CANONICAL[kind]
+
+        # HMAC (RFC 2104) with the keyed inner and outer hash states
+        # computed once, so each token only copies and updates them
+        inner = hashlib.new(digest)
+        outer = hashlib.new(digest)
+        block = inner.block_size
+        if len(key) > block:
+            key = hashlib.new(digest, key).digest()
+        key = key.ljust(block, b'\0')
+        inner.update(bytes(k ^ 0x36 for k in key))
+        outer.update(bytes(k ^ 0x5C for k in key))
+        self._inner = inner
+        self._outer = outer
+        self._token = lru_cache(maxsize=cache_size)(self._hmac)
+
+    def token(self, identifier):
+        """Find the token of one identifier; None if it is missing or all
+        zeros once canonicalized.
+        """
+        if is_missing(identifier):
+            return None
+        canonical = self._canonical(identifier)
+        if not canonical.strip('0'):
+            return None
+        return self._token(canonical)
+
+    def tokens(self, identifiers):
+        """Find the tokens of an iterable of identifiers, as a list; None
+        for missing values, values that are all zeros once canonicalized,
+        and identifiers that cannot be canonicalized.
+        """
+        canonical = self._canonical
+        token = self._token
+        out = []
+        for identifier in identifiers:
+            if is_missing(identifier):
+                out.append(None)
+                continue
+            try:
+                value = canonical(identifier)
+            except ValueError:
+                out.append(None)
+                continue
+            out.append(token(value) if value.strip('0') else None)
+        return out
+
+    def _hmac(self, canonical):
+        """Calculate the token of a canonical identifier."""
+        inner = self._inner.copy()
+        inner.update(canonical.encode('ascii'))
+        outer = self._outer.copy()
+        outer.update(inner.digest())
+        return outer.hexdigest()[:self.length]
+
+
+def pseudonymize(values, key, kind='cpf', digest='sha256', length=None):
+    """Turn an iterable of identifiers into HMAC tokens under a secret key,
+    as a list; see Pseudonymizer.
+
+    Pseudonymizers of recent keys are reused, with their caches of tokens.
+    """
+    return _pseudonymizer(key, kind, digest, length).tokens(values)
+
+
+@lru_cache(maxsize=8)
+def _pseudonymizer(key, kind, digest, length):
+    """Create a Pseudonymizer, or reuse a recent one."""
+    return Pseudonymizer(key, kind, digest, length)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+import math
+import random
+from collections import Counter, namedtuple
+from collections.abc import Sequence
+from itertools import count, islice
+from statistics import NormalDist
+
+from .backend import _prepared_codes, _preparers
+from .util import PADDED, Reason, clean_id, input_shape
+
+"""
+Data-quality profiles of columns of identifiers, from a random sample.
+
+Rows are sampled uniformly without replacement: lists and tuples by
+index, other iterables by reservoir sampling (Li's Algorithm L), which
+skips runs of rows in C with itertools.islice instead of drawing a random
+number for each row. The sample is checked with the batch kernels of the
+current backend, so a profile of 100 million rows takes about as long as
+reading them once.
+
+"""
+
+Profile = namedtuple('Profile', ['rows', 'sampled', 'valid_rate',
+                                 'valid_interval', 'reasons', 'shapes',
+                                 'autopad_rate', 'duplicate_rate'])
+
+
+def profile_column(values, kind='cnpj', sample=100000, autopad=True,
+                   confidence=0.95, seed=None):
+    """Profile the quality of a column of identifiers from a random sample
+    of at most sample rows.
+
+    Returns a Profile with the number of rows and of rows sampled, and,
+    as fractions of the sample: the valid rate, with its Wilson score
+    interval at confidence; a dict of rates by Reason name; a dict of
+    rates by input shape (see util.input_shape); the share of valid
+    identifiers that are valid only once padded; and the share of valid
+    identifiers that repeat another in the sample. Duplicates are counted
+    within the sample, so unless the whole column is sampled, the
+    duplicate rate understates the rate of the column.
+
+    Rates are None for an empty column. Non-str, non-int values other
+    than missing values raise TypeError, as in the explain functions.
+    """
+    preparers = _preparers()
+    if kind not in preparers:
+        raise ValueError('Unsupported kind of identifier: {0}'.format(kind))
+    if not 0 < confidence < 1:
+        raise ValueError('confidence must be between 0 and 1')
+    rows, picked = _sample(values, sample, random.Random(seed))
+    n = len(picked)
+    if not n:
+        return Profile(rows, 0, None, None, {}, {}, None, None)
+
+    prepare = preparers[kind]
+    prepared = [prepare(k, autopad) for k in picked]
+    codes = _prepared_codes(kind, prepared)
+    # valid rows are None when valid without a check (muni.SHIM codes)
+    valid = [clean_id(v) if k is None else k
+             for v, (_, k), code in zip(picked, prepared, codes)
+             if code <= PADDED]
+    reasons = Counter(codes)
+    shapes = Counter(input_shape(k) for k in picked)
+
+    if rows == n:  # the whole column: rates are exact
+        interval = (len(valid) / n, len(valid) / n)
+    else:
+        interval = _wilson(len(valid), n, confidence)
+    return Profile(
+        rows, n, len(valid) / n, interval,
+        {Reason(code).name: c / n for code, c in sorted(reasons.items())},
+        {shape: c / n for shape, c in shapes.most_common()},
+        reasons[PADDED] / len(valid) if valid else None,
+        1 - len(set(valid)) / len(valid) if valid else None,
+    )
+
+
+def _sample(values, size, rng):
+    """Sample at most size values uniformly without replacement, as
+    (number of values, sample).
+    """
+    if size < 1:
+        raise ValueError('sample must be at least 1')
+    if isinstance(values, Sequence) and not isinstance(values, str):
+        rows = len(values)
+        if rows <= size:
+            return rows, list(values)
+        return rows, [values[i] for i in sorted(rng.sample(range(rows),
+                                                           size))]
+
+    # Algorithm L: the gap to the next row that enters the reservoir
+    # follows a geometric distribution, so skipped rows cost no randomness
+    counter = count()
+    it = zip(values, counter)  # counter only advances past real values
+    reservoir = [k for k, _ in islice(it, size)]
+    if len(reservoir) < size:
+        return len(reservoir), reservoir
+    w = math.exp(math.log(1 - rng.random()) / size)  # 1 - random() > 0
+    while True:
+        skip = int(math.log(1 - rng.random()) / math.log1p(-w))
+        item = next(islice(it, skip, None), None)
+        if item is None:
+            return next(counter), reservoir
+        reservoir[rng.randrange(size)] = item[0]
+        w *= math.exp(math.log(1 - rng.random()) / size)
+
+
+def _wilson(successes, n, confidence):
+    """Wilson score interval of a binomial proportion."""
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    p = successes / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - half), min(1.0, centre + half)
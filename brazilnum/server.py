@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+
+import argparse
+import asyncio
+import json
+from functools import partial
+
+from .batch import get_kernel, run
+
+"""
+Asyncio server that validates and formats identifiers in micro-batches.
+
+Clients send one JSON request per line over TCP, and receive one JSON
+response per line, in the order of their requests. A request names an
+operation ('validate', 'explain', 'format', 'pad', or 'mask'), a kind of
+identifier, and either one value or a list of values:
+
+    {"id": 1, "op": "validate", "kind": "cnpj", "value": "02.558.157/0001-62"}
+    {"id": 2, "op": "format", "kind": "cpf", "values": [96881134258, null]}
+
+Responses echo the id, with a "result" for one value, "results" for a
+list of values, or an "error" message:
+
+    {"id": 1, "result": true}
+    {"id": 2, "results": ["968.811.342-58", null]}
+
+Concurrent requests for the same operation and kind, from any client, are
+combined into one batch of at most max_batch_size values, waiting at most
+max_wait seconds for a batch to fill, and each batch runs in an executor.
+
+"""
+
+DEFAULT_PORT = 8786
+
+
+class MicroBatcher(object):
+    """Combine concurrent requests for the same operation and kind of
+    identifier into batches that run in an executor.
+    """
+
+    def __init__(self, max_batch_size=1024, max_wait=0.002, executor=None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = executor
+        self._pending = {}  # (op, kind) -> [(values, future), ...]
+        self._sizes = {}  # (op, kind) -> number of pending values
+        self._timers = {}  # (op, kind) -> timer handle
+        self._tasks = set()  # running batches, kept until done
+
+    async def submit(self, op, kind, values):
+        """Apply an operation to a list of values; returns their results."""
+        get_kernel(op, kind)  # fail early for unsupported operations
+        loop = asyncio.get_running_loop()
+        key = (op, kind)
+        future = loop.create_future()
+        self._pending.setdefault(key, []).append((values, future))
+        self._sizes[key] = self._sizes.get(key, 0) + len(values)
+        if self._sizes[key] >= self.max_batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush,
+                                                key)
+        return await future
+
+    def _flush(self, key):
+        """Start running all pending requests for an operation and kind."""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        requests = self._pending.pop(key, [])
+        self._sizes.pop(key, None)
+        if requests:
+            task = asyncio.ensure_future(self._run(key, requests))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key, requests):
+        """Run one batch, passing any failure on to its requests, so that
+        none waits forever.
+        """
+        try:
+            await self._run_batch(key, requests)
+        except asyncio.CancelledError:
+            for _, future in requests:
+                future.cancel()
+            raise
+        except Exception as exc:
+            for _, future in requests:
+                _resolve(future, exception=exc)
+
+    async def _run_batch(self, key, requests):
+        """Run one batch and hand each request its share of the results."""
+        loop = asyncio.get_running_loop()
+        values = [v for vals, _ in requests for v in vals]
+        try:
+            results = await loop.run_in_executor(
+                self.executor, partial(run, key[0], key[1], values))
+        except Exception:
+            # one bad request should not fail the others in its batch
+            for vals, future in requests:
+                call = partial(run, key[0], key[1], vals)
+                try:
+                    result = await loop.run_in_executor(self.executor, call)
+                except Exception as exc:
+                    _resolve(future, exception=exc)
+                else:
+                    _resolve(future, result=result)
+            return
+        start = 0
+        for vals, future in requests:
+            _resolve(future, result=results[start:start + len(vals)])
+            start += len(vals)
+
+
+async def handle_request(batcher, line):
+    """Answer one JSON request, returning the response as a dict."""
+    rid = None
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError('request must be a JSON object')
+        rid = request.get('id')
+        op, kind = request['op'], request['kind']
+        if 'values' in request:
+            values = request['values']
+            if not isinstance(values, list):
+                raise ValueError('values must be a list')
+            return {'id': rid, 'results': await batcher.submit(op, kind,
+                                                                values)}
+        result = await batcher.submit(op, kind, [request['value']])
+        return {'id': rid, 'result': result[0]}
+    except KeyError as exc:
+        return {'id': rid, 'error': 'missing field: {0}'.format(exc)}
+    except (TypeError, ValueError) as exc:
+        return {'id': rid, 'error': str(exc)}
+
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, max_batch_size=1024,
+                max_wait=0.002, executor=None):
+    """Start the server and return an asyncio Server; use port=0 to pick
+    any free port.
+    """
+    batcher = MicroBatcher(max_batch_size, max_wait, executor)
+
+    async def client(reader, writer):
+        responses = asyncio.Queue()
+
+        async def respond():
+            # write responses in the order requests were received
+            while True:
+                task = await responses.get()
+                if task is None:
+                    break
+                writer.write(json.dumps(await task).encode() + b'\n')
+                await writer.drain()
+
+        responder = asyncio.ensure_future(respond())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    responses.put_nowait(asyncio.ensure_future(
+                        handle_request(batcher, line)))
+        finally:
+            responses.put_nowait(None)
+            try:
+                await responder
+            finally:
+                writer.close()
+
+    return await asyncio.start_server(client, host, port)
+
+
+def _resolve(future, result=None, exception=None):
+    """Set the outcome of a future, unless its client has gone away."""
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+def main(argv=None):
+    """Run the server until interrupted."""
+    parser = argparse.ArgumentParser(
+        description='Validate and format identifiers over JSON lines.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch-size', type=int, default=1024)
+    parser.add_argument('--max-wait', type=float, default=0.002,
+                        help='seconds to wait for a batch to fill')
+    args = parser.parse_args(argv)
+
+    async def run_forever():
+        server = await serve(args.host, args.port, args.max_batch_size,
+                             args.max_wait)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
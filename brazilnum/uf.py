@@ -0,0 +1,26 @@
+
+"""
+Brazilian states (unidades federativas), their IBGE codes and regions.
+
+"""
+
+# IBGE codes of the 26 states and the Distrito Federal, which are also the
+# first two digits of every municipio code
+UF_CODES = {
+    '11': 'RO', '12': 'AC', '13': 'AM', '14': 'RR', '15': 'PA', '16': 'AP',
+    '17': 'TO', '21': 'MA', '22': 'PI', '23': 'CE', '24': 'RN', '25': 'PB',
+    '26': 'PE', '27': 'AL', '28': 'SE', '29': 'BA', '31': 'MG', '32': 'ES',
+    '33': 'RJ', '35': 'SP', '41': 'PR', '42': 'SC', '43': 'RS', '50': 'MS',
+    '51': 'MT', '52': 'GO', '53': 'DF',
+}
+
+# IBGE macro-regions, keyed by the first digit of the state code
+REGIONS = {
+    '1': 'Norte',
+    '2': 'Nordeste',
+    '3': 'Sudeste',
+    '4': 'Sul',
+    '5': 'Centro-Oeste',
+}
+
+UF_REGIONS = {uf: REGIONS[code[0]] for code, uf in UF_CODES.items()}
@@ -1,5 +1,8 @@
 import re
 import math
+import operator
+from enum import IntEnum
+from zlib import crc32
 
 """
 Helper functions for validating identifiers.
@@ -9,6 +12,44 @@ Helper functions for validating identifiers.
 NONDIGIT = re.compile(r'[^0-9]')
 NONALNUM = re.compile(r'[^0-9A-Za-z]')
 
+# tables for bytes.translate, which cleans ASCII strings in one pass as
+# the expressions above do: bytes to delete, and a map to uppercase
+_NONDIGIT_BYTES = bytes(c for c in range(256) if not 48 <= c <= 57)
+_NONALNUM_BYTES = bytes(c for c in range(256)
+                        if not (48 <= c <= 57 or 65 <= c <= 90 or
+                                97 <= c <= 122))
+_UPPER_BYTES = bytes(c - 32 if 97 <= c <= 122 else c for c in range(256))
+
+
+class Reason(IntEnum):
+    """Why an identifier is valid or invalid. Codes fit in one byte, and
+    valid identifiers have the smallest codes, so an identifier is valid
+    when its code is at most PADDED.
+
+    Identifiers with a single check digit (PIS/PASEP, CEI, and municipio)
+    report a wrong check digit as DV1_MISMATCH.
+    """
+    VALID = 0
+    PADDED = 1  # valid after padding with leading zeros
+    MISSING = 2  # None or NaN
+    TOO_SHORT = 3
+    TOO_LONG = 4
+    BAD_PATTERN = 5  # wrong characters for the kind of identifier
+    ALL_ZEROS = 6
+    DV1_MISMATCH = 7  # first check digit is not correct
+    DV2_MISMATCH = 8  # second check digit is not correct
+
+
+VALID = Reason.VALID
+PADDED = Reason.PADDED
+MISSING = Reason.MISSING
+TOO_SHORT = Reason.TOO_SHORT
+TOO_LONG = Reason.TOO_LONG
+BAD_PATTERN = Reason.BAD_PATTERN
+ALL_ZEROS = Reason.ALL_ZEROS
+DV1_MISMATCH = Reason.DV1_MISMATCH
+DV2_MISMATCH = Reason.DV2_MISMATCH
+
 
 def is_missing(identifier):
     """Check whether input is a standard missing-data marker: None or
@@ -20,6 +61,27 @@ def is_missing(identifier):
     )
 
 
+def input_shape(identifier):
+    """Describe the shape of an identifier before cleaning: 'missing',
+    'int', 'str' (digits only), 'alphanumeric' (contains letters),
+    'formatted' (digits with punctuation or spaces), or 'other' for
+    unsupported types.
+    """
+    if is_missing(identifier):
+        return 'missing'
+    if isinstance(identifier, bool):
+        return 'other'
+    if isinstance(identifier, int):
+        return 'int'
+    if not isinstance(identifier, str):
+        return 'other'
+    if identifier.isdigit() and identifier.isascii():
+        return 'str'
+    if any(c.isalpha() for c in identifier):
+        return 'alphanumeric'
+    return 'formatted'
+
+
 def _check_type(identifier):
     """Raise TypeError unless input is a str or an int (excluding bool)."""
     # bool passes isinstance(x, int) but is never a real identifier
@@ -30,6 +92,11 @@ def _check_type(identifier):
 
 def clean_id(identifier):
     """Remove non-numeric characters from input."""
+    if identifier.__class__ is str and identifier.isascii():
+        if identifier.isdigit():
+            return identifier  # already clean
+        return identifier.encode('ascii').translate(
+            None, _NONDIGIT_BYTES).decode('ascii')
     _check_type(identifier)
     if isinstance(identifier, int):
         return str(identifier)
@@ -42,12 +109,41 @@ def clean_alphanumeric_id(identifier):
     letters, such as the alphanumeric CNPJ format introduced by Receita
     Federal (Instrução Normativa RFB nº 2.229/2024), effective 07/2026.
     """
+    if identifier.__class__ is str and identifier.isascii():
+        if identifier.isalnum() and (identifier.isdigit() or
+                                     identifier.isupper()):
+            return identifier  # already clean
+        return identifier.encode('ascii').translate(
+            _UPPER_BYTES, _NONALNUM_BYTES).decode('ascii')
     _check_type(identifier)
     if isinstance(identifier, int):
         return str(identifier)
     return NONALNUM.sub('', identifier).upper()
 
 
+def clean_id_many(identifiers, alphanumeric=False):
+    """Clean each identifier in an iterable like clean_id, or like
+    clean_alphanumeric_id with alphanumeric=True, as (cleaned, dirty):
+    lists of the cleaned identifiers, with None for missing values, and of
+    whether cleaning changed each identifier (e.g. removed punctuation or
+    converted an int).
+    """
+    clean = clean_alphanumeric_id if alphanumeric else clean_id
+    cleaned, dirty = [], []
+    for k in identifiers:
+        if k.__class__ is str and k.isdigit() and k.isascii():
+            cleaned.append(k)
+            dirty.append(False)
+        elif is_missing(k):
+            cleaned.append(None)
+            dirty.append(False)
+        else:
+            c = clean(k)
+            cleaned.append(c)
+            dirty.append(c != k)
+    return cleaned, dirty
+
+
 def pad_id(identifier, fmt):
     """Pad an identifier with leading zeros."""
     if not isinstance(identifier, int):
@@ -61,10 +157,136 @@ def pad_id(identifier, fmt):
     return fmt % identifier
 
 
+def pad_id_many(identifiers, length):
+    """Pad each identifier in an iterable with leading zeros to length
+    digits, as a list; missing values (None or NaN) give None.
+
+    Gives the same results as pad_id, but without converting through int,
+    and clean identifiers of the right length are used as they are.
+    """
+    out = []
+    for k in identifiers:
+        if k.__class__ is str and len(k) == length and k.isdigit() \
+                and k.isascii():
+            out.append(k)
+        elif is_missing(k):
+            out.append(None)
+        elif isinstance(k, int):
+            out.append('%.*i' % (length, k))
+        else:
+            k = clean_id(k)
+            if len(k) > length:
+                k = k.lstrip('0')  # as int() would
+            out.append(k.zfill(length))
+    return out
+
+
 def pad_alphanumeric_id(identifier, length):
     """Pad an alphanumeric identifier with leading zeros as a string.
     Unlike pad_id, this does not coerce to int, since alphanumeric
     identifiers (e.g. the new CNPJ format) cannot be represented as one.
     """
     identifier = clean_alphanumeric_id(identifier)
-    return identifier.zfill(length)
\ No newline at end of file
+    return identifier.zfill(length)
+
+
+def _stem_sums_many(identifiers, length, weights, clean=clean_id,
+                    given=False):
+    """Clean each identifier in an iterable and find the weighted sums of
+    the values (ord(c) - 48) of its first length characters, one sum per
+    list of weights, as a list of lists; None for missing values and
+    identifiers shorter than length. With given, each list ends with the
+    value of the next character, the given first check digit, or None if
+    there is none.
+
+    The characters are read as one integer with 16 bits per character and
+    multiplied by an integer that holds the weights, so that each sum is a
+    16-bit field of the product; no sum is large enough to carry.
+    """
+    multiplier = 0
+    for j, ws in enumerate(weights):
+        for i, w in enumerate(ws):
+            multiplier += w << 16 * (i + 2 * length * j)
+    fields = [(16 * (length - 1 + 2 * length * j), 48 * sum(ws))
+              for j, ws in enumerate(weights)]  # ord('0') of each weight
+    out = []
+    for k in identifiers:
+        if not (k.__class__ is str and k.isdigit() and k.isascii()):
+            if is_missing(k):
+                out.append(None)
+                continue
+            k = clean(k)
+        if len(k) < length:
+            out.append(None)
+            continue
+        product = int.from_bytes(k[:length].encode('utf-16-be'), 'big') * \
+            multiplier
+        sums = [(product >> shift & 0xFFFF) - offset
+                for shift, offset in fields]
+        if given:
+            sums.append(ord(k[length]) - 48 if len(k) > length else None)
+        out.append(sums)
+    return out
+
+
+def _partitions(padded, n_partitions, prefix=None):
+    """Find partition numbers of padded identifiers, as the CRC-32 of each
+    identifier, or of its first prefix characters, modulo n_partitions.
+    Unlike hash(), CRC-32 is the same in every process. None, and values
+    padded to all zeros (e.g. '' or 'n/a'), give None, so junk values do
+    not all land in one partition.
+    """
+    n_partitions = operator.index(n_partitions)
+    if n_partitions < 1:
+        raise ValueError('Number of partitions must be at least 1: {0}'
+                         .format(n_partitions))
+    return [None if k is None or not k.strip('0') else
+            crc32(k[:prefix].encode('utf-8')) % n_partitions for k in padded]
+
+
+def _id_range(start, stop, length):
+    """Limit a range of integer identifiers to the numbers that fit in
+    length digits, leaving out zero, which is never valid.
+    """
+    start, stop = operator.index(start), operator.index(stop)
+    return max(start, 1), min(stop, 10 ** length)
+
+
+def _count_complete(start, stop, scale, complete):
+    """Count valid identifiers in range(start, stop), where each stem has
+    exactly one valid identifier, complete(stem), between stem * scale and
+    stem * scale + scale - 1. Only the stems at each end of the range are
+    checked, so counting takes constant time.
+    """
+    if start >= stop:
+        return 0
+    first, last = start // scale, (stop - 1) // scale
+    count = last - first + 1
+    for stem in {first, last}:
+        if not start <= complete(stem) < stop:
+            count -= 1
+    return count
+
+
+def _weighted_sums(start, stop, width, weights):
+    """Iterate over the stems in range(start, stop), as width digits, with
+    their weighted digit sums for each list of weights.
+
+    Sums are updated as the stem increases instead of recalculated, which
+    takes constant time on average. The same list of sums is yielded each
+    time, so it must be read before the next stem.
+    """
+    digits = [int(k) for k in '%0*i' % (width, start)]
+    sums = [sum(w * k for w, k in zip(ws, digits)) for ws in weights]
+    pairs = list(enumerate(weights))
+    for stem in range(start, stop):
+        yield stem, sums
+        i = width - 1
+        while digits[i] == 9 and i > 0:  # carry into the next digit
+            digits[i] = 0
+            for j, ws in pairs:
+                sums[j] -= 9 * ws[i]
+            i -= 1
+        digits[i] += 1
+        for j, ws in pairs:
+            sums[j] += ws[i]
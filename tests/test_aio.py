@@ -0,0 +1,71 @@
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from brazilnum import aio
+
+
+async def _source(values):
+    """Yield values like an async database cursor or message consumer."""
+    for value in values:
+        await asyncio.sleep(0)
+        yield value
+
+
+def _collect(stream):
+    """Run an async stream to completion and list what it yields."""
+    async def main():
+        return [chunk async for chunk in stream]
+    return asyncio.run(main())
+
+
+def test_validate_stream():
+    """Check validation of an async stream of identifiers in chunks."""
+
+    values = ['02.558.157/0001-62', '02.558.157/0001-55', None] * 5
+    chunks = _collect(aio.validate_stream(_source(values), kind='cnpj',
+                                          chunk_size=4, max_in_flight=2))
+
+    assert [len(v) for v, _ in chunks] == [4, 4, 4, 3]
+    assert [v for vals, _ in chunks for v in vals] == values
+    assert [r for _, res in chunks for r in res] == [True, False, False] * 5
+
+
+def test_validate_stream_options():
+    """Check other operations, executors, and regular iterables."""
+
+    with ThreadPoolExecutor(2) as executor:
+        chunks = _collect(aio.validate_stream(
+            [96881134258, 4193675866], kind='cpf', op='format',
+            chunk_size=10, executor=executor))
+    assert chunks == [([96881134258, 4193675866],
+                       ['968.811.342-58', '041.936.758-66'])]
+
+    with pytest.raises(ValueError, match=r"Unsupported operation"):
+        _collect(aio.validate_stream([], kind='muni', op='format'))
+
+
+def test_validate_stream_backpressure():
+    """Check that no more than max_in_flight chunks are read ahead."""
+
+    read = []
+
+    async def source():
+        for i in range(100):
+            read.append(i)
+            yield '96881134258'
+
+    async def main():
+        stream = aio.validate_stream(source(), kind='cpf', chunk_size=10,
+                                     max_in_flight=3)
+        values, results = await stream.__anext__()
+        await stream.aclose()
+        return results
+
+    assert asyncio.run(main()) == [True] * 10
+    assert len(read) == 30
+
+    # errors in a chunk are raised by the stream
+    with pytest.raises(TypeError, match=r"must be str or int"):
+        _collect(aio.validate_stream(_source([1.5]), kind='cpf'))
@@ -0,0 +1,108 @@
+import random
+import string
+
+import pytest
+from brazilnum import backend
+from brazilnum.cei import explain_cei, explain_cei_many, random_cei
+from brazilnum.cnpj import explain_cnpj, explain_cnpj_many, random_cnpj
+from brazilnum.cpf import explain_cpf, explain_cpf_many, random_cpf
+from brazilnum.muni import SHIM, explain_muni, explain_muni_many
+from brazilnum.pis import explain_pis, explain_pis_many, random_pis
+
+EXPLAINERS = {
+    'cnpj': (explain_cnpj, explain_cnpj_many),
+    'cpf': (explain_cpf, explain_cpf_many),
+    'pis': (explain_pis, explain_pis_many),
+    'cei': (explain_cei, explain_cei_many),
+    'muni': (explain_muni, explain_muni_many),
+}
+
+WIDTHS = {'cnpj': 14, 'cpf': 11, 'pis': 11, 'cei': 12, 'muni': 7}
+
+
+@pytest.fixture(autouse=True)
+def restore_backend():
+    before = backend._backend
+    yield
+    backend._backend = before
+
+
+@pytest.fixture(params=backend.BACKENDS)
+def engine(request):
+    if request.param != 'python':
+        pytest.importorskip(request.param)
+    return backend.set_backend(request.param)
+
+
+def corpus(kind, size=300):
+    """Valid identifiers, one-digit mutations and malformed values."""
+    random.seed(kind)
+    if kind == 'muni':
+        good = [random.randint(1000000, 9999999) for _ in range(size)]
+        good += sorted(SHIM)
+    else:
+        create = {'cnpj': random_cnpj, 'cpf': random_cpf,
+                  'pis': random_pis, 'cei': random_cei}[kind]
+        good = [create(formatted=False) for _ in range(size)]
+        if kind == 'cnpj':
+            good += [create(formatted=False, alphanumeric=True)
+                     for _ in range(size)]
+    values = list(good)
+    for value in good:
+        value = str(value)
+        i = random.randrange(len(value))
+        values.append(value[:i] + str(random.randint(0, 9)) + value[i + 1:])
+    values += [None, float('nan'), '', '0' * WIDTHS[kind], '123',
+               '1' * (WIDTHS[kind] + 1), 'AB-12', 191, 4193675866]
+    return values
+
+
+@pytest.mark.parametrize('kind', backend.KERNEL_KINDS)
+def test_backend_parity(engine, kind):
+    """Check batch results on every backend match the scalar functions."""
+
+    explain, explain_many = EXPLAINERS[kind]
+    values = corpus(kind)
+    if kind == 'muni':
+        expected = [explain(v) for v in values]
+        assert list(explain_many(values)) == expected
+    else:
+        for autopad in (True, False):
+            expected = [explain(v, autopad) for v in values]
+            assert list(explain_many(values, autopad)) == expected
+    assert len(explain_many([])) == 0
+
+
+@pytest.mark.parametrize('kind', backend.KERNEL_KINDS)
+def test_kernel_parity(engine, kind):
+    """Check kernels agree with the python kernels on random rows."""
+
+    random.seed(20240709)
+    chars = string.digits
+    if kind == 'cnpj':
+        chars += string.ascii_uppercase  # alphanumeric CNPJ
+    rows = []
+    for _ in range(2000):
+        row = random.choices(chars, k=WIDTHS[kind] - 2)
+        rows.append(''.join(row + random.choices(string.digits, k=2)))
+    expected = backend.check_rows(kind, rows, 'python')
+    assert backend.check_rows(kind, rows) == expected
+    assert backend.check_rows(kind, []) == []
+
+
+def test_set_backend(monkeypatch):
+    """Check choosing backends and falling back when not installed."""
+
+    assert backend.set_backend('python') == 'python'
+    assert backend.get_backend() == 'python'
+    with pytest.raises(ValueError):
+        backend.set_backend('fortran')
+
+    monkeypatch.setattr(backend, 'available_backends', lambda: ['python'])
+    assert backend.set_backend() == 'python'
+    with pytest.warns(RuntimeWarning):
+        assert backend.set_backend('numba') == 'python'
+
+    monkeypatch.setenv('BRAZILNUM_BACKEND', 'python')
+    backend._backend = None
+    assert backend.get_backend() == 'python'
@@ -1,6 +1,7 @@
 
 import pytest
 from brazilnum import cei
+from brazilnum.util import Reason
 
 
 def test_validate_cei():
@@ -62,6 +63,13 @@ def test_cei_check_digit():
         cei.cei_check_digit('3002498')
 
 
+def test_cei_check_digit_many():
+    """Test check digits of many CEI at once."""
+
+    values = ['11583002498', '11.583.00249/85', '3002498', None]
+    assert cei.cei_check_digit_many(values) == [5, 5, None, None]
+
+
 def test_format_cei():
     """Test 00.000.00000/00 formatting of CEI."""
 
@@ -74,6 +82,33 @@ def test_format_cei():
     assert cei.format_cei('115830024984') == '11.583.00249/84'
 
 
+def test_format_cei_many():
+    """Test formatting and padding many CEI at once."""
+
+    values = ['11.583.00249/85', 115830024985, '000115830024985', None]
+    assert cei.format_cei_many(values) == [
+        None if k is None else cei.format_cei(k) for k in values
+    ]
+    assert cei.pad_cei_many(values) == [
+        None if k is None else cei.pad_cei(k) for k in values
+    ]
+    assert cei.pad_cei_many([float('nan')]) == [None]
+    with pytest.raises(TypeError):
+        cei.format_cei_many([1.5])
+
+
+def test_enrich_cei_columns():
+    """Test validating CEI and finding their state."""
+
+    values = ['11.583.00249/85', '35.583.00249/85', 995830024985,
+              '1' * 13, None]
+    assert cei.enrich_cei_columns(values) == {
+        'cei': ['115830024985', '355830024985', '995830024985', None, None],
+        'valid': [True, False, False, False, False],
+        'uf': ['RO', 'SP', None, None, None],
+    }
+
+
 def test_pad_cei():
     """Test padding CEI with leading zeros."""
 
@@ -95,3 +130,35 @@ def test_random_cei():
 
     assert isinstance(cei.random_cei(), str) is True
     assert isinstance(cei.random_cei(formatted=False), str) is True
+
+
+def test_iter_valid_cei():
+    """Test enumerating and counting valid CEI in a range."""
+
+    found = list(cei.iter_valid_cei(115830024900, 115830025900))
+    assert '115830024985' in found
+    assert found == ['%012i' % n for n in range(115830024900, 115830025900)
+                     if cei.validate_cei('%012i' % n)]
+    assert cei.count_valid_cei(115830024900, 115830025900) == len(found)
+
+    # ranges are limited to identifiers of 12 digits, without zero
+    assert next(cei.iter_valid_cei(-10, 1000, formatted=True)) == \
+        '00.000.00000/16'
+    assert cei.count_valid_cei(0, 10 ** 12 + 5) == 10 ** 11 - 1
+    assert cei.count_valid_cei(10, 10) == 0
+    assert list(cei.iter_valid_cei(10 ** 12, 10 ** 12 + 5)) == []
+
+
+def test_explain_cei():
+    """Test reasons for CEI being valid or invalid."""
+
+    assert cei.explain_cei('11.583.00249/85') == Reason.VALID
+    assert cei.explain_cei('11583002498', autopad=False) == Reason.TOO_SHORT
+    assert cei.explain_cei(None) == Reason.MISSING
+    assert cei.explain_cei('1158300249850') == Reason.TOO_LONG
+    assert cei.explain_cei(0) == Reason.ALL_ZEROS
+    assert cei.explain_cei('11.583.00249/84') == Reason.DV1_MISMATCH
+
+    values = ['11.583.00249/85', None, '11.583.00249/84']
+    assert cei.explain_cei_many(values) == bytearray([0, 2, 7])
+    assert cei.validate_cei_many(values) == [True, False, False]
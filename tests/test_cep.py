@@ -38,6 +38,15 @@ def test_format_cep():
         cep.format_cep([13165000])
 
 
+def test_format_cep_many():
+    """Test formatting many CEP at once."""
+
+    assert cep.format_cep_many(['13165000', 1002010, '73080', '123456',
+                                None]) == [
+        '13165-000', '01002-010', '73080-000', None, None
+    ]
+
+
 def test_parse_cep():
     """Test parsing of CEP into geographic components."""
 
@@ -57,3 +66,66 @@ def test_parse_cep():
     assert cep.parse_cep('13165000', numeric=False) == CEP(
         '13165-000', '1', '13', '131', '1316', '13165', '000'
     )
+
+
+def test_cep_to_uf():
+    """Test lookup of the state of a CEP."""
+
+    assert cep.cep_to_uf('01310-100') == 'SP'
+    assert cep.cep_to_uf(1310100) == 'SP'
+    assert cep.cep_to_uf('20040-020') == 'RJ'
+    assert cep.cep_to_uf('70040-010') == 'DF'
+    assert cep.cep_to_uf('99999-999') == 'RS'
+
+    # states with two ranges
+    assert cep.cep_to_uf('69301-000') == 'RR'
+    assert cep.cep_to_uf('69400-000') == 'AM'
+    assert cep.cep_to_uf('73700-000') == 'GO'
+
+    # old-style 5-digit CEP are padded like format_cep
+    assert cep.cep_to_uf(73080) == 'DF'
+
+    # CEP outside all ranges have no state, and missing values are None
+    assert cep.cep_to_uf('00500-000') is None
+    assert cep.cep_to_uf(None) is None
+
+    with pytest.raises(ValueError, match=r"Invalid CEP.*"):
+        cep.cep_to_uf('123456')
+
+    assert cep.cep_to_region('01310-100') == 'Sudeste'
+    assert cep.cep_to_region('00500-000') is None
+
+
+def test_cep_to_uf_many():
+    """Test lookup of the states of many CEP."""
+
+    ceps = ['01310-100', 69900000, None, float('nan'), '123456', '00500-000']
+    assert cep.cep_to_uf_many(ceps) == ['SP', 'AC', None, None, None, None]
+    assert cep.cep_to_region_many(ceps) == [
+        'Sudeste', 'Norte', None, None, None, None
+    ]
+
+    # every CEP is in exactly one range
+    for i in range(len(cep.CEP_RANGES) - 1):
+        assert cep.CEP_RANGES[i][1] < cep.CEP_RANGES[i + 1][0]
+
+    with pytest.raises(TypeError, match=r"must be str or int"):
+        cep.cep_to_uf_many([13165000.0])
+
+
+def test_parse_cep_columns():
+    """Test parsing many CEP into columns."""
+
+    values = ['01255-080', 13165000, '1310', 73080, '99999999']
+    for numeric in (True, False):
+        cols = cep.parse_cep_columns(values, numeric=numeric)
+        assert list(cols) == list(CEP._fields)
+        rows = [cep.parse_cep(k, numeric=numeric) for k in values]
+        assert [CEP(*k) for k in zip(*cols.values())] == rows
+
+    # missing values are None in every column
+    cols = cep.parse_cep_columns([None, float('nan')])
+    assert all(v == [None, None] for v in cols.values())
+
+    with pytest.raises(ValueError, match=r"Invalid CEP.*"):
+        cep.parse_cep_columns(['13165000', '123456'])
@@ -0,0 +1,82 @@
+
+import random
+
+import pytest
+from brazilnum import classify
+from brazilnum.cei import validate_cei, random_cei
+from brazilnum.cnpj import validate_cnpj, random_cnpj
+from brazilnum.cpf import validate_cpf, random_cpf
+from brazilnum.muni import validate_muni
+from brazilnum.pis import validate_pis, random_pis
+
+VALIDATORS = {
+    'cnpj': validate_cnpj,
+    'cpf': validate_cpf,
+    'pis': validate_pis,
+    'cei': validate_cei,
+    'muni': validate_muni,
+}
+
+
+def test_classify_identifier():
+    """Check classification of single identifiers."""
+
+    assert classify.classify_identifier('968.811.342-58') == {'cpf'}
+    assert classify.classify_identifier('125.6124.131-0') == {'pis'}
+    assert classify.classify_identifier('11.583.00249/85') == {'cei'}
+    assert classify.classify_identifier('02.558.157/0001-62') == {'cnpj'}
+    assert classify.classify_identifier('XP.B30.AW3/0001-84') == {'cnpj'}
+    assert classify.classify_identifier(3550308) == {'muni'}
+
+    # some values are valid for more than one kind
+    assert classify.classify_identifier('00000000191') == {
+        'cnpj', 'cpf', 'pis'
+    }
+
+    # autopadding works as in the validation functions
+    assert 'cpf' in classify.classify_identifier(4193675866)
+    assert 'cpf' not in classify.classify_identifier(4193675866,
+                                                     autopad=False)
+
+    # missing values match no kind, and other types raise an error
+    assert classify.classify_identifier(None) == frozenset()
+    assert classify.classify_identifier('') == frozenset()
+    with pytest.raises(TypeError, match=r"must be str or int"):
+        classify.classify_identifier(96881134258.0)
+
+
+def test_classify_identifier_matches_validators():
+    """Check that classification agrees with each validation function."""
+
+    rng = random.Random(1)
+    values = []
+    for _ in range(300):
+        values.append(random_cnpj(formatted=rng.random() < 0.5))
+        values.append(random_cnpj(alphanumeric=True))
+        values.append(random_cpf(formatted=rng.random() < 0.5))
+        values.append(random_pis(formatted=rng.random() < 0.5))
+        values.append(random_cei(formatted=rng.random() < 0.5))
+        values.append(rng.randint(0, 10 ** rng.randint(1, 15)))
+        values.append(str(rng.randint(1000000, 9999999)))
+    values.extend(['', '0', 'CPF: 968.811.342-58', 'XPB30AW30001AB'])
+
+    for value in values:
+        for autopad in (True, False):
+            expected = {k for k, f in VALIDATORS.items()
+                        if (f(value, autopad) if k != 'muni' else f(value))}
+            assert classify.classify_identifier(value, autopad) == expected
+
+
+def test_classify_column():
+    """Check classification of a column of identifiers."""
+
+    values = ['968.811.342-58', '779.221.987-95', None, 'junk', 96881134258]
+    result = classify.classify_column(values)
+    assert result.total == 5
+    assert result.missing == 1
+    assert result.unmatched == 1
+    assert result.counts == {'cnpj': 0, 'cpf': 3, 'pis': 0, 'cei': 0,
+                             'muni': 0}
+    assert result.best == 'cpf'
+
+    assert classify.classify_column([None, 'junk']).best is None
@@ -2,6 +2,7 @@
 import pytest
 from brazilnum import cnpj
 from brazilnum.cnpj import CNPJ
+from brazilnum.util import Reason
 
 
 def test_validate_cnpj():
@@ -95,6 +96,10 @@ def test_cnpj_check_digits():
     assert cnpj.cnpj_check_digits('000346160001') == (8, 3)
     assert cnpj.cnpj_check_digits(112775550001) == (0, 0)
 
+    # a given first check digit is weighted in the second, even if wrong
+    assert cnpj.cnpj_check_digits('02558157000199') == (6, 7)
+    assert cnpj.cnpj_check_digits('0255815700016') == (6, 2)
+
     # check digits for alphanumeric CNPJ are still numeric
     assert cnpj.cnpj_check_digits('XPB30AW30001') == (8, 4)
 
@@ -103,6 +108,23 @@ def test_cnpj_check_digits():
         cnpj.cnpj_check_digits('50001')
 
 
+def test_cnpj_check_digits_many():
+    """Test check digits of many CNPJ at once."""
+
+    values = ['003603050001', '02558157000199', 'xp.b30.aw3/0001', '1234',
+              None]
+    assert cnpj.cnpj_check_digits_many(values) == [
+        (0, 4), (6, 7), (8, 4), None, None
+    ]
+    random_stems = [cnpj.random_cnpj(alphanumeric=True)[:15]
+                    for _ in range(100)]
+    assert cnpj.cnpj_check_digits_many(random_stems) == [
+        cnpj.cnpj_check_digits(k) for k in random_stems
+    ]
+    with pytest.raises(TypeError):
+        cnpj.cnpj_check_digits_many([1.5])
+
+
 def test_cnpj_from_firm_id():
     """Test construction of full CNPJ from the firm-level CNPJ."""
 
@@ -136,6 +158,68 @@ def test_format_cnpj():
     assert cnpj.format_cnpj('XPB30AW3000184') == 'XP.B30.AW3/0001-84'
 
 
+def test_format_cnpj_many():
+    """Test formatting and padding many CNPJ at once."""
+
+    values = ['02.558.157/0001-62', 2558157000162, 'xp.b30.aw3/0001-84', None]
+    assert cnpj.format_cnpj_many(values) == [
+        None if k is None else cnpj.format_cnpj(k) for k in values
+    ]
+    assert cnpj.pad_cnpj_many(values) == [
+        None if k is None else cnpj.pad_cnpj(k) for k in values
+    ]
+    assert cnpj.pad_cnpj_many([float('nan')]) == [None]
+    with pytest.raises(TypeError):
+        cnpj.format_cnpj_many([1.5])
+
+
+def test_enrich_cnpj_columns():
+    """Test validating CNPJ and finding headquarters and the format."""
+
+    values = ['02.558.157/0001-62', 2558157000243, 'xp.b30.aw3/0001-85',
+              '02.558.157/0001-621', None]
+    assert cnpj.enrich_cnpj_columns(values) == {
+        'cnpj': ['02558157000162', '02558157000243', 'XPB30AW3000185', None,
+                 None],
+        'valid': [True, True, False, False, False],
+        'headquarters': [True, False, True, None, None],
+        'alphanumeric': [False, False, True, None, None],
+    }
+
+
+def test_partition_by_cnpj():
+    """Test stable partitions of CNPJ by firm and establishment."""
+
+    values = ['02.558.157/0001-62', 2558157000162, '02558157000243', None]
+    assert cnpj.partition_by_cnpj(values, 16) == [7, 7, 7, None]
+    assert cnpj.partition_by_cnpj(values, 16, 'establishment') == [
+        13, 13, 0, None
+    ]
+    assert cnpj.partition_by_cnpj(['xp.b30.aw3/0001-84'], 1) == [0]
+
+    # partitions are balanced
+    counts = [0] * 8
+    for k in cnpj.partition_by_cnpj(
+            [cnpj.random_cnpj() for _ in range(8000)], 8, 'establishment'):
+        counts[k] += 1
+    assert min(counts) > 800 and max(counts) < 1200
+
+    with pytest.raises(ValueError):
+        cnpj.partition_by_cnpj(values, 0)
+    with pytest.raises(ValueError):
+        cnpj.partition_by_cnpj(values, 16, 'branch')
+    with pytest.raises(TypeError):
+        cnpj.partition_by_cnpj(values, 1.5)
+
+
+def test_mask_cnpj():
+    """Test masking CNPJ as **.000.000/****-**."""
+
+    assert cnpj.mask_cnpj('02.558.157/0001-62') == '**.558.157/****-**'
+    assert cnpj.mask_cnpj(2558157000162) == '**.558.157/****-**'
+    assert cnpj.mask_cnpj('xpb30aw3000184') == '**.B30.AW3/****-**'
+
+
 def test_pad_cnpj():
     """Test padding CNPJ with leading zeros."""
 
@@ -202,3 +286,119 @@ def test_random_cnpj():
 
     assert isinstance(cnpj.random_cnpj(), str) is True
     assert isinstance(cnpj.random_cnpj(formatted=False), str) is True
+
+
+def test_cnpj_index():
+    """Test grouping of CNPJ by firm with CNPJIndex."""
+
+    index = cnpj.CNPJIndex([
+        '02.558.157/0002-43', 2558157000162, '02558157000162',
+        'XPB30AW3000184', None, float('nan'), '123456789012345',
+        '11277555000100',
+    ])
+
+    # missing and overlong identifiers are skipped
+    assert len(index) == 3
+    assert '02.558.157' in index
+    assert 'XPB30AW3' in index
+    assert '12345678' not in index
+
+    # establishments are sorted and duplicates are dropped
+    assert index.establishments('02.558.157') == [
+        '02558157000162', '02558157000243'
+    ]
+    assert index.establishments(2558157) == index.establishments('02558157')
+
+    # firms can be looked up with any complete CNPJ
+    assert index.headquarters('02.558.157/0002-43') == '02558157000162'
+    assert index.headquarters(2558157000243) == '02558157000162'
+    assert index.headquarters('xp.b30.aw3') == 'XPB30AW3000184'
+
+    # unknown firms have no establishments
+    assert index.establishments('99999999') == []
+    assert index.headquarters('99999999') is None
+
+    assert index.establishments_many(['11277555', '99999999']) == [
+        ['11277555000100'], []
+    ]
+    assert index.headquarters_many(['11277555', 'XPB30AW3']) == [
+        '11277555000100', 'XPB30AW3000184'
+    ]
+
+
+def test_cnpj_index_valid_only():
+    """Test that CNPJIndex can skip invalid CNPJ."""
+
+    index = cnpj.CNPJIndex(['02558157000162', '02558157000155'])
+    assert len(index.establishments('02558157')) == 2
+
+    index = cnpj.CNPJIndex(['02558157000162', '02558157000155'],
+                           valid_only=True)
+    assert index.establishments('02558157') == ['02558157000162']
+    assert index.add('76694959000241') is False
+    assert '76694959' not in index
+
+
+def test_parse_cnpj_columns():
+    """Test parsing many CNPJ into columns."""
+
+    values = ['00034616000183', 76694959000241, 'XP.B30.AW3/0001-84',
+              '360305000104', 'PB3AW3W000133']
+    for formatted in (True, False):
+        cols = cnpj.parse_cnpj_columns(values, formatted=formatted)
+        assert list(cols) == list(CNPJ._fields)
+        rows = [cnpj.parse_cnpj(k, formatted=formatted) for k in values]
+        assert [CNPJ(*k) for k in zip(*cols.values())] == rows
+
+    # missing values are None in every column, and invalid
+    cols = cnpj.parse_cnpj_columns([None, '00034616000183'], formatted=False)
+    assert cols == {
+        'cnpj': [None, 34616000183], 'firm': [None, 34616],
+        'establishment': [None, 1], 'check': [None, (8, 3)],
+        'valid': [False, True]
+    }
+
+    with pytest.raises(TypeError, match=r"must be str or int"):
+        cnpj.parse_cnpj_columns([2558157000162.0])
+
+
+def test_iter_valid_cnpj():
+    """Test enumerating and counting valid CNPJ in a range."""
+
+    found = list(cnpj.iter_valid_cnpj(2558157000100, 2558157001100))
+    assert '02558157000162' in found
+    assert found == ['%014i' % n for n in range(2558157000100, 2558157001100)
+                     if cnpj.validate_cnpj('%014i' % n)]
+    assert cnpj.count_valid_cnpj(2558157000100, 2558157001100) == len(found)
+
+    # ranges are limited to identifiers of 14 digits, without zero
+    assert next(cnpj.iter_valid_cnpj(-10, 1000, formatted=True)) == \
+        '00.000.000/0001-91'
+    assert cnpj.count_valid_cnpj(0, 10 ** 14 + 5) == 10 ** 12 - 1
+    assert cnpj.count_valid_cnpj(10, 10) == 0
+    assert list(cnpj.iter_valid_cnpj(10 ** 14, 10 ** 14 + 5)) == []
+
+
+def test_explain_cnpj():
+    """Test reasons for CNPJ being valid or invalid."""
+
+    assert cnpj.explain_cnpj('02.558.157/0001-62') == Reason.VALID
+    assert cnpj.explain_cnpj(2558157000162) == Reason.PADDED
+    assert cnpj.explain_cnpj(2558157000162, autopad=False) == (
+        Reason.TOO_SHORT
+    )
+    assert cnpj.explain_cnpj(None) == Reason.MISSING
+    assert cnpj.explain_cnpj('025581570001620') == Reason.TOO_LONG
+    assert cnpj.explain_cnpj('XPB30AW30001AB') == Reason.BAD_PATTERN
+    assert cnpj.explain_cnpj('') == Reason.ALL_ZEROS
+    assert cnpj.explain_cnpj('02558157000152') == Reason.DV1_MISMATCH
+    assert cnpj.explain_cnpj('02558157000163') == Reason.DV2_MISMATCH
+
+    with pytest.raises(TypeError, match=r"must be str or int"):
+        cnpj.explain_cnpj(2558157000162.0)
+
+    values = ['02.558.157/0001-62', 2558157000162, None, '02558157000163']
+    codes = cnpj.explain_cnpj_many(values)
+    assert codes == bytearray([0, 1, 2, 8])
+    assert Reason(codes[3]) == Reason.DV2_MISMATCH
+    assert cnpj.validate_cnpj_many(values) == [True, True, False, False]
@@ -1,6 +1,7 @@
 
 import pytest
 from brazilnum import cpf
+from brazilnum.util import Reason
 
 
 def test_validate_cpf():
@@ -70,11 +71,26 @@ def test_cpf_check_digits():
     assert cpf.cpf_check_digits('041936758') == (6, 6)
     assert cpf.cpf_check_digits('041.936.758') == (6, 6)
 
+    # a given first check digit is weighted in the second, even if wrong
+    assert cpf.cpf_check_digits('96881134299') == (5, 0)
+    assert cpf.cpf_check_digits('9688113425') == (5, 8)
+
     # identifiers less than 9 digits produce an error
     with pytest.raises(ValueError, match=r".*9 digits.*"):
         cpf.cpf_check_digits('93675866')
 
 
+def test_cpf_check_digits_many():
+    """Test check digits of many CPF at once."""
+
+    values = ['968811342', 41936758, '041.936.758', '96881134299', None]
+    assert cpf.cpf_check_digits_many(values) == [
+        (5, 8), None, (6, 6), (5, 0), None
+    ]
+    with pytest.raises(TypeError):
+        cpf.cpf_check_digits_many([1.5])
+
+
 def test_format_cpf():
     """Test 000.000.000-00 formatting of CPF."""
 
@@ -88,6 +104,59 @@ def test_format_cpf():
     assert cpf.format_cpf('96881134259') == '968.811.342-59'
 
 
+def test_format_cpf_many():
+    """Test formatting and padding many CPF at once."""
+
+    values = ['968.811.342-58', 4193675866, '000968811342580', None]
+    assert cpf.format_cpf_many(values) == [
+        None if k is None else cpf.format_cpf(k) for k in values
+    ]
+    assert cpf.pad_cpf_many(values) == [
+        None if k is None else cpf.pad_cpf(k) for k in values
+    ]
+    assert cpf.pad_cpf_many([float('nan')]) == [None]
+    with pytest.raises(TypeError):
+        cpf.format_cpf_many([1.5])
+
+
+def test_enrich_cpf_columns():
+    """Test validating CPF and finding their fiscal region."""
+
+    values = ['968.811.342-58', 4193675866, '96881134259', '000000000-00',
+              None]
+    assert cpf.enrich_cpf_columns(values) == {
+        'cpf': ['96881134258', '04193675866', '96881134259', None, None],
+        'valid': [True, True, False, False, False],
+        'fiscal_region': [2, 8, 2, None, None],
+    }
+    assert cpf.enrich_cpf_columns(['1234567'], autopad=False) == {
+        'cpf': [None], 'valid': [False], 'fiscal_region': [None]
+    }
+    assert cpf.enrich_cpf_columns(['11111111051'])['fiscal_region'] == [10]
+    assert cpf.CPF_FISCAL_REGIONS[8] == ('SP',)
+
+
+def test_partition_by_cpf():
+    """Test stable partitions of CPF."""
+
+    values = ['968.811.342-58', 96881134258, float('nan')]
+    assert cpf.partition_by_cpf(values, 10) == [4, 4, None]
+    assert cpf.partition_by_cpf(['041.936.758-66', 4193675866], 10) == [
+        cpf.partition_by_cpf(['04193675866'], 10)[0]
+    ] * 2
+
+    # junk that pads to all zeros is not put in one partition
+    assert cpf.partition_by_cpf(['', 'abc', 'x', 0, None], 16) == [None] * 5
+
+
+def test_mask_cpf():
+    """Test masking CPF as ***.000.000-**."""
+
+    assert cpf.mask_cpf('968.811.342-58') == '***.811.342-**'
+    assert cpf.mask_cpf(4193675866) == '***.936.758-**'
+    assert cpf.mask_cpf('96881134258', mask='X') == 'XXX.811.342-XX'
+
+
 def test_pad_cpf():
     """Test padding CPF with leading zeros."""
 
@@ -109,3 +178,37 @@ def test_random_cpf():
 
     assert isinstance(cpf.random_cpf(), str) is True
     assert isinstance(cpf.random_cpf(formatted=False), str) is True
+
+
+def test_iter_valid_cpf():
+    """Test enumerating and counting valid CPF in a range."""
+
+    found = list(cpf.iter_valid_cpf(96881134200, 96881135200))
+    assert '96881134258' in found
+    assert found == ['%011i' % n for n in range(96881134200, 96881135200)
+                     if cpf.validate_cpf('%011i' % n)]
+    assert cpf.count_valid_cpf(96881134200, 96881135200) == len(found)
+
+    # ranges are limited to identifiers of 11 digits, without zero
+    assert next(cpf.iter_valid_cpf(-10, 1000, formatted=True)) == \
+        '000.000.001-91'
+    assert cpf.count_valid_cpf(0, 10 ** 11 + 5) == 10 ** 9 - 1
+    assert cpf.count_valid_cpf(10, 10) == 0
+    assert list(cpf.iter_valid_cpf(10 ** 11, 10 ** 11 + 5)) == []
+
+
+def test_explain_cpf():
+    """Test reasons for CPF being valid or invalid."""
+
+    assert cpf.explain_cpf('968.811.342-58') == Reason.VALID
+    assert cpf.explain_cpf(4193675866) == Reason.PADDED
+    assert cpf.explain_cpf(4193675866, autopad=False) == Reason.TOO_SHORT
+    assert cpf.explain_cpf(float('nan')) == Reason.MISSING
+    assert cpf.explain_cpf('96881134258999') == Reason.TOO_LONG
+    assert cpf.explain_cpf(0) == Reason.ALL_ZEROS
+    assert cpf.explain_cpf('96881134268') == Reason.DV1_MISMATCH
+    assert cpf.explain_cpf('96881134259') == Reason.DV2_MISMATCH
+
+    values = ['968.811.342-58', None, '96881134259']
+    assert cpf.explain_cpf_many(values) == bytearray([0, 2, 8])
+    assert cpf.validate_cpf_many(values) == [True, False, False]
@@ -0,0 +1,113 @@
+import tracemalloc
+
+import pytest
+from brazilnum.dedupe import (
+    BloomFilter, Deduplicator, PackedSet, dedupe_stream
+)
+from brazilnum.pis import pis_check_digit_many
+
+
+def test_dedupe_stream():
+    """Check first occurrences of valid identifiers are kept, in order."""
+
+    cpfs = ['968.811.342-58', '96881134258', 96881134258, None,
+            '968.811.342-59', '041.936.758-66', 4193675866]
+    assert list(dedupe_stream(cpfs)) == ['968.811.342-58', '041.936.758-66']
+
+    records = [{'cnpj': '02.558.157/0001-62'}, {'cnpj': 2558157000162},
+               {'cnpj': '12.ABC.345/01DE-35'}, {'cnpj': '12ABC34501DE35'}]
+    assert list(dedupe_stream(records, kind='cnpj',
+                              key=lambda r: r['cnpj'])) == [
+        records[0], records[2]
+    ]
+
+    munis = ['3550308', 3550308, '3550309', '3304557']
+    assert list(dedupe_stream(munis, kind='muni')) == ['3550308', '3304557']
+
+    # codes in muni.SHIM are valid without a check digit
+    munis = ['2201919', '3550308', '2201919', 3550308, 2201988]
+    assert list(dedupe_stream(munis, kind='muni')) == [
+        '2201919', '3550308', 2201988
+    ]
+
+    with pytest.raises(ValueError):
+        list(dedupe_stream(['01001000'], kind='cep'))
+    with pytest.raises(TypeError):
+        list(dedupe_stream([1.5]))
+
+
+def test_deduplicator():
+    """Check counts, and the switch to a Bloom filter at the memory cap."""
+
+    d = Deduplicator('pis', capacity=1000, error_rate=0.01, max_bytes=2048)
+    assert d.exact
+    assert d.add('125.6124.131-0')
+    assert not d.add(12561241310)
+    assert not d.add('12561241311')
+    assert (d.valid, d.invalid, d.duplicates) == (2, 1, 1)
+
+    stems = ['%010i' % s for s in range(1000000000, 1000000400)]
+    pis = [s + str(d) for s, d in zip(stems, pis_check_digit_many(stems))]
+    kept = [k for k in pis if d.add(k)]
+    assert not d.exact
+    assert d._seen.nbytes == BloomFilter.size(1000, 0.01)
+    assert len(kept) >= 390  # a few false positives are allowed
+    assert not any(d.add(k) for k in pis)  # no false negatives
+    assert not d.over_capacity
+
+    with pytest.raises(ValueError):
+        Deduplicator('pis', capacity=1000, error_rate=0.01, max_bytes=1024)
+
+
+def test_deduplicator_bounds():
+    """Check memory stays under max_bytes through the switch to a Bloom
+    filter, and that storing more than capacity identifiers is flagged.
+    """
+    stems = ['%010i' % s for s in range(1000000000, 1000007500)]
+    pis = [s + str(d) for s, d in zip(stems, pis_check_digit_many(stems))]
+    d = Deduplicator('pis', capacity=5000, error_rate=0.01)
+    d.add(pis[0])
+    first, rest = pis[1:5000], pis[5000:]
+    tracemalloc.start()
+    try:
+        for k in first:
+            d.add(k)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert not d.exact and not d.over_capacity
+    assert peak <= d.max_bytes
+
+    with pytest.warns(RuntimeWarning):
+        for k in rest:
+            d.add(k)
+    assert d.over_capacity and d.stored > 5000
+
+
+def test_packed_set():
+    """Check the hash table keeps every value through growth."""
+
+    s = PackedSet()
+    values = [i * 7919 for i in range(1000)] + [2 ** 64 - 2]
+    assert all(s.add(v) for v in values)
+    assert not any(s.add(v) for v in values)
+    assert len(s) == len(values)
+    assert sorted(s) == sorted(values)
+    assert s.nbytes == 8 * 2048  # at most half full
+
+
+def test_bloom_filter():
+    """Check the false positive rate is near the one requested."""
+
+    bloom = BloomFilter(10000, 0.01)
+    assert bloom.hashes == 7
+    for i in range(10000):
+        bloom.add(i)
+    assert all(i in bloom for i in range(10000))
+    false = sum(i in bloom for i in range(10000, 30000))
+    assert false < 0.02 * 20000
+
+    with pytest.raises(ValueError):
+        BloomFilter(0, 0.01)
+    with pytest.raises(ValueError):
+        BloomFilter(10, 1)
@@ -0,0 +1,156 @@
+import csv
+import json
+import os
+
+import pytest
+from brazilnum import files
+from brazilnum.__main__ import main
+from brazilnum.cnpj import random_cnpj
+from brazilnum.files import validate_file
+
+
+def write_csv(path, values):
+    """Write a CSV file of CNPJ, with a quoted line break in the notes."""
+    with open(path, 'w', newline='') as f:
+        out = csv.writer(f)
+        out.writerow(['name', 'cnpj'])
+        for i, value in enumerate(values):
+            out.writerow(['firm\n{0}'.format(i) if i % 7 == 0 else
+                          'firm {0}'.format(i), value])
+
+
+def test_validate_csv(tmp_path):
+    """Check results are written and counted for each row."""
+
+    path, output = str(tmp_path / 'in.csv'), str(tmp_path / 'out.csv')
+    write_csv(path, ['02.558.157/0001-62', '', '02558157000161'])
+    stats = validate_file(path, 'cnpj', 'cnpj', output, chunk_size=2)
+    assert stats == {'rows': 3, 'valid': 1, 'reasons': {
+        'VALID': 1, 'MISSING': 1, 'DV2_MISMATCH': 1}}
+    with open(output, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['name', 'cnpj', 'cnpj_valid', 'cnpj_reason']
+    assert rows[1] == ['firm\n0', '02.558.157/0001-62', 'True', 'VALID']
+    assert rows[3][2:] == ['False', 'DV2_MISMATCH']
+
+    with pytest.raises(ValueError):
+        validate_file(path, 'cpf', 'cnpj')
+    with pytest.raises(ValueError):
+        validate_file(path, 'cnpj', 'cep')
+
+
+def test_validate_csv_resume(tmp_path, monkeypatch):
+    """Check an interrupted run resumes from its checkpoint."""
+
+    path = str(tmp_path / 'in.csv')
+    write_csv(path, [random_cnpj() for _ in range(100)] + ['123', None])
+    expected = str(tmp_path / 'expected.csv')
+    full = validate_file(path, 'cnpj', 'cnpj', expected, chunk_size=10)
+
+    output, checkpoint = str(tmp_path / 'out.csv'), str(tmp_path / 'ckpt')
+    save = files._save_checkpoint
+    saves = []
+
+    def interrupt(checkpoint, state):
+        if len(saves) == 4:
+            raise KeyboardInterrupt
+        saves.append(state['offset'])
+        save(checkpoint, state)
+
+    monkeypatch.setattr(files, '_save_checkpoint', interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        validate_file(path, 'cnpj', 'cnpj', output, checkpoint, 10)
+    monkeypatch.setattr(files, '_save_checkpoint', save)
+    with open(checkpoint) as f:
+        assert json.load(f)['stats']['rows'] == 40
+
+    assert validate_file(path, 'cnpj', 'cnpj', output, checkpoint, 10) == full
+    with open(output, 'rb') as f, open(expected, 'rb') as g:
+        assert f.read() == g.read()
+
+    # a finished run is not repeated until the file changes
+    monkeypatch.setattr(files, '_csv_chunks', None)
+    assert validate_file(path, 'cnpj', 'cnpj', output, checkpoint, 10) == full
+
+
+def test_validate_csv_lost_output(tmp_path):
+    """Check a run starts over when its output was deleted or cut short
+    after the checkpoint was saved.
+    """
+    path = str(tmp_path / 'in.csv')
+    write_csv(path, [random_cnpj() for _ in range(30)])
+    output, checkpoint = str(tmp_path / 'out.csv'), str(tmp_path / 'ckpt')
+    full = validate_file(path, 'cnpj', 'cnpj', output, checkpoint, 10)
+    with open(output, 'rb') as f:
+        expected = f.read()
+
+    os.remove(output)
+    assert validate_file(path, 'cnpj', 'cnpj', output, checkpoint, 10) == full
+    with open(output, 'rb') as f:
+        assert f.read() == expected
+
+    with open(output, 'r+b') as f:
+        f.truncate(len(expected) // 2)
+    assert validate_file(path, 'cnpj', 'cnpj', output, checkpoint, 10) == full
+    with open(output, 'rb') as f:
+        assert f.read() == expected
+
+
+def test_validate_csv_no_header(tmp_path):
+    """Check files without a header, with another delimiter."""
+
+    path = str(tmp_path / 'in.csv')
+    with open(path, 'w', encoding='latin-1') as f:
+        f.write('02558157;São Paulo;02558157000162\n')
+    stats = validate_file(path, 2, 'cnpj', delimiter=';',
+                          encoding='latin-1', header=False)
+    assert stats['valid'] == 1
+    with pytest.raises(TypeError):
+        validate_file(path, 'cnpj', 'cnpj', header=False)
+
+
+def test_validate_parquet(tmp_path, monkeypatch):
+    """Check Parquet files are validated by row group, skipping row
+    groups that have not changed.
+    """
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    path = str(tmp_path / 'in.parquet')
+    output, checkpoint = str(tmp_path / 'out'), str(tmp_path / 'ckpt')
+    values = [random_cnpj() for _ in range(30)] + [None, '1' * 15]
+    pq.write_table(pa.table({'cnpj': values}), path, row_group_size=10)
+    stats = validate_file(path, 'cnpj', 'cnpj', output, checkpoint)
+    assert stats['rows'] == 32 and stats['valid'] == 30
+    assert sorted(os.listdir(output)) == [
+        'part-{0:05d}.parquet'.format(i) for i in range(4)]
+    table = pq.read_table(os.path.join(output, 'part-00003.parquet'))
+    assert table.column('cnpj_reason').to_pylist() == ['MISSING',
+                                                       'TOO_LONG']
+
+    # change the last row group; only it is validated again
+    values[-1] = random_cnpj()
+    pq.write_table(pa.table({'cnpj': values}), path, row_group_size=10)
+    checked = []
+    explain = files.get_kernel('explain', 'cnpj')
+    monkeypatch.setattr(files, 'get_kernel', lambda op, kind: (
+        lambda values: checked.append(values) or explain(values)))
+    stats = validate_file(path, 'cnpj', 'cnpj', output, checkpoint)
+    assert len(checked) == 1 and stats['valid'] == 31
+
+    # other files in the output directory are left alone
+    open(os.path.join(output, 'part-old.parquet'), 'w').close()
+    validate_file(path, 'cnpj', 'cnpj', output, checkpoint)
+    assert 'part-old.parquet' in os.listdir(output)
+
+
+def test_main(tmp_path, capsys):
+    """Check the command line interface."""
+
+    path = str(tmp_path / 'in.csv')
+    write_csv(path, ['02.558.157/0001-62', '02558157000161'])
+    assert main(['validate', path, '--column', 'cnpj', '--kind', 'cnpj',
+                 '--checkpoint', str(tmp_path / 'ckpt')]) == 0
+    assert json.loads(capsys.readouterr().out)['valid'] == 1
+    with pytest.raises(SystemExit):
+        main(['validate', path, '--column', 'cpf', '--kind', 'cnpj'])
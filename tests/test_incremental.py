@@ -0,0 +1,78 @@
+import random
+import string
+
+import pytest
+from brazilnum import cei, cnpj, cpf, incremental, pis
+from brazilnum.incremental import (
+    IncrementalCEI, IncrementalCNPJ, IncrementalCPF, IncrementalPIS
+)
+from brazilnum.util import Reason
+
+CHECKERS = [
+    (IncrementalCNPJ, cnpj.explain_cnpj, string.digits + 'ABCXYZ'),
+    (IncrementalCPF, cpf.explain_cpf, string.digits),
+    (IncrementalPIS, pis.explain_pis, string.digits),
+    (IncrementalCEI, cei.explain_cei, string.digits),
+]
+
+
+def test_incremental_typing():
+    """Test check digits and validity as a CNPJ is typed."""
+
+    check = IncrementalCNPJ('02.558.157/0001')
+    assert check.value == '025581570001'
+    assert check.explain() == Reason.TOO_SHORT
+    assert check.check_digits() == (6, 2)
+    check.extend('-63')
+    assert check.explain() == Reason.DV2_MISMATCH
+    assert check.pop() == '3'
+    check.append('2')
+    assert check.is_valid()
+
+    check.replace(0, 'x')  # alphanumeric CNPJ
+    assert check.value == 'X25581570001' + '62'
+    assert check.check_digits() == cnpj.cnpj_check_digits('X25581570001')
+    check.replace(-1, 'A')
+    assert check.explain() == Reason.BAD_PATTERN
+
+    with pytest.raises(ValueError):
+        check.append('1')  # too long
+    with pytest.raises(ValueError):
+        check.insert(0, '1')
+    assert len(check) == 14  # unchanged by the failed insert
+    with pytest.raises(ValueError):
+        IncrementalCPF().append('A')
+    with pytest.raises(IndexError):
+        IncrementalPIS().pop()
+    assert IncrementalCEI('0' * 12).explain() == Reason.ALL_ZEROS
+    assert IncrementalCPF('968.811.342').check_digits() == (5, 8)
+    assert IncrementalCPF('968.811.34').check_digits() is None
+
+    with pytest.raises(TypeError):
+        incremental._IncrementalCheck('1')  # base class of the checkers
+
+
+@pytest.mark.parametrize('checker, explain, chars', CHECKERS)
+def test_incremental_parity(checker, explain, chars):
+    """Test random edits give the same results as explain functions."""
+
+    random.seed(checker.kind)
+    check = checker()
+    for _ in range(3000):
+        n = len(check)
+        edit = random.random()
+        try:
+            if edit < 0.45:
+                check.append(random.choice(chars))
+            elif edit < 0.6 and n:
+                check.pop()
+            elif edit < 0.8 and n:
+                check.replace(random.randrange(n), random.choice(chars))
+            elif edit < 0.9:
+                check.insert(random.randrange(n + 1), random.choice(chars))
+            elif n:
+                check.delete(random.randrange(n))
+        except ValueError:
+            pass  # too long
+        assert check.explain() == explain(check.value, autopad=False)
+        assert check._sums == checker(check.value)._sums
@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+from brazilnum import cnpj, cpf, metrics
+from brazilnum.cnpj import format_cnpj, validate_cnpj
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    """Start each test with metrics disabled and empty."""
+    metrics.disable()
+    metrics.reset()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def test_metrics_disabled():
+    """Check that nothing is recorded or wrapped while disabled."""
+
+    original = cnpj._explain_cnpj
+    validate_cnpj('02.558.157/0001-62')
+    assert metrics.is_enabled() is False
+    assert metrics.snapshot() == {}
+
+    metrics.enable()
+    assert cnpj._explain_cnpj is not original
+    metrics.disable()
+    assert cnpj._explain_cnpj is original
+
+
+def test_metrics_validate():
+    """Check metrics recorded for validation functions."""
+
+    metrics.enable()
+    # functions imported before metrics were enabled are also recorded
+    validate_cnpj('02.558.157/0001-62')
+    validate_cnpj(2558157000162)
+    validate_cnpj('XPB30AW3000185')
+    cnpj.explain_cnpj(None)
+    cpf.validate_cpf_many(['96881134258', '96881134259'])
+
+    stats = metrics.snapshot()['validate']
+    assert stats['cnpj']['calls'] == 4
+    assert stats['cnpj']['inputs'] == {
+        'formatted': 1, 'int': 1, 'alphanumeric': 1, 'missing': 1
+    }
+    assert stats['cnpj']['reasons'] == {
+        'VALID': 1, 'PADDED': 1, 'MISSING': 1, 'DV2_MISMATCH': 1
+    }
+    assert stats['cnpj']['autopad'] == 1
+    assert sum(stats['cnpj']['latency']['counts']) == 4
+    assert stats['cpf']['reasons'] == {'VALID': 1, 'DV2_MISMATCH': 1}
+
+    # results are the same as without metrics
+    assert validate_cnpj('02.558.157/0001-55') is False
+
+
+def test_metrics_format():
+    """Check metrics recorded for formatting functions, including errors."""
+
+    metrics.enable()
+    assert format_cnpj(2558157000162) == '02.558.157/0001-62'
+    with pytest.raises(TypeError):
+        format_cnpj(None)
+
+    stats = metrics.snapshot()['format']['cnpj']
+    assert stats['calls'] == 2
+    assert stats['errors'] == 1
+    assert stats['inputs'] == {'int': 1, 'missing': 1}
+    assert 'reasons' not in stats
+
+
+def test_metrics_prometheus():
+    """Check export of metrics in Prometheus text format."""
+
+    metrics.enable()
+    validate_cnpj('02.558.157/0001-62')
+    text = metrics.to_prometheus()
+    assert 'brazilnum_calls_total{op="validate",kind="cnpj"} 1\n' in text
+    assert 'brazilnum_reasons_total{kind="cnpj",reason="VALID"} 1\n' in text
+    assert ('brazilnum_latency_seconds_count{op="validate",kind="cnpj"} 1\n'
+            in text)
+    assert ('brazilnum_latency_seconds_bucket{op="validate",kind="cnpj",'
+            'le="+Inf"} 1\n' in text)
+
+
+def test_metrics_threads():
+    """Check that calls from many threads are all recorded."""
+
+    metrics.enable()
+
+    def work():
+        for _ in range(200):
+            validate_cnpj('02.558.157/0001-62')
+            cpf.validate_cpf('96881134259')
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = metrics.snapshot()['validate']
+    assert stats['cnpj']['calls'] == 1600
+    assert stats['cnpj']['reasons'] == {'VALID': 1600}
+    assert stats['cpf']['reasons'] == {'DV2_MISMATCH': 1600}
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
@@ -1,6 +1,7 @@
 
 import pytest
 from brazilnum import muni
+from brazilnum.util import Reason
 
 
 def test_validate_muni():
@@ -69,3 +70,120 @@ def test_muni_check_digit():
     # codes less than 6 digits produce an error
     with pytest.raises(ValueError, match=r".*6 digits.*"):
         muni.muni_check_digit('55030')
+
+
+def test_muni_check_digit_many():
+    """Test check digits of many municipio codes at once."""
+
+    values = ['355030', 3550308, '4305871', '430587', '55030', None]
+    assert muni.muni_check_digit_many(values) == [8, 8, 1, 6, None, None]
+
+    # stems of exceptional codes get their real check digit on request
+    assert muni.muni_check_digit_many(values, real_codes=True) == [
+        8, 8, 1, 1, None, None
+    ]
+
+
+def test_muni_exists():
+    """Check lookup of codes in the IBGE table of municipios."""
+
+    assert muni.muni_exists(3550308) is True   # São Paulo, SP
+    assert muni.muni_exists('5300108') is True  # Brasília, DF
+    assert muni.muni_exists('4220000') is True  # Balneário Rincão, SC
+
+    # a correct check digit does not make a code real
+    assert muni.validate_muni(2100015) is False
+    assert muni.validate_muni(1100999) is True
+    assert muni.muni_exists(1100999) is False
+
+    assert muni.muni_exists(None) is False
+    with pytest.raises(TypeError, match=r"must be str or int"):
+        muni.muni_exists(3550308.0)
+
+    # every code in the table is valid, including the exceptions list
+    table = muni._muni_names()
+    assert len(table) == 5570
+    assert all(muni.validate_muni(k) for k in table)
+    assert all(k in table for k in muni.SHIM)
+
+
+def test_muni_info():
+    """Check name, state, and region of municipio codes."""
+
+    assert muni.muni_info(3550308) == muni.Municipio(
+        '3550308', 'São Paulo', 'SP', 'Sudeste'
+    )
+    assert muni.muni_info('4305871') == muni.Municipio(
+        '4305871', 'Coronel Barros', 'RS', 'Sul'
+    )
+    assert muni.muni_info(1100999) is None
+    assert muni.muni_info(None) is None
+
+    cols = muni.muni_info_columns([1100015, None, '3550309', '5300108'])
+    assert cols == {
+        'muni': ['1100015', None, None, '5300108'],
+        'name': ["Alta Floresta d'Oeste", None, None, 'Brasília'],
+        'uf': ['RO', None, None, 'DF'],
+        'region': ['Norte', None, None, 'Centro-Oeste'],
+    }
+
+
+def test_find_muni():
+    """Check search of municipio codes by name."""
+
+    # accents, case, and punctuation are ignored
+    assert muni.find_muni('São Paulo') == ['3550308']
+    assert muni.find_muni('SAO PAULO') == ['3550308']
+    assert muni.find_muni("olho d'agua do borges") == ['2408409']
+    assert muni.find_muni('Olho-D’Água  do Borges') == ['2408409']
+    assert muni.find_muni('Atlantis') == []
+
+    # many municipios share a name, so results can be limited to one state
+    assert len(muni.find_muni('Bom Jesus')) == 5
+    assert muni.find_muni('Bom Jesus', uf='RS') == ['4302303']
+    assert muni.find_muni('Bom Jesus', uf='43') == ['4302303']
+
+    with pytest.raises(ValueError, match=r"Unknown UF.*"):
+        muni.find_muni('Bom Jesus', uf='XX')
+
+    # every result is a valid municipio code
+    assert all(muni.validate_muni(k) for k in muni.find_muni('Bom Jesus'))
+
+
+def test_find_muni_prefix():
+    """Check search of municipio codes by start of name."""
+
+    assert muni.find_muni_prefix('sao jose do r', uf='SP') == [
+        '3549706', '3549805'  # São José do Rio Pardo, São José do Rio Preto
+    ]
+    assert muni.find_muni_prefix('Florianóp') == ['4205407']
+    assert muni.find_muni_prefix('zzz') == []
+
+
+def test_find_muni_fuzzy():
+    """Check search of municipio codes by misspelled name."""
+
+    assert muni.find_muni_fuzzy('Sao Palo') == ['3550308']
+    assert muni.find_muni_fuzzy('Floranopolis', uf='SC') == ['4205407']
+    assert muni.find_muni_fuzzy('Floranopolis', max_distance=0) == []
+
+    # closest names come first
+    found = muni.find_muni_fuzzy('Itapeva', uf='SP', max_distance=2)
+    assert found[0] == '3522406'  # Itapeva, SP
+    assert '3522505' in found     # Itapevi, SP
+
+
+def test_explain_muni():
+    """Test reasons for municipio codes being valid or invalid."""
+
+    assert muni.explain_muni(3550308) == Reason.VALID
+    assert muni.explain_muni(4305871) == Reason.VALID
+    assert muni.explain_muni(None) == Reason.MISSING
+    assert muni.explain_muni('355030') == Reason.TOO_SHORT
+    assert muni.explain_muni('35503080') == Reason.TOO_LONG
+    assert muni.explain_muni('0550308') == Reason.BAD_PATTERN
+    assert muni.explain_muni(3550309) == Reason.DV1_MISMATCH
+
+    values = [3550308, None, 3550309]
+    assert muni.explain_muni_many(values) == bytearray([0, 2, 7])
+    assert muni.validate_muni_many(values) == [True, False, False]
@@ -1,6 +1,7 @@
 
 import pytest
 from brazilnum import pis
+from brazilnum.util import Reason
 
 
 def test_validate_pis():
@@ -72,6 +73,13 @@ def test_pis_check_digit():
         pis.pis_check_digit('602632')
 
 
+def test_pis_check_digit_many():
+    """Test check digits of many PIS/PASEP at once."""
+
+    values = ['1253602632', '125.6124.131-0', 1234, float('nan')]
+    assert pis.pis_check_digit_many(values) == [0, 0, None, None]
+
+
 def test_format_pis():
     """Test 000.0000.000-0 formatting of PIS/PASEP."""
 
@@ -85,6 +93,28 @@ def test_format_pis():
     assert pis.format_pis('12536026321') == '125.3602.632-1'
 
 
+def test_format_pis_many():
+    """Test formatting and padding many PIS/PASEP at once."""
+
+    values = ['125.6124.131-0', 12561241310, '0001256124131000', None]
+    assert pis.format_pis_many(values) == [
+        None if k is None else pis.format_pis(k) for k in values
+    ]
+    assert pis.pad_pis_many(values) == [
+        None if k is None else pis.pad_pis(k) for k in values
+    ]
+    assert pis.pad_pis_many([float('nan')]) == [None]
+    with pytest.raises(TypeError):
+        pis.format_pis_many([1.5])
+
+
+def test_mask_pis():
+    """Test masking PIS/PASEP as ***.0000.000-*."""
+
+    assert pis.mask_pis('125.6124.131-0') == '***.6124.131-*'
+    assert pis.mask_pis(12561241310) == '***.6124.131-*'
+
+
 def test_pad_pis():
     """Test padding PIS/PASEP with leading zeros."""
 
@@ -106,3 +136,35 @@ def test_random_pis():
 
     assert isinstance(pis.random_pis(), str) is True
     assert isinstance(pis.random_pis(formatted=False), str) is True
+
+
+def test_iter_valid_pis():
+    """Test enumerating and counting valid PIS/PASEP in a range."""
+
+    found = list(pis.iter_valid_pis(12561241300, 12561242300))
+    assert '12561241310' in found
+    assert found == ['%011i' % n for n in range(12561241300, 12561242300)
+                     if pis.validate_pis('%011i' % n)]
+    assert pis.count_valid_pis(12561241300, 12561242300) == len(found)
+
+    # ranges are limited to identifiers of 11 digits, without zero
+    assert next(pis.iter_valid_pis(-10, 1000, formatted=True)) == \
+        '000.0000.001-9'
+    assert pis.count_valid_pis(0, 10 ** 11 + 5) == 10 ** 10 - 1
+    assert pis.count_valid_pis(10, 10) == 0
+    assert list(pis.iter_valid_pis(10 ** 11, 10 ** 11 + 5)) == []
+
+
+def test_explain_pis():
+    """Test reasons for PIS/PASEP being valid or invalid."""
+
+    assert pis.explain_pis('125.6124.131-0') == Reason.VALID
+    assert pis.explain_pis('1256124131', autopad=False) == Reason.TOO_SHORT
+    assert pis.explain_pis(None) == Reason.MISSING
+    assert pis.explain_pis('125612413100') == Reason.TOO_LONG
+    assert pis.explain_pis('') == Reason.ALL_ZEROS
+    assert pis.explain_pis('12561241311') == Reason.DV1_MISMATCH
+
+    values = ['125.6124.131-0', None, '12561241311']
+    assert pis.explain_pis_many(values) == bytearray([0, 2, 7])
+    assert pis.validate_pis_many(values) == [True, False, False]
@@ -0,0 +1,63 @@
+import hmac
+
+import pytest
+from brazilnum import batch
+from brazilnum.privacy import Pseudonymizer, pseudonymize
+
+
+def test_pseudonymize():
+    """Check tokens are HMAC of the padded identifier."""
+
+    expected = hmac.new(b'secret', b'04193675866', 'sha256').hexdigest()
+    tokens = pseudonymize(
+        ['041.936.758-66', '4193675866', 4193675866, None, float('nan')],
+        'secret')
+    assert tokens == [expected, expected, expected, None, None]
+
+    # bytes and str keys are the same key; other keys give other tokens
+    assert pseudonymize([4193675866], b'secret') == [expected]
+    assert pseudonymize([4193675866], 'other') != [expected]
+
+    # tokens can be shortened, and use other hash functions
+    assert pseudonymize([4193675866], 'secret', length=16) == [expected[:16]]
+    assert pseudonymize(['02.558.157/0001-62'], 'secret', kind='cnpj',
+                        digest='sha512') == [
+        hmac.new(b'secret', b'02558157000162', 'sha512').hexdigest()
+    ]
+
+    with pytest.raises(ValueError):
+        pseudonymize([4193675866], 'secret', kind='cep')
+
+
+def test_pseudonymize_junk():
+    """Check values that pad to all zeros get no token."""
+
+    assert pseudonymize(['abc', '', 0, '00000000000'], 'k') == [None] * 4
+    assert pseudonymize(['', '00.000.000/0000-00'], 'k', kind='cnpj') == [
+        None, None
+    ]
+    assert Pseudonymizer('k').token('n/a') is None
+
+
+def test_pseudonymizer():
+    """Check single tokens, long keys, and the cache of tokens."""
+
+    key = b'k' * 100  # longer than the block size of SHA-256
+    p = Pseudonymizer(key, kind='pis', cache_size=2)
+    expected = hmac.new(key, b'12561241310', 'sha256').hexdigest()
+    assert p.token('125.6124.131-0') == expected
+    assert p.token(12561241310) == expected
+    assert p.token(None) is None
+    assert p.tokens(['125.6124.131-0', None]) == [expected, None]
+    assert p._token.cache_info().hits == 2
+
+    with pytest.raises(TypeError):
+        p.token(1.5)
+
+
+def test_batch_mask():
+    """Check masking through the batch functions."""
+
+    assert batch.run('mask', 'cpf', ['968.811.342-58', None]) == [
+        '***.811.342-**', None
+    ]
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+from brazilnum.quality import _sample, _wilson, profile_column
+
+
+def test_profile_column():
+    """Check exact profiles of columns smaller than the sample."""
+
+    cpfs = ['968.811.342-58', '96881134258', 4193675866, None,
+            '968.811.342-59', '123']
+    p = profile_column(cpfs, kind='cpf')
+    assert (p.rows, p.sampled) == (6, 6)
+    assert p.valid_rate == p.valid_interval[0] == p.valid_interval[1] == 0.5
+    assert p.reasons == {'VALID': 2 / 6, 'PADDED': 1 / 6, 'MISSING': 1 / 6,
+                         'DV1_MISMATCH': 1 / 6, 'DV2_MISMATCH': 1 / 6}
+    assert p.shapes == {'formatted': 2 / 6, 'str': 2 / 6, 'int': 1 / 6,
+                        'missing': 1 / 6}
+    assert p.autopad_rate == pytest.approx(1 / 3)
+    assert p.duplicate_rate == pytest.approx(1 / 3)
+
+    p = profile_column(['12ABC34501DE35', '2558157000162'], sample=1, seed=0)
+    assert (p.rows, p.sampled) == (2, 1)
+
+    # codes in muni.SHIM are valid without a check digit, and distinct
+    p = profile_column(['2201919', '2201988', '5104526', '3550308',
+                        '22.019-19'], kind='muni')
+    assert p.valid_rate == 1
+    assert p.duplicate_rate == pytest.approx(1 / 5)
+
+    empty = profile_column(iter([]), kind='muni')
+    assert (empty.rows, empty.valid_rate, empty.reasons) == (0, None, {})
+
+    with pytest.raises(ValueError):
+        profile_column(cpfs, kind='cep')
+    with pytest.raises(TypeError):
+        profile_column([1.5], kind='cpf')
+
+
+def test_sample():
+    """Check reservoir samples are uniform and count every row."""
+
+    counts = [0] * 50
+    for seed in range(2000):
+        rows, picked = _sample(iter(range(50)), 5, random.Random(seed))
+        assert rows == 50 and len(set(picked)) == 5
+        for k in picked:
+            counts[k] += 1
+    assert min(counts) > 150 and max(counts) < 250  # 200 expected
+
+
+def test_wilson():
+    """Check the Wilson score interval against known values."""
+
+    low, high = _wilson(81, 263, 0.95)
+    assert round(low, 4) == 0.2553 and round(high, 4) == 0.3662
+    assert _wilson(0, 10, 0.95)[0] == pytest.approx(0.0)
@@ -0,0 +1,138 @@
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from brazilnum import batch, server
+from brazilnum.cnpj import random_cnpj
+
+
+def test_batch_run():
+    """Check batch functions looked up by operation and kind."""
+
+    assert batch.run('validate', 'cnpj', ['02.558.157/0001-62', None]) == [
+        True, False
+    ]
+    assert batch.run('explain', 'cpf', ['96881134259']) == [8]
+    assert batch.run('format', 'cep', [13165000, '123456', None]) == [
+        '13165-000', None, None
+    ]
+    assert batch.run('pad', 'cpf', [4193675866]) == ['04193675866']
+
+
+def test_batch_run_threaded():
+    """Check threaded batches match unthreaded ones, in order."""
+
+    values = [random_cnpj() for _ in range(500)] + [None, '123', 191]
+    expected = batch.run('validate', 'cnpj', values)
+    assert batch.run_threaded('validate', 'cnpj', values, workers=4) == \
+        expected
+    assert batch.run_threaded('explain', 'cnpj', values, chunk_size=7) == \
+        batch.run('explain', 'cnpj', values)
+    with ThreadPoolExecutor(2) as pool:
+        assert batch.run_threaded('validate', 'cnpj', iter(values),
+                                  executor=pool) == expected
+    assert batch.run_threaded('validate', 'cnpj', []) == []
+
+
+async def _client(port, requests):
+    """Send requests on one connection and read all responses."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for request in requests:
+        writer.write(request.encode() + b'\n')
+    await writer.drain()
+    responses = [json.loads(await reader.readline()) for _ in requests]
+    writer.close()
+    return responses
+
+
+def test_server():
+    """Check requests and responses over a local connection."""
+
+    async def main():
+        srv = await server.serve(port=0, max_batch_size=100, max_wait=0.01)
+        port = srv.sockets[0].getsockname()[1]
+        requests = [
+            json.dumps({'id': 1, 'op': 'validate', 'kind': 'cnpj',
+                        'value': '02.558.157/0001-62'}),
+            json.dumps({'id': 2, 'op': 'format', 'kind': 'cpf',
+                        'values': [96881134258, None]}),
+            json.dumps({'id': 3, 'op': 'explain', 'kind': 'pis',
+                        'values': ['12561241311']}),
+            json.dumps({'id': 4, 'op': 'validate', 'kind': 'cnpj',
+                        'value': 1.5}),
+            json.dumps({'id': 5, 'op': 'shout', 'kind': 'cnpj',
+                        'value': 1}),
+            json.dumps({'id': 6, 'op': 'validate'}),
+            'not json',
+            json.dumps({'id': 8, 'op': 'validate', 'kind': 'cnpj',
+                        'value': '02.558.157/0001-55'}),
+        ]
+        # two clients at once share batches, but not responses
+        first, second = await asyncio.gather(_client(port, requests),
+                                             _client(port, requests[:3]))
+        srv.close()
+        await srv.wait_closed()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first[:3] == second
+    assert first[0] == {'id': 1, 'result': True}
+    assert first[1] == {'id': 2, 'results': ['968.811.342-58', None]}
+    assert first[2] == {'id': 3, 'results': [7]}
+    # errors in one request do not affect requests batched with it
+    assert 'must be str or int' in first[3]['error']
+    assert 'Unsupported operation' in first[4]['error']
+    assert first[5] == {'id': 6, 'error': "missing field: 'kind'"}
+    assert first[6]['id'] is None and 'error' in first[6]
+    assert first[7] == {'id': 8, 'result': False}
+
+
+def test_micro_batcher():
+    """Check that concurrent requests are combined into batches."""
+
+    calls = []
+    original = batch.KERNELS[('validate', 'cpf')]
+
+    def kernel(values):
+        calls.append(len(values))
+        return original(values)
+
+    async def main():
+        batcher = server.MicroBatcher(max_batch_size=6, max_wait=0.05)
+        return await asyncio.gather(*[
+            batcher.submit('validate', 'cpf', ['96881134258', '1'])
+            for _ in range(4)
+        ])
+
+    batch.KERNELS[('validate', 'cpf')] = kernel
+    try:
+        results = asyncio.run(main())
+    finally:
+        batch.KERNELS[('validate', 'cpf')] = original
+
+    assert results == [[True, False]] * 4
+    # the first batch fills at 6 values, the rest waits for max_wait
+    assert calls == [6, 2]
+
+
+def test_micro_batcher_failure():
+    """Check that a batch that fails passes the error to its requests."""
+
+    async def fail(key, requests):
+        raise RuntimeError('batch failed')
+
+    async def main():
+        batcher = server.MicroBatcher(max_batch_size=4, max_wait=0.01)
+        batcher._run_batch = fail
+        results = await asyncio.gather(*[
+            batcher.submit('validate', 'cpf', ['96881134258'])
+            for _ in range(2)
+        ], return_exceptions=True)
+        await asyncio.sleep(0)  # let done callbacks run
+        return results, batcher._tasks
+
+    results, tasks = asyncio.run(main())
+    assert [str(exc) for exc in results] == ['batch failed'] * 2
+    assert all(isinstance(exc, RuntimeError) for exc in results)
+    assert not tasks
@@ -0,0 +1,45 @@
+import random
+import string
+
+import pytest
+from brazilnum.util import (
+    NONALNUM, NONDIGIT, clean_alphanumeric_id, clean_id, clean_id_many
+)
+
+
+def test_clean_id():
+    """Check cleaning matches the regular expressions on any input."""
+
+    random.seed(20240709)
+    chars = string.printable + 'áÉ²٣ßﬁ'
+    values = ['', '0', '968.811.342-58', 'xp.b30.aw3/0001-84', 'XPB30AW3']
+    values += [''.join(random.choices(chars, k=random.randint(1, 16)))
+               for _ in range(2000)]
+    for value in values:
+        assert clean_id(value) == NONDIGIT.sub('', value)
+        assert clean_alphanumeric_id(value) == \
+            NONALNUM.sub('', value).upper()
+
+    assert clean_id(4193675866) == '4193675866'
+    assert clean_alphanumeric_id(type('S', (str,), {})('ab.1')) == 'AB1'
+    for value in (None, 1.5, True, b'123'):
+        with pytest.raises(TypeError):
+            clean_id(value)
+        with pytest.raises(TypeError):
+            clean_alphanumeric_id(value)
+
+
+def test_clean_id_many():
+    """Check batch cleaning and the mask of identifiers it changed."""
+
+    values = ['96881134258', '968.811.342-58', 96881134258, None,
+              float('nan'), 'xpb30aw3']
+    assert clean_id_many(values) == (
+        ['96881134258', '96881134258', '96881134258', None, None, '303'],
+        [False, True, True, False, False, True],
+    )
+    assert clean_id_many(['XPB30AW3', 'xp.b30.aw3'], alphanumeric=True) == (
+        ['XPB30AW3', 'XPB30AW3'], [False, True]
+    )
+    with pytest.raises(TypeError):
+        clean_id_many([1.5])